@@ -1,6 +1,6 @@
 """Utilities for scoring and classifying suspected scam messages."""
 
 from .risk_score_message import calculate_message_risk_score
-from .classify_scam_message import classify_risk
+from .classify_scam_message import classify_risk, classify_status
 
-__all__ = ["calculate_message_risk_score", "classify_risk"]
+__all__ = ["calculate_message_risk_score", "classify_risk", "classify_status"]
@@ -0,0 +1,317 @@
+from array import array
+from collections import deque
+from typing import Dict, FrozenSet, Hashable, Iterable, Iterator, List, Set, Tuple
+
+
+class Automaton:
+    """Aho-Corasick automaton over (key, label) pairs.
+
+    One pass over a text reports the label of every key occurring in it, so
+    the cost of a scan does not grow with the number of keys.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, Hashable]]):
+        goto: List[Dict[str, int]] = [{}]
+        fail: List[int] = [0]
+        lengths: List[List[Tuple[Hashable, int]]] = [[]]
+        labels: Set[Hashable] = set()
+
+        for key, label in entries:
+            labels.add(label)
+            state = 0
+            for ch in key:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    fail.append(0)
+                    lengths.append([])
+                state = next_state
+            lengths[state].append((label, len(key)))
+
+        order: List[int] = []
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                link = fail[state]
+                while link and ch not in goto[link]:
+                    link = fail[link]
+                target = goto[link].get(ch, 0)
+                fail[next_state] = target if target != next_state else 0
+                lengths[next_state] += lengths[fail[next_state]]
+
+        self._finish(labels, goto, fail, order,
+                     [tuple(sorted(set(pairs), key=lambda pair: -pair[1])) or None for pairs in lengths])
+
+    def _finish(self, labels, goto, fail, order, out_lengths):
+        self.labels: Set[Hashable] = labels
+        self.goto = goto
+        self.fail = fail
+        self.order = order
+        # (label, key length) per state, longest key first, for reporting spans
+        self.out_lengths = out_lengths
+        self.out = [frozenset(label for label, _ in pairs) if pairs else None for pairs in out_lengths]
+
+        # Resolve failure links ahead of time so scanning needs at most two
+        # lookups per char; root transitions are kept once rather than copied
+        self.root = goto[0]
+        self.delta: List[Dict[str, int]] = [{} for _ in goto]
+        for state in order:
+            link = fail[state]
+            self.delta[state] = {**self.delta[link], **goto[state]} if link else goto[state]
+
+    def to_arrays(self):
+        """Flat form for serializing: ``(labels, {name: array or str})``.
+
+        States are renumbered in breadth-first order, so shallow states come
+        first and every failure link points to a lower number. Transitions
+        and outputs are stored as offset-indexed runs, one per state; labels
+        are referred to by their index in ``labels``.
+        """
+        labels = list(self.labels)
+        label_ids = {label: index for index, label in enumerate(labels)}
+        states = [0] + self.order
+        number = {state: index for index, state in enumerate(states)}
+        goto_index = array("I", [0])
+        goto_targets = array("I")
+        goto_chars = []
+        out_index = array("I", [0])
+        out_labels = array("I")
+        out_key_lengths = array("I")
+        for state in states:
+            transitions = self.goto[state]
+            goto_chars.extend(transitions)
+            goto_targets.extend(number[target] for target in transitions.values())
+            goto_index.append(len(goto_targets))
+            for label, length in self.out_lengths[state] or ():
+                out_labels.append(label_ids[label])
+                out_key_lengths.append(length)
+            out_index.append(len(out_labels))
+        return labels, {
+            "goto_index": goto_index,
+            "goto_chars": "".join(goto_chars),
+            "goto_targets": goto_targets,
+            "fail": array("I", (number[self.fail[state]] for state in states)),
+            "out_index": out_index,
+            "out_labels": out_labels,
+            "out_key_lengths": out_key_lengths,
+        }
+
+    @classmethod
+    def from_arrays(cls, labels: List[Hashable], arrays) -> "Automaton":
+        """Rebuild an automaton from ``to_arrays`` output without redoing the failure links."""
+        goto_index = arrays["goto_index"]
+        goto_chars = arrays["goto_chars"]
+        goto_targets = arrays["goto_targets"]
+        goto = [
+            dict(zip(goto_chars[goto_index[state]:goto_index[state + 1]],
+                     goto_targets[goto_index[state]:goto_index[state + 1]]))
+            for state in range(len(goto_index) - 1)
+        ]
+        out_index = arrays["out_index"]
+        out_labels = arrays["out_labels"]
+        out_key_lengths = arrays["out_key_lengths"]
+        out_lengths = [
+            tuple((labels[out_labels[i]], out_key_lengths[i])
+                  for i in range(out_index[state], out_index[state + 1])) or None
+            for state in range(len(out_index) - 1)
+        ]
+        automaton = cls.__new__(cls)
+        automaton._finish(set(labels), goto, list(arrays["fail"]), list(range(1, len(goto))), out_lengths)
+        return automaton
+
+    def find(self, text: str) -> Set[Hashable]:
+        """Return the set of labels whose keys occur anywhere in ``text``."""
+        found: Set[Hashable] = set()
+        self.advance(text, 0, found)
+        return found
+
+    def advance(self, text: str, state: int, found: Set[Hashable]) -> int:
+        """Feed ``text`` from automaton ``state``, adding hit labels to ``found``.
+
+        Returns the state to resume from, so a long text can be scanned in
+        chunks and still report keys that span chunk boundaries. Stops early
+        once every label has been found.
+        """
+        delta = self.delta
+        root = self.root
+        out = self.out
+        total = len(self.labels)
+        if out[0]:
+            found |= out[0]  # empty keys match every text
+        if len(found) >= total:
+            return state
+
+        for ch in text:
+            next_state = delta[state].get(ch)
+            state = root.get(ch, 0) if next_state is None else next_state
+            hits = out[state]
+            if hits is not None:
+                found |= hits
+                if len(found) >= total:
+                    break
+
+        return state
+
+    def iter_hits(self, text: str) -> Iterator[Tuple[int, FrozenSet[Hashable]]]:
+        """Yield ``(end, labels)`` for every position of ``text`` where some keys end."""
+        delta = self.delta
+        root = self.root
+        out = self.out
+        state = 0
+        if out[0]:
+            yield 0, out[0]
+        for end, ch in enumerate(text, 1):
+            next_state = delta[state].get(ch)
+            state = root.get(ch, 0) if next_state is None else next_state
+            hits = out[state]
+            if hits is not None:
+                yield end, hits
+
+    def find_spans(self, text: str) -> Dict[Hashable, Tuple[int, int]]:
+        """Map each label found in ``text`` to the ``(start, end)`` of its first key occurrence."""
+        delta = self.delta
+        root = self.root
+        out_lengths = self.out_lengths
+        total = len(self.labels)
+        spans: Dict[Hashable, Tuple[int, int]] = {}
+        for label, _ in out_lengths[0] or ():
+            spans[label] = (0, 0)
+
+        state = 0
+        for end, ch in enumerate(text, 1):
+            if len(spans) >= total:
+                break
+            next_state = delta[state].get(ch)
+            state = root.get(ch, 0) if next_state is None else next_state
+            hits = out_lengths[state]
+            if hits is not None:
+                for label, length in hits:
+                    if label not in spans:
+                        spans[label] = (end - length, end)
+
+        return spans
+
+
+class MappedAutomaton:
+    """Read-only automaton that scans ``Automaton.to_arrays`` data in place.
+
+    The arrays may be memoryviews over a memory-mapped file, so every process
+    using the same artifact shares one copy through the page cache. The
+    first ``hot_states`` states (the shallow ones, which most chars of a
+    text land in) get resolved transition dicts like ``Automaton``; deeper
+    states follow goto/failure links in the arrays. That keeps per-process
+    memory bounded however large the rule set grows.
+    """
+
+    def __init__(self, labels: List[Hashable], arrays, hot_states: int = 16384):
+        self.label_list = list(labels)
+        self.labels: Set[Hashable] = set(labels)
+        self.goto_index = arrays["goto_index"]
+        self.goto_chars: str = arrays["goto_chars"]
+        self.goto_targets = arrays["goto_targets"]
+        self.fail = arrays["fail"]
+        self.out_index = arrays["out_index"]
+        self.out_labels = arrays["out_labels"]
+        self.out_key_lengths = arrays["out_key_lengths"]
+
+        goto_index = self.goto_index
+        goto_chars = self.goto_chars
+        goto_targets = self.goto_targets
+        self.hot = min(hot_states, len(goto_index) - 1)
+        self.delta: List[Dict[str, int]] = []
+        self.out_lengths = []
+        for state in range(self.hot):
+            start, end = goto_index[state], goto_index[state + 1]
+            transitions = dict(zip(goto_chars[start:end], goto_targets[start:end]))
+            link = self.fail[state]
+            # Breadth-first numbering: the failure state is always resolved already
+            self.delta.append({**self.delta[link], **transitions} if state and link else transitions)
+            self.out_lengths.append(self._out_lengths(state))
+        self.root = self.delta[0]
+        self.out = [frozenset(label for label, _ in pairs) if pairs else None for pairs in self.out_lengths]
+
+    def _out_lengths(self, state: int):
+        label_list = self.label_list
+        return tuple((label_list[self.out_labels[i]], self.out_key_lengths[i])
+                     for i in range(self.out_index[state], self.out_index[state + 1])) or None
+
+    def _deep_step(self, state: int, ch: str) -> int:
+        find = self.goto_chars.find
+        goto_index = self.goto_index
+        hot = self.hot
+        while state >= hot:
+            position = find(ch, goto_index[state], goto_index[state + 1])
+            if position >= 0:
+                return self.goto_targets[position]
+            state = self.fail[state]
+        next_state = self.delta[state].get(ch)
+        return self.root.get(ch, 0) if next_state is None else next_state
+
+    def find(self, text: str) -> Set[Hashable]:
+        found: Set[Hashable] = set()
+        self.advance(text, 0, found)
+        return found
+
+    def advance(self, text: str, state: int, found: Set[Hashable]) -> int:
+        """Same contract as ``Automaton.advance``."""
+        delta = self.delta
+        root = self.root
+        out = self.out
+        hot = self.hot
+        deep_step = self._deep_step
+        total = len(self.labels)
+        if out[0]:
+            found |= out[0]  # empty keys match every text
+        if len(found) >= total:
+            return state
+
+        for ch in text:
+            if state < hot:
+                next_state = delta[state].get(ch)
+                state = root.get(ch, 0) if next_state is None else next_state
+            else:
+                state = deep_step(state, ch)
+            hits = out[state] if state < hot else self._deep_out(state)
+            if hits is not None:
+                found |= hits
+                if len(found) >= total:
+                    break
+
+        return state
+
+    def _deep_out(self, state: int):
+        pairs = self._out_lengths(state)
+        return frozenset(label for label, _ in pairs) if pairs else None
+
+    def find_spans(self, text: str) -> Dict[Hashable, Tuple[int, int]]:
+        """Same contract as ``Automaton.find_spans``."""
+        delta = self.delta
+        root = self.root
+        out_lengths = self.out_lengths
+        hot = self.hot
+        total = len(self.labels)
+        spans: Dict[Hashable, Tuple[int, int]] = {}
+        for label, _ in out_lengths[0] or ():
+            spans[label] = (0, 0)
+
+        state = 0
+        for end, ch in enumerate(text, 1):
+            if len(spans) >= total:
+                break
+            if state < hot:
+                next_state = delta[state].get(ch)
+                state = root.get(ch, 0) if next_state is None else next_state
+            else:
+                state = self._deep_step(state, ch)
+            hits = out_lengths[state] if state < hot else self._out_lengths(state)
+            if hits is not None:
+                for label, length in hits:
+                    if label not in spans:
+                        spans[label] = (end - length, end)
+
+        return spans
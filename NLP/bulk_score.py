@@ -0,0 +1,330 @@
+"""Score large SMS exports offline.
+
+Reads JSONL or CSV (optionally gzip-compressed) as a stream, scores rows in
+chunks on a process pool and writes one JSONL result per row as soon as its
+chunk is done, so memory stays flat however large the export is.
+
+    python -m NLP.bulk_score messages.jsonl.gz results.jsonl --workers 8
+    python -m NLP.bulk_score export.csv results.jsonl --group-by conversation_id
+    python -m NLP.bulk_score export.csv results.jsonl --group-by conversation_id \
+        --chat-window 50 --chat-window-minutes 1440 --timestamp-field sent_at
+    python -m NLP.bulk_score messages.jsonl results.jsonl --model model.npz
+    python -m NLP.bulk_score messages.jsonl results.jsonl --campaigns 100000
+
+With ``--model``, rows whose rule score falls in the ambiguous band are
+rescored by the n-gram model (see ``NLP.cascade``), one batch per chunk.
+With ``--chat-window`` or ``--chat-window-minutes``, conversations are
+scored like a live windowed chat (see ``WindowedChatSession``), replayed in
+row order with the times in ``--timestamp-field``; rows whose time cannot
+be parsed are left out and counted in the conversation's ``skipped_rows``.
+With ``--campaigns``, rows are grouped into near-duplicate campaigns (see
+``NLP.campaigns``) before they are sent to the workers; every result gets a
+``campaign_id``, rows close to a campaign's first row reuse its result
+instead of being scored, and the cluster sizes are reported at the end.
+"""
+import argparse
+import collections
+import csv
+import datetime
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .risk_score_message import calculate_message_risk_score
+    from .classify_scam_message import classify_risk
+    from .risk_score_chat import analyze_chat
+    from .cascade import DEFAULT_BAND, DEFAULT_WEIGHT, load_cascade, parse_band
+    from .campaigns import CampaignIndex, minhash, shingle_hashes
+    from .chat_session import WindowedChatSession
+    from .text_io import open_text
+except ImportError:  # running as standalone script
+    from risk_score_message import calculate_message_risk_score
+    from classify_scam_message import classify_risk
+    from risk_score_chat import analyze_chat
+    from cascade import DEFAULT_BAND, DEFAULT_WEIGHT, load_cascade, parse_band
+    from campaigns import CampaignIndex, minhash, shingle_hashes
+    from chat_session import WindowedChatSession
+    from text_io import open_text
+
+
+def read_rows(path: str, fmt: str = None):
+    """Yield row dicts from a JSONL or CSV file."""
+    if fmt is None:
+        base = path[:-3] if path.endswith(".gz") else path
+        fmt = "csv" if base.endswith(".csv") else "jsonl"
+
+    with open_text(path) as fh:
+        if fmt == "csv":
+            for row in csv.DictReader(fh):
+                yield row
+        else:
+            for line in fh:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def score_row(row: dict, text_field: str = "text", id_field: str = "id") -> dict:
+    message = row.get(text_field) or ""
+    score, categories = calculate_message_risk_score(message)
+    result = {
+        "risk_score": score,
+        "risk_level": classify_risk(score),
+        "categories": categories,
+    }
+    if id_field in row:
+        result[id_field] = row[id_field]
+    return result
+
+
+def score_chunk(rows, text_field: str = "text", id_field: str = "id", model=None):
+    """Score ``rows``; ``model`` is ``load_cascade`` arguments for the second stage, if any."""
+    results = [score_row(row, text_field, id_field) for row in rows]
+    if model is None:
+        return results
+
+    rule_scores = [result["risk_score"] for result in results]
+    scores, probabilities = load_cascade(*model).refine(
+        rule_scores, [row.get(text_field) or "" for row in rows]
+    )
+    for result, rule_score, score, probability in zip(results, rule_scores, scores, probabilities):
+        if probability is not None:
+            result["risk_score"] = score
+            result["risk_level"] = classify_risk(score)
+            result["rule_score"] = rule_score
+            result["model_probability"] = probability
+    return results
+
+
+def chunk_signatures(rows, text_field: str = "text", bins: int = 32):
+    return [minhash(shingle_hashes(row.get(text_field) or ""), bins) for row in rows]
+
+
+def match_campaigns(rows, campaigns, signatures, text_field: str = "text"):
+    """Split ``rows`` into the ones to score and a ``(row, campaign, reused)`` plan per row.
+
+    A row is reused when an earlier row started its campaign and it is at
+    least ``reuse_threshold`` similar to that row.
+    """
+    to_score = []
+    plan = []
+    for row, signature in zip(rows, signatures):
+        campaign, similarity = campaigns.observe(row.get(text_field) or "", signature)
+        reused = campaign.size > 1 and similarity >= campaigns.reuse_threshold
+        if not reused:
+            to_score.append(row)
+        plan.append((row, campaign, reused))
+    return to_score, plan
+
+
+def planned_chunks(pool, chunks, campaigns, text_field: str = "text", lookahead: int = 1):
+    """Yield ``(rows to score, plan)`` per chunk, in order.
+
+    Signatures are computed on the pool ``lookahead`` chunks ahead, so this
+    process only does the index lookups.
+    """
+    bins = campaigns.bands * campaigns.rows
+    signing = collections.deque()
+    for chunk in chunks:
+        signing.append((chunk, pool.submit(chunk_signatures, chunk, text_field, bins)))
+        if len(signing) > lookahead:
+            chunk, future = signing.popleft()
+            yield match_campaigns(chunk, campaigns, future.result(), text_field)
+    for chunk, future in signing:
+        yield match_campaigns(chunk, campaigns, future.result(), text_field)
+
+
+def campaign_results(results, plan, id_field: str = "id"):
+    """Results for every planned row, in order, from the ones scored for it.
+
+    Chunks are collected in input order, so the first row of a campaign has
+    always been collected, and its result stored, by the time a row reuses it.
+    """
+    scored = iter(results)
+    merged = []
+    for row, campaign, reused in plan:
+        if reused:
+            result = dict(campaign.verdict)
+            if id_field in row:
+                result[id_field] = row[id_field]
+        else:
+            result = next(scored)
+            if campaign.verdict is None:
+                campaign.verdict = {key: value for key, value in result.items() if key != id_field}
+        result["campaign_id"] = campaign.id
+        result["campaign_reused"] = reused
+        merged.append(result)
+    return merged
+
+
+def parse_timestamp(value):
+    """Seconds since the epoch from a number or an ISO 8601 string (None if missing)."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+        return parsed.timestamp()
+
+
+def score_conversation(item, text_field: str = "text", window=None, timestamp_field: str = None):
+    """Score one conversation; ``window`` is ``(max_messages, window_seconds)`` for a windowed replay."""
+    conversation_id, rows = item
+    skipped = 0
+    if window is None:
+        result = analyze_chat([row.get(text_field) or "" for row in rows])
+    else:
+        session = WindowedChatSession(*window, clock=None)
+        for row in rows:
+            try:
+                timestamp = parse_timestamp(row.get(timestamp_field)) if timestamp_field else None
+            except (TypeError, ValueError):  # one malformed time skips its row, not the run
+                skipped += 1
+                continue
+            session.record(*calculate_message_risk_score(row.get(text_field) or ""), timestamp)
+        result = session.result()
+    result["conversation_id"] = conversation_id
+    result["messages"] = len(rows) - skipped
+    if skipped:
+        result["skipped_rows"] = skipped
+    return result
+
+
+def score_conversation_chunk(items, text_field: str = "text", window=None, timestamp_field: str = None):
+    return [score_conversation(item, text_field, window, timestamp_field) for item in items]
+
+
+def chunked(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def group_conversations(rows, group_by: str):
+    """Group consecutive rows sharing ``group_by``; exports are expected sorted by it."""
+    for conversation_id, group in itertools.groupby(rows, key=lambda row: row.get(group_by)):
+        yield conversation_id, list(group)
+
+
+def run(input_path, output_path, fmt=None, text_field="text", id_field="id",
+        group_by=None, workers=None, chunk_size=2000, max_pending=None, model=None, campaigns=None,
+        chat_window=None, timestamp_field=None):
+    """Score ``input_path`` into ``output_path`` and return ``(rows, seconds)``.
+
+    At most ``max_pending`` chunks are in flight, which keeps memory bounded
+    while every worker stays busy; results are written in input order.
+    ``campaigns`` is a ``CampaignIndex`` to group rows with (not with
+    ``group_by``); it is filled in this process, so ids are the same
+    whatever the number of workers. ``chat_window`` is
+    ``(max_messages, window_seconds)`` to score conversations windowed.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    rows = read_rows(input_path, fmt)
+
+    if group_by:
+        items = group_conversations(rows, group_by)
+        work, args = score_conversation_chunk, (text_field, chat_window, timestamp_field)
+    else:
+        items = rows
+        work, args = score_chunk, (text_field, id_field, model)
+
+    started = time.perf_counter()
+    scored = 0
+    with open_text(output_path, "w") as out, ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        chunks = ((chunk, None) for chunk in chunked(items, chunk_size))
+        if campaigns is not None:
+            chunks = planned_chunks(pool, chunked(items, chunk_size), campaigns, text_field, workers)
+        for chunk, plan in chunks:
+            pending.append((pool.submit(work, chunk, *args), plan))
+            if len(pending) >= max_pending:
+                scored += write_results(out, collect(*pending.pop(0), id_field))
+        for future, plan in pending:
+            scored += write_results(out, collect(future, plan, id_field))
+
+    return scored, time.perf_counter() - started
+
+
+def collect(future, plan, id_field: str = "id"):
+    results = future.result()
+    return results if plan is None else campaign_results(results, plan, id_field)
+
+
+def write_results(out, results) -> int:
+    for result in results:
+        out.write(json.dumps(result, ensure_ascii=False))
+        out.write("\n")
+    return len(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-score SMS exports (JSONL/CSV, optionally .gz).")
+    parser.add_argument("input", help="input file, or - for stdin")
+    parser.add_argument("output", help="JSONL output file (.gz to compress), or - for stdout")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="input format (default: from extension)")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--group-by", help="score whole conversations sharing this field with analyze_chat")
+    parser.add_argument("--chat-window", type=int, default=0, metavar="N",
+                        help="with --group-by: score over the last N messages, with decay")
+    parser.add_argument("--chat-window-minutes", type=float, default=0, metavar="T",
+                        help="with --group-by: score over the last T minutes, with decay")
+    parser.add_argument("--timestamp-field", help="message time (epoch seconds or ISO 8601) for --chat-window-minutes")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="rows per worker task")
+    parser.add_argument("--model", help="n-gram model (.npz) to rescore ambiguous rows with")
+    parser.add_argument("--model-band", default="%d-%d" % DEFAULT_BAND,
+                        help="inclusive rule-score band sent to the model")
+    parser.add_argument("--model-weight", type=int, default=DEFAULT_WEIGHT,
+                        help="most points the model may add or remove")
+    parser.add_argument("--campaigns", type=int, default=0, metavar="N",
+                        help="group rows into near-duplicate campaigns, tracking at most N at a time")
+    parser.add_argument("--campaign-report", help="write campaign cluster sizes to this JSON file")
+    args = parser.parse_args(argv)
+    if args.campaigns and args.group_by:
+        parser.error("--campaigns scores single rows and cannot be combined with --group-by")
+    if args.chat_window_minutes and not args.timestamp_field:
+        parser.error("--chat-window-minutes needs --timestamp-field")
+
+    model = (args.model, *parse_band(args.model_band), args.model_weight) if args.model else None
+    campaigns = CampaignIndex(args.campaigns) if args.campaigns > 0 else None
+    chat_window = None
+    if args.chat_window or args.chat_window_minutes:
+        chat_window = (args.chat_window or 50, args.chat_window_minutes * 60 or None)
+    scored, seconds = run(
+        args.input, args.output, args.format, args.text_field, args.id_field,
+        args.group_by, args.workers, args.chunk_size, model=model, campaigns=campaigns,
+        chat_window=chat_window, timestamp_field=args.timestamp_field
+    )
+    rate = scored / seconds if seconds else 0
+    print(f"scored {scored} {'conversations' if args.group_by else 'rows'} "
+          f"in {seconds:.1f}s ({rate:,.0f}/s)", file=sys.stderr)
+    if campaigns is not None:
+        report_campaigns(campaigns, args.campaign_report)
+
+
+def report_campaigns(campaigns, path=None, count: int = 10):
+    stats = campaigns.stats()
+    largest = campaigns.largest(count)
+    print(f"{stats['campaigns']} campaigns over {stats['messages']} rows, "
+          f"{stats['clustered_messages']} rows in campaigns of 2 or more, {stats['evicted']} evicted", file=sys.stderr)
+    for campaign in largest:
+        print(f"  {campaign['id']}  {campaign['size']}", file=sys.stderr)
+    if path:
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump({**stats, "largest": campaigns.largest(1000)}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
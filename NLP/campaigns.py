@@ -0,0 +1,227 @@
+"""Streaming near-duplicate index: messages sent from one scam template.
+
+Campaigns resend one template with the amounts, tracking numbers and names
+changed, so every message is reduced to a MinHash signature of its char
+shingles after ``fold_message`` and with every digit run masked to ``0``:
+"5,000" and "7,500", or two tracking numbers, give the same shingles. The
+signature is one-permutation MinHash (each shingle hashed once, into one of
+``bands * rows`` bins, keeping the smallest value per bin), so it costs one
+CRC per shingle rather than one per shingle and hash function.
+
+Signatures are split into ``bands`` LSH bands of ``rows`` values; a message
+sharing any band with a known campaign is compared with that campaign's
+first message and joins it when their estimated Jaccard similarity reaches
+``threshold``, otherwise it starts a new campaign. With the defaults (8
+bands of 4 rows) a pair at similarity 0.7 shares a band 89% of the time, one
+at 0.8 98% and one at 0.5 only 40%.
+
+Memory is bounded: at most ``max_campaigns`` campaigns (one signature, its
+band keys, a size and a verdict each) are kept in least-recently-matched
+order, and the oldest is dropped when the cap is hit. Callers store the
+verdict of a campaign's first message on ``Campaign.verdict`` and may reuse
+it for members at least ``reuse_threshold`` similar to it.
+
+``CAMPAIGNS`` is configured from the environment and is None (every
+message scored on its own) unless ``UNSCAMABLE_CAMPAIGNS`` is set to the
+number of campaigns to track.
+"""
+import hashlib
+import heapq
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from operator import eq
+from typing import Optional, Tuple
+from zlib import crc32
+
+try:
+    from .normalizer import fold_message
+except ImportError:  # running as standalone script
+    from normalizer import fold_message
+
+DEFAULT_BANDS = 8
+DEFAULT_ROWS = 4
+DEFAULT_THRESHOLD = 0.7
+DEFAULT_REUSE_THRESHOLD = 0.8
+SHINGLE_SIZE = 4
+
+_DIGIT_RUNS = re.compile(r"\d+")
+# 32-bit Fibonacci hashing spreads the CRC over the bins: the top bits pick
+# the bin and the rest is the value kept for it
+_FIBONACCI = 0x9E3779B1
+_MASK = 0xFFFFFFFF
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> set:
+    """CRC32 of every ``size``-char shingle of the folded, digit-masked text."""
+    masked = _DIGIT_RUNS.sub("0", fold_message(text))
+    data = masked.encode("utf-32-le")
+    width = 4 * size
+    if len(data) <= width:
+        return {crc32(data)}
+    return {crc32(data[offset:offset + width]) for offset in range(0, len(data) - width + 4, 4)}
+
+
+def minhash(hashes, bins: int) -> Tuple[int, ...]:
+    """One-permutation MinHash of ``hashes`` with ``bins`` (a power of two) values.
+
+    An empty bin takes the value of the next non-empty one (wrapping),
+    offset by the distance, so two signatures only agree there when the bins
+    they borrowed from do.
+    """
+    shift = 32 - (bins.bit_length() - 1)
+    value_mask = (1 << shift) - 1
+    # Largest first, so the smallest value of every bin is written last
+    mixed = sorted([(value * _FIBONACCI) & _MASK for value in hashes], reverse=True)
+    smallest = {value >> shift: value & value_mask for value in mixed}
+    if len(smallest) == bins:
+        return tuple([smallest[slot] for slot in range(bins)])
+    # Walk down from the top bin; above the last filled bin the next one is
+    # the first, reached by wrapping round
+    signature = [0] * bins
+    following = min(smallest)
+    carry, following = smallest[following], following + bins
+    for slot in range(bins - 1, -1, -1):
+        value = smallest.get(slot)
+        if value is None:
+            signature[slot] = carry + ((following - slot) << shift)
+        else:
+            signature[slot] = carry = value
+            following = slot
+    return tuple(signature)
+
+
+class Campaign:
+    """One cluster of near-duplicate messages."""
+
+    __slots__ = ("id", "size", "verdict", "signature", "band_keys")
+
+    def __init__(self, campaign_id: str, signature: Tuple[int, ...], band_keys):
+        self.id = campaign_id
+        self.size = 0
+        self.verdict = None
+        self.signature = signature
+        self.band_keys = band_keys
+
+
+class CampaignIndex:
+    """Near-duplicate clusters of the messages seen so far, LSH-indexed."""
+
+    def __init__(self, max_campaigns: int = 100_000, bands: int = DEFAULT_BANDS, rows: int = DEFAULT_ROWS,
+                 threshold: float = DEFAULT_THRESHOLD, reuse_threshold: float = DEFAULT_REUSE_THRESHOLD):
+        bins = bands * rows
+        if bins & (bins - 1):
+            raise ValueError("bands * rows must be a power of two")
+        self.max_campaigns = max_campaigns
+        self.bands = bands
+        self.rows = rows
+        self.threshold = threshold
+        self.reuse_threshold = reuse_threshold
+        self.version = f"lsh{bands}x{rows}:{threshold}:{reuse_threshold}"
+        self._campaigns = OrderedDict()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.messages = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._campaigns)
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        return minhash(shingle_hashes(text), self.bands * self.rows)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [(band, signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def observe(self, text: str, signature: Tuple[int, ...] = None) -> Tuple[Campaign, float]:
+        """Add ``text`` to its campaign, starting one if needed.
+
+        Returns the campaign and the estimated similarity to its first
+        message (1.0 for a new campaign, whose ``verdict`` is None).
+        """
+        if signature is None:
+            signature = self.signature(text)
+        band_keys = self._band_keys(signature)
+        with self._lock:
+            self.messages += 1
+            best, best_similarity = None, self.threshold
+            seen = set()
+            for band_key in band_keys:
+                for campaign_id in self._buckets.get(band_key, ()):
+                    if campaign_id in seen:
+                        continue
+                    seen.add(campaign_id)
+                    campaign = self._campaigns[campaign_id]
+                    similarity = sum(map(eq, signature, campaign.signature)) / len(signature)
+                    if similarity >= best_similarity:
+                        best, best_similarity = campaign, similarity
+            if best is not None:
+                self._campaigns.move_to_end(best.id)
+                best.size += 1
+                return best, round(best_similarity, 4)
+
+            campaign = Campaign(self._campaign_id(signature), signature, band_keys)
+            campaign.size = 1
+            self._campaigns[campaign.id] = campaign
+            for band_key in band_keys:
+                self._buckets.setdefault(band_key, []).append(campaign.id)
+            while len(self._campaigns) > self.max_campaigns:
+                self._drop(self._campaigns.popitem(last=False)[1])
+            return campaign, 1.0
+
+    def _campaign_id(self, signature) -> str:
+        # Derived from the first message, so every process that saw the same
+        # first message names the campaign the same way
+        digest = hashlib.blake2b(array("I", signature).tobytes(), digest_size=6).hexdigest()
+        while digest in self._campaigns:  # two signatures with the same digest
+            digest = hashlib.blake2b(digest.encode(), digest_size=6).hexdigest()
+        return digest
+
+    def _drop(self, campaign: Campaign):
+        self.evicted += 1
+        for band_key in campaign.band_keys:
+            bucket = self._buckets[band_key]
+            bucket.remove(campaign.id)
+            if not bucket:
+                del self._buckets[band_key]
+
+    def largest(self, count: int = 20):
+        """The ``count`` biggest live campaigns as ``{"id", "size"}`` dicts."""
+        with self._lock:
+            top = heapq.nlargest(count, self._campaigns.values(), key=lambda campaign: campaign.size)
+            return [{"id": campaign.id, "size": campaign.size} for campaign in top]
+
+    def stats(self) -> dict:
+        with self._lock:
+            sizes = [campaign.size for campaign in self._campaigns.values()]
+        histogram = {}
+        for size in sizes:
+            # Powers-of-two buckets: "1", "2-3", "4-7", ...
+            low = 1 << (size.bit_length() - 1)
+            label = str(low) if low == 1 else f"{low}-{2 * low - 1}"
+            histogram[label] = histogram.get(label, 0) + 1
+        return {
+            "messages": self.messages,
+            "campaigns": len(sizes),
+            "clustered_messages": sum(size for size in sizes if size > 1),
+            "evicted": self.evicted,
+            "size_histogram": dict(sorted(histogram.items(), key=lambda item: int(item[0].split("-")[0]))),
+            "version": self.version,
+        }
+
+
+def campaigns_from_env() -> Optional[CampaignIndex]:
+    max_campaigns = int(os.environ.get("UNSCAMABLE_CAMPAIGNS", 0))
+    if max_campaigns <= 0:
+        return None
+    return CampaignIndex(
+        max_campaigns,
+        threshold=float(os.environ.get("UNSCAMABLE_CAMPAIGN_THRESHOLD", DEFAULT_THRESHOLD)),
+        reuse_threshold=float(os.environ.get("UNSCAMABLE_CAMPAIGN_REUSE", DEFAULT_REUSE_THRESHOLD)),
+    )
+
+
+CAMPAIGNS = campaigns_from_env()
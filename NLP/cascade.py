@@ -0,0 +1,98 @@
+"""Two-stage scoring: the rules first, the n-gram model only where they are unsure.
+
+Rule scores in the ambiguous band (``classify_risk``'s BE CAUTIOUS and
+WARNING levels by default) are moved by up to ``weight`` points towards the
+model's verdict: ``score + weight * (2 * p - 1)``, with ``p`` the model's scam
+probability. Scores outside the band are returned untouched, so clear-cut
+messages only pay for one comparison, and the ambiguous ones of a batch are
+scored with a single vectorized model call.
+
+``CASCADE`` is configured from the environment and is None (rules only)
+unless ``UNSCAMABLE_MODEL`` names a model from ``python -m NLP.ngram_model
+train``:
+
+- ``UNSCAMABLE_MODEL_BAND`` - inclusive score band sent to the model (default ``1-69``)
+- ``UNSCAMABLE_MODEL_WEIGHT`` - most points the model may add or remove (default 30)
+"""
+import os
+import sys
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    from .metrics import METRICS
+    from .ngram_model import NgramModel
+except ImportError:  # running as standalone script
+    from metrics import METRICS
+    from ngram_model import NgramModel
+
+DEFAULT_BAND = (1, 69)
+DEFAULT_WEIGHT = 30
+# The model was trained on SMS-sized texts; longer ones are cut before scoring
+MAX_MODEL_CHARS = 4096
+
+
+class Cascade:
+    """Refines rule scores in ``[low, high]`` with an ``NgramModel``."""
+
+    def __init__(self, model: NgramModel, low: int = DEFAULT_BAND[0], high: int = DEFAULT_BAND[1],
+                 weight: int = DEFAULT_WEIGHT):
+        self.model = model
+        self.low = low
+        self.high = high
+        self.weight = weight
+        self.version = f"{model.version}:{low}-{high}:{weight}"
+
+    def ambiguous(self, score: int) -> bool:
+        return self.low <= score <= self.high
+
+    def refine(self, scores: Sequence[int], texts: Sequence[str],
+               watch=None) -> Tuple[List[int], List[Optional[float]]]:
+        """Return the refined scores and the model probability of each text (None where not asked).
+
+        Timed callers pass their stopwatch as ``watch``.
+        """
+        watch = METRICS.stopwatch("cascade", watch)
+        refined = list(scores)
+        probabilities: List[Optional[float]] = [None] * len(refined)
+        pending = [index for index, score in enumerate(refined) if self.ambiguous(score)]
+        watch.lap("rules_band")
+        if not pending:
+            return refined, probabilities
+
+        predicted = self.model.predict_proba([texts[index][:MAX_MODEL_CHARS] for index in pending])
+        for index, probability in zip(pending, predicted.tolist()):
+            shifted = refined[index] + round(self.weight * (2 * probability - 1))
+            refined[index] = min(max(shifted, 0), 100)
+            probabilities[index] = round(probability, 4)
+        watch.lap("model")
+        return refined, probabilities
+
+
+@lru_cache(maxsize=4)
+def load_cascade(path: str, low: int = DEFAULT_BAND[0], high: int = DEFAULT_BAND[1],
+                 weight: int = DEFAULT_WEIGHT) -> Cascade:
+    """``Cascade`` over the model at ``path``, loaded once per process."""
+    return Cascade(NgramModel.load(path), low, high, weight)
+
+
+def parse_band(value: str) -> Tuple[int, int]:
+    low, _, high = value.partition("-")
+    return int(low), int(high)
+
+
+def cascade_from_env() -> Optional[Cascade]:
+    path = os.environ.get("UNSCAMABLE_MODEL")
+    if not path:
+        return None
+    low, high = parse_band(os.environ.get("UNSCAMABLE_MODEL_BAND", "%d-%d" % DEFAULT_BAND))
+    weight = int(os.environ.get("UNSCAMABLE_MODEL_WEIGHT", DEFAULT_WEIGHT))
+    try:
+        return load_cascade(path, low, high, weight)
+    except (ImportError, OSError, ValueError, KeyError) as error:
+        # The second stage is optional: without it the rules still score everything
+        print(f"n-gram model {path} not loaded, scoring with rules only: {error}", file=sys.stderr)
+        return None
+
+
+CASCADE = cascade_from_env()
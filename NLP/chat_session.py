@@ -0,0 +1,361 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+try:
+    from .risk_score_message import calculate_message_risk_score
+    from .risk_score_chat import (
+        ChatState,
+        build_output,
+        escalation_bonus,
+        repetition_bonus,
+    )
+    from .rule_engine import RULES
+except ImportError:  # running as standalone script
+    from risk_score_message import calculate_message_risk_score
+    from risk_score_chat import (
+        ChatState,
+        build_output,
+        escalation_bonus,
+        repetition_bonus,
+    )
+    from rule_engine import RULES
+
+
+class SessionFull(Exception):
+    """A session has taken as many messages or bytes as it may."""
+
+
+class ChatSession:
+    """Live chat scored one message at a time.
+
+    Produces the same result as ``analyze_chat`` over every message added so
+    far, but each ``add_message`` only scores the new message and updates the
+    running category counts and bonuses. The state is those counts, one per
+    rule category, so it does not grow with the chat; ``bytes_seen`` is kept
+    for the store's per-session cap.
+    """
+
+    __slots__ = ("chat", "message_total", "repetition_total", "last_seen", "bytes_seen")
+
+    def __init__(self):
+        self.chat = ChatState()
+        self.message_total = 0
+        self.repetition_total = 0
+        self.last_seen = 0.0
+        self.bytes_seen = 0
+
+    def add_message(self, message: str, timestamp: float = None):
+        # The whole history counts here, so when a message was sent does not matter
+        return self.add_scored(*calculate_message_risk_score(message))
+
+    def add_scored(self, score: int, normalized_categories):
+        """Add a message already scored by ``calculate_message_risk_score``."""
+        self.record(score, normalized_categories)
+        return self.result()
+
+    def record(self, score: int, normalized_categories):
+        """``add_scored`` without computing the result."""
+        chat = self.chat
+
+        chat.messages_seen += 1
+        self.message_total += score
+
+        for category in normalized_categories:
+            count = chat.category_counts.get(category, 0) + 1
+            chat.category_counts[category] = count
+            chat.unique_categories.add(category)
+            self.repetition_total += repetition_bonus(count) - repetition_bonus(count - 1)
+
+    def result(self):
+        chat = self.chat
+        repeated_categories = [
+            category for category, count in chat.category_counts.items()
+            if repetition_bonus(count)
+        ]
+        bonus = escalation_bonus(len(chat.unique_categories))
+
+        chat.total_score = min(self.message_total + self.repetition_total + bonus, 100)
+
+        return build_output(chat, chat.total_score, repeated_categories, bonus > 0)
+
+
+def decayed_bonus(bonus, count: float) -> float:
+    """``bonus`` (defined on whole counts) linearly interpolated at a decayed ``count``."""
+    whole = int(count)
+    low = bonus(whole)
+    return low + (count - whole) * (bonus(whole + 1) - low)
+
+
+class WindowedChatSession(ChatSession):
+    """Chat scored over a sliding window of recent messages, with decay.
+
+    Only the last ``max_messages`` messages are kept, in a ring buffer, and
+    with ``window_seconds`` only those sent within that long of the newest
+    one. Each message weighs less the closer it is to leaving the window:
+    ``1 - age / window_seconds`` by time and ``1 - newer / max_messages`` by
+    position, whichever is smaller. Message scores, category counts and the
+    repetition and escalation bonuses are all taken over the weighted
+    window, so old promo messages fade out of a months-long chat and memory
+    and work per message stay bounded by ``max_messages``.
+
+    ``timestamp`` is in seconds; without one, the message is stamped with
+    ``clock()`` (live chats) or, when ``clock`` is None, with the newest
+    time seen so far (replays without times). ``detected_categories``
+    counts the messages in the window.
+    """
+
+    __slots__ = ("window", "window_seconds", "latest", "_clock")
+
+    def __init__(self, max_messages: int = 50, window_seconds: float = None, clock=time.time):
+        super().__init__()
+        self.window = deque(maxlen=max_messages)
+        self.window_seconds = window_seconds
+        self.latest = 0.0
+        self._clock = clock
+
+    def add_message(self, message: str, timestamp: float = None):
+        return self.add_scored(*calculate_message_risk_score(message), timestamp=timestamp)
+
+    def add_scored(self, score: int, normalized_categories, timestamp: float = None):
+        self.record(score, normalized_categories, timestamp)
+        return self.result()
+
+    def record(self, score: int, normalized_categories, timestamp: float = None):
+        """``add_scored`` without computing the result, for replays that only need the last one."""
+        if timestamp is None:
+            timestamp = self._clock() if self._clock is not None else self.latest
+        self.latest = max(self.latest, timestamp)
+        self.chat.messages_seen += 1
+        self.window.append((timestamp, score, tuple(normalized_categories)))
+
+    def result(self):
+        window = self.window
+        latest = self.latest
+        if self.window_seconds:
+            while window and window[0][0] <= latest - self.window_seconds:
+                window.popleft()
+
+        # Oldest first, the order analyze_chat lists categories in; a
+        # message's position weight drops by 1 / maxlen per newer message
+        step = 1 / window.maxlen
+        position_weight = 1 - (len(window) - 1) * step
+        time_step = 1 / self.window_seconds if self.window_seconds else 0.0
+        message_total = 0.0
+        counts = {}
+        weights = {}
+        for timestamp, score, categories in window:
+            weight = min(position_weight, 1 - (latest - timestamp) * time_step)
+            position_weight += step
+            if weight <= 0:
+                continue
+            message_total += weight * score
+            for category in categories:
+                counts[category] = counts.get(category, 0) + 1
+                weights[category] = weights.get(category, 0.0) + weight
+
+        repetition_total = sum(decayed_bonus(repetition_bonus, weight) for weight in weights.values())
+        repeated_categories = [category for category, weight in weights.items() if weight > 1]
+        bonus = decayed_bonus(escalation_bonus, sum(min(weight, 1.0) for weight in weights.values()))
+
+        chat = self.chat
+        chat.category_counts = counts
+        chat.unique_categories = set(counts)
+        chat.total_score = min(round(message_total + repetition_total + bonus), 100)
+        return build_output(chat, chat.total_score, repeated_categories, bonus > 0)
+
+
+def replay_chat(messages, timestamps=None, max_messages: int = 50, window_seconds: float = None):
+    """Yield the windowed chat result after each message of a recorded chat."""
+    session = WindowedChatSession(max_messages, window_seconds, clock=None)
+    timestamps = timestamps if timestamps is not None else [None] * len(messages)
+    for message, timestamp in zip(messages, timestamps):
+        yield session.add_message(message, timestamp)
+
+
+class SegmentSession(ChatSession):
+    """Chat session fed with page segments keyed by a client-side content hash.
+
+    Each segment is scored once, however often the page is re-sent. The
+    chat result is the same as ``analyze_chat`` over the distinct segments
+    on the page. The extension verdict combines the per-segment pattern
+    hits, OTP codes and distinct bank accounts. The session keeps the rules
+    it started with, so a reload never mixes two rule sets in one aggregate.
+
+    ``sync`` drops the segments no longer on the page (a deleted or
+    scrolled-away message) and recomputes the aggregate from the ones left,
+    so each segment's findings are kept with it. With ``reputation``, each
+    segment's blocklisted entities are looked up once, when it is scored;
+    with ``model_chars``, that much of each segment's text is kept for the
+    model's second look at the page.
+
+    Memory is bounded: once ``max_segments`` segments are held, later ones
+    are neither requested nor scored, and at most ``max_accounts`` accounts
+    are listed.
+    """
+
+    __slots__ = ("rules", "reputation", "model_chars", "segments", "pattern_hits", "otp_found", "accounts",
+                 "max_segments", "max_accounts")
+
+    def __init__(self, rules=None, max_segments: int = 20_000, max_accounts: int = 100,
+                 reputation=None, model_chars: int = 0):
+        super().__init__()
+        self.rules = rules or RULES.current
+        self.reputation = reputation
+        self.model_chars = model_chars
+        # digest -> (score, categories, hits, otp_found, accounts, listed, text), in upload order
+        self.segments = {}
+        self.pattern_hits = set()
+        self.otp_found = False
+        self.accounts = {}
+        self.max_segments = max_segments
+        self.max_accounts = max_accounts
+
+    @property
+    def full(self) -> bool:
+        return len(self.segments) >= self.max_segments
+
+    def sync(self, digests):
+        """Drop the segments not among ``digests`` (the page as it is now); returns ``missing(digests)``."""
+        current = set(digests)
+        gone = [digest for digest in self.segments if digest not in current]
+        if gone:
+            for digest in gone:
+                del self.segments[digest]
+            self._recount()
+        return self.missing(digests)
+
+    def missing(self, digests):
+        """The distinct ``digests`` not scored yet, in the order given."""
+        if self.full:
+            return []
+        return [digest for digest in dict.fromkeys(digests) if digest not in self.segments]
+
+    def add_segment(self, digest: str, text: str) -> bool:
+        """Score ``text`` unless ``digest`` was already seen; returns whether it was new."""
+        if digest in self.segments or self.full:
+            return False
+        score, categories = self.rules.score_message(text)
+        hits, otp_found, accounts = self.rules.find_all(text)
+        listed = tuple(self.reputation.check(text, accounts)) if self.reputation is not None else ()
+        segment = (score, tuple(categories), frozenset(hits), otp_found, tuple(accounts), listed,
+                   text[:self.model_chars])
+        self.segments[digest] = segment
+        self._count(*segment)
+        return True
+
+    def _count(self, score, categories, hits, otp_found, accounts, listed, text):
+        self.record(score, categories)
+        self.pattern_hits |= hits
+        self.otp_found = self.otp_found or otp_found
+        for account in accounts:
+            if len(self.accounts) >= self.max_accounts:
+                break
+            self.accounts[account] = None
+
+    def _recount(self):
+        self.chat = ChatState()
+        self.message_total = 0
+        self.repetition_total = 0
+        self.pattern_hits = set()
+        self.otp_found = False
+        self.accounts = {}
+        for segment in self.segments.values():
+            self._count(*segment)
+
+    def verdict(self):
+        """``(risk_score, flags, bank_accounts)`` over the segments held."""
+        risk_score, flags = self.rules.score_findings(self.pattern_hits, self.otp_found, self.accounts)
+        return risk_score, flags, list(self.accounts)
+
+    def listed(self):
+        """Distinct blocklisted entities of the segments held."""
+        return list(dict.fromkeys(key for segment in self.segments.values() for key in segment[5]))
+
+    def model_text(self) -> str:
+        """The kept text of the segments held, in upload order, for the model."""
+        return "\n".join(segment[6] for segment in self.segments.values())
+
+
+class ChatSessionStore:
+    """Sessions keyed by conversation id with LRU and TTL eviction.
+
+    At most ``max_sessions`` are kept; the least recently used session is
+    dropped when the cap is hit, and sessions idle for ``ttl_seconds`` expire.
+    A whole-chat session takes at most ``max_messages`` messages and
+    ``max_bytes`` of UTF-8 text through ``add_message``; past either,
+    ``SessionFull`` is raised and the session is left as it was. Windowed
+    sessions are not capped: they keep only their last messages anyway.
+    """
+
+    def __init__(self, max_sessions: int = 100_000, ttl_seconds: float = 3600, clock=time.monotonic,
+                 factory=ChatSession, max_messages: int = 10_000, max_bytes: int = 4 * 1024 * 1024):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._factory = factory
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _evict(self, now: float):
+        sessions = self._sessions
+        # Sessions are kept in last-use order, so expired ones sit at the front
+        while sessions:
+            oldest = next(iter(sessions.values()))
+            if now - oldest.last_seen < self.ttl_seconds:
+                break
+            sessions.popitem(last=False)
+        while len(sessions) > self.max_sessions:
+            sessions.popitem(last=False)
+
+    def _touch(self, session_id: str, now: float) -> ChatSession:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._factory()
+            self._sessions[session_id] = session
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_seen = now
+        return session
+
+    def add_message(self, session_id: str, message: str, timestamp: float = None):
+        size = len(message.encode("utf-8"))
+
+        def add(session):
+            # A window forgets old messages by itself, so only whole-chat sessions are capped
+            if not isinstance(session, WindowedChatSession):
+                if session.chat.messages_seen >= self.max_messages:
+                    raise SessionFull(f"chat session holds {self.max_messages} messages")
+                if session.bytes_seen + size > self.max_bytes:
+                    raise SessionFull(f"chat session holds {self.max_bytes} bytes")
+                session.bytes_seen += size
+            return session.add_message(message, timestamp)
+
+        return self.apply(session_id, add)
+
+    def apply(self, session_id: str, fn):
+        """Call ``fn(session)`` under the store lock, creating the session if needed."""
+        with self._lock:
+            now = self._clock()
+            self._evict(now)
+            session = self._touch(session_id, now)
+            self._evict(now)
+            return fn(session)
+
+    def result(self, session_id: str):
+        """Current verdict for ``session_id``, or None if it is unknown or expired."""
+        with self._lock:
+            now = self._clock()
+            self._evict(now)
+            if session_id not in self._sessions:
+                return None
+            return self._touch(session_id, now).result()
+
+    def discard(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
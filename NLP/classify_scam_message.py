@@ -6,4 +6,16 @@ def classify_risk(score: int) -> str:
     elif score > 0:
         return "BE CAUTIOUS"
     else:
-        return "SAFE"
\ No newline at end of file
+        return "SAFE"
+
+
+# The extension's bands: a score of exactly 70 or 40 falls one band lower
+def classify_status(score: int) -> str:
+    if score > 70:
+        return "HIGH_RISK"
+    elif score > 40:
+        return "WARNING"
+    elif score > 0:
+        return "BE CAUTIOUS"
+    else:
+        return "SAFE"
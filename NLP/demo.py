@@ -9,13 +9,18 @@ except ImportError:  # running as standalone script
     from classify_scam_message import classify_risk
     from scam_messages import MESSAGES
 
-output_lines = []
 
-for msg in MESSAGES:
-    score, matched_categories = calculate_message_risk_score(msg)
-    line = f"{msg} | scam | {score} | {classify_risk(score)}\n{matched_categories}"
-    print(line)
-    output_lines.append(line)
+def main():
+    output_lines = []
 
-Path("NLP/demo_output.txt").write_text("\n\n".join(output_lines) + "\n", encoding="utf-8")
-    
\ No newline at end of file
+    for msg in MESSAGES:
+        score, matched_categories = calculate_message_risk_score(msg)
+        line = f"{msg} | scam | {score} | {classify_risk(score)}\n{matched_categories}"
+        print(line)
+        output_lines.append(line)
+
+    Path("NLP/demo_output.txt").write_text("\n\n".join(output_lines) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Compare two rule-set versions over a labeled corpus before shipping one.
+
+Every message of a JSONL/CSV corpus (optionally .gz) is scored by both
+rule sets on a process pool, and the report gives, per version, precision
+and recall at each risk band (a message counts as flagged at a band when it
+lands in that band or a higher one), the band distribution and
+the single-core throughput; plus every flipped verdict, i.e. every message
+whose band differs between the versions.
+
+    python -m NLP.evaluate corpus.jsonl.gz --candidate rules.json
+    python -m NLP.evaluate corpus.jsonl.gz --baseline old.json --candidate new.bin \\
+        --flips flips.jsonl --output report.json
+
+Rule sets are JSON files or artifacts, as for ``UNSCAMABLE_RULES``; the
+baseline defaults to the built-in rules. Labels are 1 (scam) or 0; rows
+without one are scored and diffed but left out of precision and recall.
+JSONL lines are parsed in the workers, so this process only reads lines
+and writes flips. Bands are those of ``classify_risk``, or with ``--engine
+extension`` those of ``classify_status``, the bands the extension shows,
+which puts scores of exactly 70 and 40 one band lower.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .bulk_score import chunked, read_rows
+    from .classify_scam_message import classify_risk, classify_status
+    from .rule_engine import CompiledRules, compile_file, default_ruleset
+    from .text_io import open_text
+except ImportError:  # running as standalone script
+    from bulk_score import chunked, read_rows
+    from classify_scam_message import classify_risk, classify_status
+    from rule_engine import CompiledRules, compile_file, default_ruleset
+    from text_io import open_text
+
+BANDS = ["SAFE", "BE CAUTIOUS", "WARNING", "HIGH_RISK"]
+BAND_INDEX = {band: index for index, band in enumerate(BANDS)}
+VERSIONS = ("baseline", "candidate")
+
+# Rule sets of the worker process, compiled once by ``init_worker``
+_RULES = None
+
+
+def load_rules(path=None) -> CompiledRules:
+    return compile_file(path) if path else CompiledRules(default_ruleset())
+
+
+def init_worker(baseline_path, candidate_path):
+    global _RULES
+    _RULES = (load_rules(baseline_path), load_rules(candidate_path))
+
+
+def scorer(rules: CompiledRules, engine: str):
+    """``text -> (score, flags)`` for the NLP (``message``) or extension result shape."""
+    if engine == "extension":
+        def score(text):
+            risk_score, flags, _ = rules.analyze(text)
+            return risk_score, flags
+        return score
+    return rules.score_message
+
+
+def parse_label(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ("scam", "true", "yes"):
+            return 1
+        if value in ("ham", "benign", "false", "no"):
+            return 0
+    return 1 if int(value) else 0
+
+
+def evaluate_chunk(items, text_field="text", label_field="label", id_field="id", engine="message"):
+    """Score ``items`` (JSONL lines or row dicts) with both rule sets.
+
+    Returns ``(counts, seconds, flips)``: ``counts[version][band][label]``
+    with label 0, 1 or 2 (unlabeled), the seconds each version spent
+    scoring, and one record per flipped verdict.
+    """
+    rows = [json.loads(item) if isinstance(item, str) else item for item in items]
+    texts = [row.get(text_field) or "" for row in rows]
+    labels = [parse_label(row.get(label_field)) for row in rows]
+
+    results = []
+    seconds = []
+    for rules in _RULES:
+        score = scorer(rules, engine)
+        started = time.perf_counter()
+        results.append([score(text) for text in texts])
+        seconds.append(time.perf_counter() - started)
+
+    band = classify_status if engine == "extension" else classify_risk
+    counts = [[[0, 0, 0] for _ in BANDS] for _ in VERSIONS]
+    flips = []
+    for index, label in enumerate(labels):
+        column = 2 if label is None else label
+        (score_a, flags_a), (score_b, flags_b) = results[0][index], results[1][index]
+        band_a, band_b = band(score_a), band(score_b)
+        counts[0][BAND_INDEX[band_a]][column] += 1
+        counts[1][BAND_INDEX[band_b]][column] += 1
+        if band_a != band_b:
+            flips.append({
+                "id": rows[index].get(id_field),
+                "label": label,
+                "baseline": {"score": score_a, "band": band_a, "flags": flags_a},
+                "candidate": {"score": score_b, "band": band_b, "flags": flags_b},
+                "text": texts[index],
+            })
+    return counts, seconds, flips
+
+
+def band_metrics(counts):
+    """Precision and recall of "band or higher" for every band above SAFE."""
+    positives = sum(count[1] for count in counts)
+    metrics = {}
+    for index in range(1, len(BANDS)):
+        flagged = counts[index:]
+        true_positives = sum(count[1] for count in flagged)
+        predicted = sum(count[0] + count[1] for count in flagged)
+        metrics[BANDS[index]] = {
+            "flagged": sum(sum(count) for count in flagged),
+            "precision": round(true_positives / predicted, 4) if predicted else None,
+            "recall": round(true_positives / positives, 4) if positives else None,
+        }
+    return metrics
+
+
+def corpus_items(path, fmt=None):
+    """Raw JSONL lines (parsed by the workers) or CSV row dicts."""
+    base = path[:-3] if path.endswith(".gz") else path
+    if (fmt or ("csv" if base.endswith(".csv") else "jsonl")) == "csv":
+        yield from read_rows(path, "csv")
+        return
+    with open_text(path) as fh:
+        for line in fh:
+            if line.strip():
+                yield line
+
+
+def run(corpus_path, baseline=None, candidate=None, fmt=None, text_field="text", label_field="label",
+        id_field="id", engine="message", workers=None, chunk_size=5000, flips_path=None, max_examples=20):
+    """Evaluate both rule sets over ``corpus_path`` and return the report dict.
+
+    Every flip is written to ``flips_path`` if given; the report keeps the
+    first ``max_examples``.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2
+    # Compiled here too, so a broken rule set fails before any work starts
+    versions = [load_rules(baseline).version, load_rules(candidate).version]
+    counts = [[[0, 0, 0] for _ in BANDS] for _ in VERSIONS]
+    seconds = [0.0, 0.0]
+    transitions = {}
+    examples = []
+    flipped = 0
+
+    flips_out = open_text(flips_path, "w") if flips_path else None
+
+    def collect(future):
+        nonlocal flipped
+        chunk_counts, chunk_seconds, flips = future.result()
+        for version in range(len(VERSIONS)):
+            seconds[version] += chunk_seconds[version]
+            for band, row in enumerate(chunk_counts[version]):
+                for column, count in enumerate(row):
+                    counts[version][band][column] += count
+        for flip in flips:
+            key = f"{flip['baseline']['band']} -> {flip['candidate']['band']}"
+            transitions[key] = transitions.get(key, 0) + 1
+            if flips_out is not None:
+                flips_out.write(json.dumps(flip, ensure_ascii=False))
+                flips_out.write("\n")
+        flipped += len(flips)
+        examples.extend(flips[:max_examples - len(examples)])
+
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(baseline, candidate)) as pool:
+            pending = []
+            for chunk in chunked(corpus_items(corpus_path, fmt), chunk_size):
+                pending.append(pool.submit(evaluate_chunk, chunk, text_field, label_field, id_field, engine))
+                if len(pending) >= max_pending:
+                    collect(pending.pop(0))
+            for future in pending:
+                collect(future)
+    finally:
+        if flips_out is not None:
+            flips_out.close()
+    wall_seconds = time.perf_counter() - started
+
+    messages = sum(sum(row) for row in counts[0])
+    report = {
+        "corpus": corpus_path,
+        "engine": engine,
+        "messages": messages,
+        "labeled": messages - sum(row[2] for row in counts[0]),
+        "scams": sum(row[1] for row in counts[0]),
+        "wall_seconds": round(wall_seconds, 2),
+        "messages_per_s": round(messages / wall_seconds) if wall_seconds else None,
+        "versions": {},
+        "flipped": flipped,
+        "transitions": dict(sorted(transitions.items(), key=lambda item: -item[1])),
+        "flip_examples": examples,
+    }
+    for version, name in enumerate(VERSIONS):
+        report["versions"][name] = {
+            "version": versions[version],
+            "distribution": {band: sum(counts[version][index]) for index, band in enumerate(BANDS)},
+            "bands": band_metrics(counts[version]),
+            "cpu_seconds": round(seconds[version], 2),
+            # Per core: messages over the time this version spent scoring them
+            "messages_per_core_s": round(messages / seconds[version]) if seconds[version] else None,
+        }
+    return report
+
+
+def print_report(report, out=sys.stdout):
+    print(f"{report['messages']:,} messages ({report['labeled']:,} labeled, {report['scams']:,} scams) "
+          f"in {report['wall_seconds']}s, {report['messages_per_s'] or 0:,}/s", file=out)
+    for name, data in report["versions"].items():
+        print(f"\n{name} {data['version']}: {data['messages_per_core_s'] or 0:,} messages/s per core", file=out)
+        print(f"  {'band':12} {'messages':>10} {'flagged':>10} {'precision':>10} {'recall':>8}", file=out)
+        for band in BANDS:
+            metrics = data["bands"].get(band, {})
+            flagged = f"{metrics['flagged']:,}" if metrics else ""
+            precision = metrics.get("precision")
+            recall = metrics.get("recall")
+            print(f"  {band:12} {data['distribution'][band]:>10,} {flagged:>10} "
+                  f"{'-' if precision is None else precision:>10} {'-' if recall is None else recall:>8}", file=out)
+    print(f"\n{report['flipped']:,} flipped verdicts", file=out)
+    for transition, count in report["transitions"].items():
+        print(f"  {transition:28} {count:>10,}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff two rule-set versions over a labeled corpus.")
+    parser.add_argument("corpus", help="labeled JSONL/CSV corpus (.gz allowed), or - for stdin")
+    parser.add_argument("--baseline", help="rule-set file or artifact (default: the built-in rules)")
+    parser.add_argument("--candidate", required=True, help="rule-set file or artifact to evaluate")
+    parser.add_argument("--engine", choices=["message", "extension"], default="message",
+                        help="score with calculate_message_risk_score (message) or the /analyze rules")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="corpus format (default: from extension)")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--label-field", default="label")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="messages per worker task")
+    parser.add_argument("--flips", help="write every flipped verdict to this JSONL file (.gz to compress)")
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.corpus, args.baseline, args.candidate, args.format, args.text_field, args.label_field,
+        args.id_field, args.engine, args.workers, args.chunk_size, args.flips
+    )
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import re
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional, Pattern, Tuple
+
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: r"\d",
+    sre_parse.CATEGORY_NOT_DIGIT: r"\D",
+    sre_parse.CATEGORY_SPACE: r"\s",
+    sre_parse.CATEGORY_NOT_SPACE: r"\S",
+    sre_parse.CATEGORY_WORD: r"\w",
+    sre_parse.CATEGORY_NOT_WORD: r"\W",
+}
+_ZERO_WIDTH = (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT)
+_REPEATS = tuple(getattr(sre_parse, name) for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+                 if hasattr(sre_parse, name))
+
+
+def _char(code: int) -> str:
+    return f"\\U{code:08x}"
+
+
+def _class_body(items) -> Optional[str]:
+    parts = []
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            parts.append(_char(av))
+        elif op is sre_parse.RANGE:
+            parts.append(f"{_char(av[0])}-{_char(av[1])}")
+        elif op is sre_parse.CATEGORY and av in _CATEGORIES:
+            parts.append(_CATEGORIES[av])
+        else:
+            return None  # negated sets and the like
+    return "".join(parts)
+
+
+def _first(items):
+    """``(class fragments, nullable)`` for the chars a match of ``items`` can start with.
+
+    None when any char could start a match (or the construct is not understood).
+    """
+    chars = []
+    for op, av in items:
+        if op in _ZERO_WIDTH:
+            continue  # anchors and lookarounds only restrict where the next char may match
+        if op is sre_parse.LITERAL:
+            chars.append(_char(av))
+            return chars, False
+        if op is sre_parse.IN:
+            body = _class_body(av)
+            if body is None:
+                return None
+            chars.append(body)
+            return chars, False
+        if op is sre_parse.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            result = None if add_flags or del_flags else _first(sub)
+        elif op is sre_parse.BRANCH:
+            result = ([], False)
+            for alternative in av[1]:
+                branch = _first(alternative)
+                if branch is None:
+                    return None
+                result = (result[0] + branch[0], result[1] or branch[1])
+        elif op in _REPEATS:
+            low, _, sub = av
+            result = _first(sub)
+            if result is not None and low == 0:
+                result = (result[0], True)
+        else:
+            return None  # any char, negated literal, group reference, ...
+        if result is None:
+            return None
+        chars.extend(result[0])
+        if not result[1]:
+            return chars, False
+    return chars, True
+
+
+def _first_chars(regex: Pattern) -> Optional[str]:
+    """Body of a char class holding every char a match of ``regex`` can start with."""
+    try:
+        result = _first(sre_parse.parse(regex.pattern, regex.flags))
+    except (re.error, TypeError, ValueError):
+        return None
+    if result is None or result[1]:
+        return None  # could match the empty string anywhere
+    return "".join(result[0])
+
+
+def _findall_item(match):
+    """What ``Pattern.findall`` reports for ``match``."""
+    groups = match.re.groups
+    if groups == 0:
+        return match.group()
+    if groups == 1:
+        return match.group(1) or ""
+    return match.groups("")
+
+
+class FusedRegex:
+    """Several regexes searched as one alternation of named groups.
+
+    ``scan`` reports which signal regexes occur in a text and collects every
+    non-overlapping entity match, with the same results as running
+    ``signal.search`` for each signal and ``entities.findall`` separately.
+
+    The alternation only reports the first branch that matches at a position,
+    and a consumed match could hide another signal starting inside it, so the
+    scan resumes one char after each hit and checks the still-missing signals
+    there with ``match``. Signals drop out of the alternation once found (the
+    reduced patterns are compiled on first use), so a text costs one pass
+    plus a few restarts at hit positions.
+    """
+
+    ENTITIES = "__entities"
+
+    def __init__(self, signals: Iterable[Tuple[Hashable, Pattern]], entities: Optional[Pattern] = None):
+        self.signals: Dict[Hashable, Pattern] = dict(signals)
+        self.entities = entities
+        self._patterns: Dict[FrozenSet[Hashable], Optional[Pattern]] = {}
+
+    def _fused(self, keys: FrozenSet[Hashable]) -> Optional[Pattern]:
+        try:
+            return self._patterns[keys]
+        except KeyError:
+            pass
+        regexes = [self.entities if key == self.ENTITIES else self.signals[key]
+                   for key in sorted(keys, key=str)]
+        fused = None
+        # Fusing drops per-regex flags and renumbers groups, so regexes with
+        # flags or backreferences fall back to separate passes
+        if all(regex.flags == re.UNICODE and not _BACKREFERENCE.search(regex.pattern) for regex in regexes):
+            try:
+                # Group names are generated, so rule names need not be identifiers
+                alternation = "|".join(f"(?P<_fused{index}>{regex.pattern})"
+                                       for index, regex in enumerate(regexes))
+                # re only skips ahead by first char for literal-led branches, so
+                # lead with the union of first chars to skip dead positions fast
+                firsts = [_first_chars(regex) for regex in regexes]
+                if all(firsts):
+                    alternation = f"(?=[{''.join(dict.fromkeys(firsts))}])(?:{alternation})"
+                fused = re.compile(alternation)
+            except re.error:
+                pass  # e.g. inline global flags mid-pattern
+        self._patterns[keys] = fused
+        return fused
+
+    def scan(self, text: str, keys: Iterable[Hashable] = None, entities: bool = True,
+             entity_spans: List[Tuple[int, int]] = None) -> Tuple[Dict[Hashable, Tuple[int, int]], List[str]]:
+        """Return the signals in ``keys`` (default: all) found in ``text`` and the entity matches.
+
+        Signals map to the span of their first match. When ``entity_spans`` is
+        given, the span of every entity match is appended to it.
+        """
+        pending = set(self.signals if keys is None else keys)
+        entities = self.entities if entities else None
+        found: Dict[Hashable, Tuple[int, int]] = {}
+        accounts: List[str] = []
+        entity_end = 0
+        pos = 0
+
+        while pending:
+            fused = self._fused(frozenset(pending) | ({self.ENTITIES} if entities else frozenset()))
+            if fused is None:
+                return self._scan_each(text, pending, found, accounts, entities, pos, entity_end, entity_spans)
+            match = fused.search(text, pos)
+            if match is None:
+                return found, accounts
+            start = match.start()
+            for key in list(pending):
+                signal = self.signals[key].match(text, start)
+                if signal is not None:
+                    found[key] = signal.span()
+                    pending.discard(key)
+            if entities is not None and start >= entity_end:
+                entity = entities.match(text, start)
+                if entity is not None:
+                    accounts.append(_findall_item(entity))
+                    entity_end = entity.end()
+                    if entity_spans is not None:
+                        entity_spans.append(entity.span())
+            pos = start + 1
+
+        if entities is not None:
+            self._find_entities(text, max(pos, entity_end), entities, accounts, entity_spans)
+        return found, accounts
+
+    def _scan_each(self, text, pending, found, accounts, entities, pos, entity_end, entity_spans):
+        for key in pending:
+            signal = self.signals[key].search(text, pos)
+            if signal is not None:
+                found[key] = signal.span()
+        if entities is not None:
+            self._find_entities(text, max(pos, entity_end), entities, accounts, entity_spans)
+        return found, accounts
+
+    @staticmethod
+    def _find_entities(text, pos, entities, accounts, entity_spans):
+        if entity_spans is None:
+            accounts.extend(entities.findall(text, pos))
+            return
+        for entity in entities.finditer(text, pos):
+            accounts.append(_findall_item(entity))
+            entity_spans.append(entity.span())
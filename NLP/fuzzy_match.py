@@ -0,0 +1,168 @@
+"""Obfuscation-tolerant keyword matching.
+
+``FuzzyMatcher`` finds keys in a ``fold_message`` text that occur exactly or
+within a few edits (Levenshtein: one insertion, deletion or substitution
+each). Candidates come from the pigeonhole principle: a key split into
+``max_edits + 1`` pieces keeps at least one piece intact under ``max_edits``
+edits, so one Aho-Corasick scan for every piece finds every place a key can
+be, and only those few places are checked: with one edit allowed by
+comparing the rest of the key around the first mismatch, otherwise with a
+banded edit distance.
+A text costs one automaton pass plus the checks, independent of the number
+of keys.
+"""
+from typing import Hashable, Iterable, Set, Tuple
+
+try:
+    from .aho_corasick import Automaton
+    from .normalizer import fold_message
+except ImportError:  # running as standalone script
+    from aho_corasick import Automaton
+    from normalizer import fold_message
+
+
+def _one_edit_prefix(rest: str, text: str) -> bool:
+    """Whether some prefix of ``text`` is at most one edit away from ``rest``."""
+    if text.startswith(rest):
+        return True
+    index = 0
+    while index < len(rest) and index < len(text) and rest[index] == text[index]:
+        index += 1
+    tail = rest[index + 1:]
+    return (text.startswith(tail, index + 1)  # rest[index] replaced
+            or text.startswith(tail, index)  # rest[index] left out
+            or text.startswith(rest[index:], index + 1))  # a char inserted before it
+
+
+def within_edits(key: str, text: str, start: int, max_edits: int) -> bool:
+    """Whether some substring of ``text`` starting within ``max_edits`` of ``start``
+    is at most ``max_edits`` edits away from ``key``.
+
+    Only the diagonal band such an alignment can use is computed, about
+    ``len(key) * (4 * max_edits + 1)`` cells; distances are capped at
+    ``max_edits + 1``.
+    """
+    low = max(0, start - max_edits)
+    window = text[low:start + len(key) + 2 * max_edits]
+    shift = start - low
+    width = len(window)
+    cap = max_edits + 1
+
+    previous = [cap] * (width + 1)
+    for j in range(max(0, shift - max_edits), min(width, shift + 2 * max_edits) + 1):
+        # The key may start anywhere within max_edits of start, or later
+        # after skipping text chars as insertions
+        previous[j] = max(0, j - shift - max_edits)
+    for i, ch in enumerate(key, 1):
+        first = max(0, shift + i - 2 * max_edits)
+        last = min(width, shift + i + 2 * max_edits)
+        if first > last:
+            return False
+        current = [cap] * (width + 1)
+        best = cap
+        for j in range(first, last + 1):
+            value = previous[j] + 1
+            if j:
+                diagonal = previous[j - 1] + (ch != window[j - 1])
+                left = current[j - 1] + 1
+                if diagonal < value:
+                    value = diagonal
+                if left < value:
+                    value = left
+            if value < cap:
+                current[j] = value
+                if value < best:
+                    best = value
+        if best >= cap:
+            return False
+        previous = current
+    return True
+
+
+class FuzzyMatcher:
+    """Keys matched against folded text, exactly or within ``max_edits`` edits.
+
+    ``entries`` are ``(key, label)`` pairs; keys are folded with
+    ``fold_message`` here, texts must be folded by the caller. Keys shorter
+    than ``min_length`` folded chars only match exactly, since a few edits
+    would turn them into common words.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, Hashable]], max_edits: int = 1, min_length: int = 6):
+        self.max_edits = max_edits
+        self.min_length = min_length
+        self.keys = []
+        self.key_labels = []
+        # Per automaton label: the key it belongs to, where the piece starts
+        # in the key (-1 for a whole key) and its length; with one edit, the
+        # key has two pieces and the other one is checked as ``piece_rests``
+        # (the text after the head, or the text before the tail reversed)
+        self.piece_keys = []
+        self.piece_offsets = []
+        self.piece_lengths = []
+        self.piece_rests = []
+        pieces = []
+        for key, label in dict.fromkeys((fold_message(key), label) for key, label in entries):
+            if not key:
+                continue
+            key_id = len(self.keys)
+            self.keys.append(key)
+            self.key_labels.append(label)
+            pieces.append((key, self._add_piece(key_id, -1, len(key))))
+            if max_edits and len(key) >= min_length:
+                parts = max_edits + 1
+                bounds = [len(key) * part // parts for part in range(parts + 1)]
+                for begin, end in zip(bounds, bounds[1:]):
+                    pieces.append((key[begin:end], self._add_piece(key_id, begin, end - begin)))
+        self.labels = set(self.key_labels)
+        self.automaton = Automaton(pieces)
+
+    def _add_piece(self, key_id: int, offset: int, length: int) -> int:
+        key = self.keys[key_id]
+        self.piece_keys.append(key_id)
+        self.piece_offsets.append(offset)
+        self.piece_lengths.append(length)
+        self.piece_rests.append(key[length:] if offset == 0 else key[:offset][::-1])
+        return len(self.piece_keys) - 1
+
+    def find(self, text: str) -> Set[Hashable]:
+        """Labels of every key found in the folded ``text``."""
+        found = set()
+        checked = set()
+        keys = self.keys
+        key_labels = self.key_labels
+        piece_keys = self.piece_keys
+        piece_offsets = self.piece_offsets
+        piece_lengths = self.piece_lengths
+        piece_rests = self.piece_rests
+        one_edit = self.max_edits == 1
+        for end, pieces in self.automaton.iter_hits(text):
+            for piece in pieces:
+                key_id = piece_keys[piece]
+                label = key_labels[key_id]
+                if label in found:
+                    continue
+                offset = piece_offsets[piece]
+                if offset < 0:
+                    found.add(label)
+                    continue
+                if one_edit:
+                    rest = piece_rests[piece]
+                    if offset == 0:
+                        near = _one_edit_prefix(rest, text[end:end + len(rest) + 1])
+                    else:
+                        before = end - piece_lengths[piece]
+                        near = _one_edit_prefix(rest, text[max(0, before - len(rest) - 1):before][::-1])
+                    if near:
+                        found.add(label)
+                    continue
+                # Where the key would start if everything before the piece were intact
+                start = end - piece_lengths[piece] - offset
+                if (key_id, start) in checked:
+                    continue
+                checked.add((key_id, start))
+                if within_edits(keys[key_id], text, start, self.max_edits):
+                    found.add(label)
+            if len(found) == len(self.labels):
+                break
+        return found
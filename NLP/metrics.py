@@ -0,0 +1,174 @@
+"""Low-overhead latency histograms and rule-hit counters for the scoring pipeline.
+
+Collection is off unless ``UNSCAMABLE_METRICS=1`` is set or ``METRICS.enable()``
+is called; while off, every hook is a single no-op call. While on, hit
+counters are exact and stage timings are taken on one call in
+``sample_every`` (``UNSCAMABLE_METRICS_SAMPLE``, default 16) to keep the
+added latency under a couple of percent. Stages nested in a timed call
+(``find_all`` under the ``/analyze`` route) take the caller's stopwatch as
+``parent``, so a request is timed in all of its stages or in none.
+"""
+import os
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from time import perf_counter
+
+# Exponential bucket bounds from 1 microsecond to ~8 seconds
+BUCKETS = tuple(1e-6 * 2 ** i for i in range(24))
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound below which a ``q`` fraction of observations fall."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(BUCKETS, self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class _NullStopwatch:
+    __slots__ = ()
+
+    def lap(self, stage: str):
+        pass
+
+
+NULL_STOPWATCH = _NullStopwatch()
+
+
+class Stopwatch:
+    __slots__ = ("_registry", "_group", "_last")
+
+    def __init__(self, registry, group: str):
+        self._registry = registry
+        self._group = group
+        self._last = perf_counter()
+
+    def lap(self, stage: str):
+        """Record the time since the previous lap (or creation) under ``stage``."""
+        now = perf_counter()
+        self._registry.observe(self._group, stage, now - self._last)
+        self._last = now
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = False, sample_every: int = 16):
+        self.enabled = enabled
+        self.sample_every = max(1, sample_every)
+        self._tick = 0
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.scored = defaultdict(int)
+        self.hits = {}
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+
+    def stopwatch(self, group: str, parent=None):
+        """A stopwatch for one call through ``group``, or a no-op one when not sampled.
+
+        With a ``parent`` stopwatch the call is sampled exactly when the
+        parent is, and no new sampling decision is made.
+        """
+        if not self.enabled:
+            return NULL_STOPWATCH
+        if parent is not None:
+            return NULL_STOPWATCH if parent is NULL_STOPWATCH else Stopwatch(self, group)
+        self._tick += 1
+        if self._tick % self.sample_every:
+            return NULL_STOPWATCH
+        return Stopwatch(self, group)
+
+    def observe(self, group: str, stage: str, seconds: float):
+        key = (group, stage)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        histogram.observe(seconds)
+
+    def count_hits(self, engine: str, rules):
+        """Count one scored input for ``engine`` and one hit per rule in ``rules``."""
+        if not self.enabled:
+            return
+        self.scored[engine] += 1
+        hits = self.hits.get(engine)
+        if hits is None:
+            with self._lock:
+                hits = self.hits.setdefault(engine, defaultdict(int))
+        for rule in rules:
+            hits[rule] += 1
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.scored = defaultdict(int)
+            self.hits = {}
+
+    def snapshot(self) -> dict:
+        """Plain-dict view of every histogram (with p50/p99) and counter."""
+        stages = {}
+        for (group, stage), histogram in sorted(self.histograms.items()):
+            stages.setdefault(group, {})[stage] = {
+                "count": histogram.count,
+                "sum_seconds": histogram.total,
+                "p50_seconds": histogram.quantile(0.5),
+                "p99_seconds": histogram.quantile(0.99),
+            }
+        return {
+            "enabled": self.enabled,
+            "stages": stages,
+            "scored": dict(self.scored),
+            "hits": {engine: dict(hits) for engine, hits in self.hits.items()},
+        }
+
+    def render_prometheus(self) -> str:
+        lines = ["# TYPE unscamable_stage_seconds histogram"]
+        for (group, stage), histogram in sorted(self.histograms.items()):
+            labels = f'group="{_escape(group)}",stage="{_escape(stage)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'unscamable_stage_seconds_bucket{{{labels},le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'unscamable_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"unscamable_stage_seconds_sum{{{labels}}} {histogram.total:.9f}")
+            lines.append(f"unscamable_stage_seconds_count{{{labels}}} {histogram.count}")
+
+        lines.append("# TYPE unscamable_scored_total counter")
+        for engine, value in sorted(self.scored.items()):
+            lines.append(f'unscamable_scored_total{{engine="{_escape(engine)}"}} {value}')
+        lines.append("# TYPE unscamable_rule_hits_total counter")
+        for engine, hits in sorted(self.hits.items()):
+            for rule, value in sorted(hits.items()):
+                lines.append(
+                    f'unscamable_rule_hits_total{{engine="{_escape(engine)}",rule="{_escape(rule)}"}} {value}'
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = MetricsRegistry(
+    enabled=os.environ.get("UNSCAMABLE_METRICS") == "1",
+    sample_every=int(os.environ.get("UNSCAMABLE_METRICS_SAMPLE", 16)),
+)
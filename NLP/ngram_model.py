@@ -0,0 +1,216 @@
+"""Hashed character-n-gram logistic model for messages the rules leave ambiguous.
+
+Texts are folded with ``fold_message`` (so spacing and look-alike tricks do
+not change the features) and every char n-gram of the configured orders is
+hashed into one of ``2 ** bits`` buckets; a message's features are its
+bucket counts scaled by ``1 / sqrt(n-grams)``. Hashing and scoring are
+vectorized with NumPy over a whole batch, which is where the model pays off:
+one ``predict_proba`` call over a few hundred messages costs about as much
+as a handful of single-message calls.
+
+NumPy is optional; without it the model cannot be trained or loaded and
+``NLP.cascade`` scores with the rules alone.
+
+    python -m NLP.ngram_model train model.npz                    # seed corpus
+    python -m NLP.ngram_model train model.npz --corpus labeled.jsonl
+"""
+import argparse
+import hashlib
+import os
+import sys
+from typing import List, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # optional: only the second scoring stage needs it
+    np = None
+
+try:
+    from .normalizer import fold_message
+    from .scam_messages import MESSAGES
+except ImportError:  # running as standalone script
+    from normalizer import fold_message
+    from scam_messages import MESSAGES
+
+DEFAULT_BITS = 18
+DEFAULT_ORDERS = (2, 3, 4)
+
+# Ordinary messages to train against MESSAGES when no labeled corpus is
+# given, including legitimate notices that share words with scams
+BENIGN_MESSAGES = [
+    "สวัสดีครับ วันนี้สะดวกคุยไหม",
+    "ขอบคุณมากค่ะ ได้รับของแล้ว",
+    "พรุ่งนี้เจอกันที่ร้านกาแฟนะ",
+    "ส่งรูปสินค้าให้ดูหน่อยได้ไหมครับ",
+    "ตอนนี้รถติดมาก อาจจะไปสายนิดหน่อย",
+    "เย็นนี้กินข้าวด้วยกันไหม",
+    "ถึงบ้านแล้วนะ ขอบคุณที่มาส่ง",
+    "ประชุมเลื่อนไปบ่ายสามโมงนะครับ",
+    "แม่ฝากซื้อนมกับไข่ด้วยนะ",
+    "รูปสวยมากเลย ไปเที่ยวที่ไหนมา",
+    "พัสดุของคุณจัดส่งสำเร็จแล้ว ขอบคุณที่ใช้บริการ",
+    "ยอดเงินเข้าบัญชี 1,500 บาท จากการโอนของเพื่อน",
+    "ร้านเปิดเก้าโมงถึงสองทุ่มทุกวันค่ะ",
+    "ค่าไฟเดือนนี้จ่ายแล้วนะ เก็บใบเสร็จไว้ให้แล้ว",
+    "วันเสาร์นี้ว่างไหม ไปดูหนังกัน",
+    "ขอเลขบัญชีร้านหน่อยครับ จะโอนค่าอาหารให้",
+    "ได้รับเงินคืนจากร้านแล้ว ขอบคุณค่ะ",
+    "นัดหมอฟันวันจันทร์สิบโมงเช้า",
+    "Hi, is this still available?",
+    "Thanks, see you tomorrow at the station.",
+    "Could you send me the size chart please?",
+    "The weather has been great this week.",
+    "Let me check with my team and get back to you.",
+    "Your order has been delivered. Thank you for shopping with us.",
+    "Meeting moved to 3pm, same room.",
+    "Happy birthday! Hope you have a great day.",
+    "I paid the electricity bill, receipt is on the table.",
+    "Can you pick up the kids after school today?",
+]
+
+# 64-bit FNV prime for the rolling n-gram hash, then Fibonacci hashing
+# (multiply and keep the top bits) to pick a bucket
+_PRIME = 0x100000001B3
+_FIBONACCI = 0x9E3779B97F4A7C15
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("the n-gram model needs NumPy: pip install numpy")
+
+
+def ngram_buckets(texts: Sequence[str], orders: Sequence[int], bits: int):
+    """``(doc_ids, buckets)``: one entry per char n-gram of every folded text."""
+    joined = "\0".join(fold_message(text) for text in texts)  # "\0" never survives folding
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype="<u4").astype(np.uint64)
+    separator = codes == 0
+    # Index of the text each position belongs to; a separator starts the next one
+    docs = np.cumsum(separator)
+    prime = np.uint64(_PRIME)
+    doc_ids = [np.zeros(0, dtype=np.intp)]
+    buckets = [np.zeros(0, dtype=np.intp)]
+    for order in orders:
+        count = len(codes) - order + 1
+        if count <= 0:
+            continue
+        hashed = np.full(count, order, dtype=np.uint64)
+        for offset in range(order):
+            hashed = hashed * prime + codes[offset:offset + count]  # wraps mod 2**64
+        # Keep n-grams that neither start on nor span a separator
+        valid = ~separator[:count] & (docs[:count] == docs[order - 1:])
+        doc_ids.append(docs[:count][valid].astype(np.intp))
+        buckets.append(((hashed[valid] * np.uint64(_FIBONACCI)) >> np.uint64(64 - bits)).astype(np.intp))
+    return np.concatenate(doc_ids), np.concatenate(buckets)
+
+
+class NgramModel:
+    """Logistic regression over hashed char n-grams; ``weights`` has ``2 ** bits`` entries."""
+
+    def __init__(self, weights, bias: float = 0.0, orders: Sequence[int] = DEFAULT_ORDERS):
+        _require_numpy()
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bits = len(self.weights).bit_length() - 1
+        if len(self.weights) != 1 << self.bits:
+            raise ValueError("weights must have a power-of-two length")
+        self.bias = float(bias)
+        self.orders = tuple(int(order) for order in orders)
+        digest = hashlib.sha256(self.weights.tobytes())
+        digest.update(repr((self.bias, self.orders)).encode())
+        self.version = digest.hexdigest()[:12]
+
+    def logits(self, texts: Sequence[str]):
+        doc_ids, buckets = ngram_buckets(texts, self.orders, self.bits)
+        totals = np.bincount(doc_ids, minlength=len(texts))
+        sums = np.bincount(doc_ids, weights=self.weights[buckets], minlength=len(texts))
+        return self.bias + sums / np.sqrt(np.maximum(totals, 1))
+
+    def predict_proba(self, texts: Sequence[str]):
+        """Scam probability of each text, as a float array."""
+        return 1.0 / (1.0 + np.exp(-self.logits(texts)))
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as fh:
+            np.savez(fh, weights=self.weights, bias=np.float64(self.bias), orders=np.asarray(self.orders))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "NgramModel":
+        _require_numpy()
+        with np.load(path) as data:
+            return cls(data["weights"], float(data["bias"]), data["orders"].tolist())
+
+
+def train(texts: Sequence[str], labels: Sequence[int], bits: int = DEFAULT_BITS,
+          orders: Sequence[int] = DEFAULT_ORDERS, epochs: int = 200,
+          learning_rate: float = 0.5, l2: float = 1e-4) -> NgramModel:
+    """Fit a model with full-batch AdaGrad on the logistic loss (labels: 1 scam, 0 benign)."""
+    _require_numpy()
+    doc_ids, buckets = ngram_buckets(texts, orders, bits)
+    y = np.asarray(labels, dtype=np.float64)
+    scale = 1.0 / np.sqrt(np.maximum(np.bincount(doc_ids, minlength=len(texts)), 1))
+    gram_scale = scale[doc_ids]
+    dim = 1 << bits
+    weights = np.zeros(dim)
+    bias = 0.0
+    weight_sq = np.zeros(dim)
+    bias_sq = 0.0
+    for _ in range(epochs):
+        logits = bias + np.bincount(doc_ids, weights=weights[buckets] * gram_scale, minlength=len(texts))
+        error = 1.0 / (1.0 + np.exp(-logits)) - y
+        grad = np.bincount(buckets, weights=error[doc_ids] * gram_scale, minlength=dim) / len(texts)
+        grad += l2 * weights
+        grad_bias = error.mean()
+        weight_sq += grad * grad
+        bias_sq += grad_bias * grad_bias
+        weights -= learning_rate * grad / (np.sqrt(weight_sq) + 1e-8)
+        bias -= learning_rate * grad_bias / (bias_sq ** 0.5 + 1e-8)
+    return NgramModel(weights, bias, orders)
+
+
+def seed_corpus():
+    """``(texts, labels)`` from ``MESSAGES`` and ``BENIGN_MESSAGES``."""
+    texts = list(MESSAGES) + BENIGN_MESSAGES
+    return texts, [1] * len(MESSAGES) + [0] * len(BENIGN_MESSAGES)
+
+
+def read_corpus(path: str, text_field: str = "text", label_field: str = "label"):
+    """``(texts, labels)`` from a JSONL/CSV file (optionally .gz); labels are 1 for scam, 0 otherwise."""
+    try:
+        from .bulk_score import read_rows
+    except ImportError:  # running as standalone script
+        from bulk_score import read_rows
+    texts: List[str] = []
+    labels: List[int] = []
+    for row in read_rows(path):
+        texts.append(row.get(text_field) or "")
+        labels.append(int(row[label_field]))
+    return texts, labels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the n-gram model for the second scoring stage.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fit = sub.add_parser("train", help="train a model and write it as .npz")
+    fit.add_argument("path")
+    fit.add_argument("--corpus", help="labeled JSONL/CSV (default: MESSAGES plus a benign seed set)")
+    fit.add_argument("--text-field", default="text")
+    fit.add_argument("--label-field", default="label")
+    fit.add_argument("--bits", type=int, default=DEFAULT_BITS, help="log2 of the number of hash buckets")
+    fit.add_argument("--epochs", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        texts, labels = read_corpus(args.corpus, args.text_field, args.label_field)
+    else:
+        texts, labels = seed_corpus()
+    model = train(texts, labels, bits=args.bits, epochs=args.epochs)
+    model.save(args.path)
+
+    predicted = model.predict_proba(texts) >= 0.5
+    accuracy = float((predicted == np.asarray(labels, dtype=bool)).mean()) if texts else 0.0
+    print(f"{model.version}: {len(texts)} messages, training accuracy {accuracy:.3f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
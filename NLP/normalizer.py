@@ -0,0 +1,153 @@
+"""Message normalization with a map back to the original text.
+
+``normalize_message`` drops every char that is not alphanumeric (whitespace,
+punctuation, and also Thai vowel and tone marks) through a ``str.translate``
+table. ``normalize_with_offsets`` produces the same string together with an
+``OffsetMap``, so a keyword hit in the normalized text can be reported as a
+span of the original message for highlighting. ``fold_message`` goes
+further for fuzzy matching and also folds case, compatibility forms and
+look-alike letters.
+"""
+import re
+import unicodedata
+from array import array
+from bisect import bisect_right
+from typing import Tuple
+
+
+class _DropTable(dict):
+    """``str.translate`` table deleting non-alphanumeric chars, filled on first sight."""
+
+    def __missing__(self, code: int):
+        value = code if chr(code).isalnum() else None
+        self[code] = value
+        return value
+
+
+_DROP_TABLE = _DropTable()
+# Precompute ASCII, Latin-1 and the Thai block; anything else is added lazily
+for _code in list(range(0x100)) + list(range(0x0E00, 0x0E80)):
+    _DROP_TABLE[_code]
+
+# Runs of the chars the table drops; ``\w`` is exactly isalnum() plus "_"
+_DROPPED_RUN = re.compile(r"[\W_]+")
+
+
+def normalize_message(text: str) -> str:
+    """Strip whitespace and punctuation so comparisons ignore spacing/separators."""
+    return text.translate(_DROP_TABLE)
+
+
+# Look-alike letters from other scripts, after case folding, to the Latin
+# letter they imitate; Thai digits to ASCII ones
+CONFUSABLES = {
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h", "о": "o",
+    "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "і": "i", "ї": "i", "ј": "j",
+    "ѕ": "s", "ԁ": "d", "ԛ": "q", "ԝ": "w", "ү": "y", "һ": "h",
+    # Greek
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o",
+    "ρ": "p", "τ": "t", "υ": "u", "χ": "x", "ω": "w",
+    # Latin variants NFKC leaves alone
+    "ɡ": "g", "ı": "i",
+    **{chr(0x0E50 + digit): str(digit) for digit in range(10)},
+}
+
+
+# Case-folded look-alikes, found with one regex search so most texts skip the translate
+_CONFUSABLE_CHARS = re.compile(f"[{''.join(CONFUSABLES)}]")
+_CONFUSABLE_TABLE = str.maketrans(CONFUSABLES)
+
+
+def fold_message(text: str, normalized: str = None) -> str:
+    """Canonical form for obfuscation-tolerant matching.
+
+    On top of ``normalize_message`` (which already drops spaces, dots,
+    zero-width chars and Thai tone and vowel marks) this applies case folding,
+    NFKC, so full-width and styled letters become plain ones, and
+    ``CONFUSABLES``. Callers that already hold ``normalize_message(text)``
+    pass it as ``normalized``. Unlike ``normalize_message`` it keeps no
+    offset map.
+    """
+    if normalized is None:
+        normalized = normalize_message(text)
+    # SARA AM decomposes to NIKHAHIT (a dropped mark) + SARA AA under NFKC;
+    # replacing it up front keeps most Thai text on the already-NFKC path
+    folded = normalized.casefold().replace("\u0e33", "\u0e32")
+    if not unicodedata.is_normalized("NFKC", folded):
+        # Decomposition can bring back chars normalize_message drops (e.g. "½")
+        folded = normalize_message(unicodedata.normalize("NFKC", folded).casefold())
+    if _CONFUSABLE_CHARS.search(folded):
+        folded = folded.translate(_CONFUSABLE_TABLE)
+    return folded
+
+
+class OffsetMap:
+    """Maps indexes of a text with chars removed back to the original text.
+
+    Only the places where a run of chars was removed are stored: ``starts``
+    holds the first index after each run and ``shifts`` how many chars had
+    been removed up to there, both as unsigned int arrays.
+    """
+
+    __slots__ = ("starts", "shifts")
+
+    def __init__(self, starts: array = None, shifts: array = None):
+        self.starts = starts if starts is not None else array("I")
+        self.shifts = shifts if shifts is not None else array("I")
+
+    def original(self, index: int) -> int:
+        run = bisect_right(self.starts, index) - 1
+        return index + self.shifts[run] if run >= 0 else index
+
+    def span(self, start: int, end: int) -> Tuple[int, int]:
+        """Original-text span covering the chars ``start:end`` of the reduced text."""
+        if end <= start:
+            position = self.original(start)
+            return position, position
+        return self.original(start), self.original(end - 1) + 1
+
+
+def normalize_with_offsets(text: str) -> Tuple[str, OffsetMap]:
+    """``normalize_message(text)`` plus the map from its indexes back into ``text``."""
+    offsets = OffsetMap()
+    pieces = []
+    removed = 0
+    last = 0
+    for run in _DROPPED_RUN.finditer(text):
+        start, end = run.span()
+        pieces.append(text[last:start])
+        offsets.starts.append(start - removed)
+        removed += end - start
+        offsets.shifts.append(removed)
+        last = end
+    pieces.append(text[last:])
+    return "".join(pieces), offsets
+
+
+def lower_offsets(text: str, lowered: str):
+    """Map from ``lowered`` (``text.lower()``) back to ``text``, or None when every index is kept."""
+    if len(lowered) == len(text):
+        return None
+    # A few chars lower to two (e.g. "İ"); rare enough to map index by index
+    return IndexMap(array("I", (index for index, ch in enumerate(text) for _ in ch.lower())))
+
+
+class IndexMap:
+    """Index-by-index form of ``OffsetMap`` for texts that grew."""
+
+    __slots__ = ("indexes",)
+
+    def __init__(self, indexes: array):
+        self.indexes = indexes
+
+    def original(self, index: int) -> int:
+        if index >= len(self.indexes):
+            return self.indexes[-1] + 1 + index - len(self.indexes) if self.indexes else index
+        return self.indexes[index]
+
+    def span(self, start: int, end: int) -> Tuple[int, int]:
+        if end <= start:
+            position = self.original(start)
+            return position, position
+        return self.original(start), self.original(end - 1) + 1
@@ -0,0 +1,329 @@
+"""Entity reputation: bank accounts, Thai phone numbers and URL domains checked
+against large blocklists kept in a memory-mapped index.
+
+``extract_entities`` pulls the entities out of a message in canonical form
+(``account:<digits>``, ``phone:0<digits>``, ``domain:<host>``).
+``ReputationIndex`` answers whether one is listed.
+
+The index is a sorted array of 64-bit BLAKE2b hashes of the listed keys, a
+prefix table that narrows a lookup to the few hashes sharing the top
+``prefix_bits`` bits, and the keys themselves (offsets plus one UTF-8 blob)
+so a hash hit is confirmed exactly. A lookup touches a couple of pages of
+the map and no Python objects are built per entry, so an index of tens of
+millions of entries costs microseconds per lookup and only the pages it
+touches in RSS; worker processes share them through the page cache.
+
+Layout: the 8-byte ``MAGIC``, a little-endian u32 header length, a UTF-8
+JSON header, then 8-byte aligned sections (as in ``NLP.rule_artifact``).
+
+``REPUTATION`` is loaded from ``UNSCAMABLE_REPUTATION`` (None when unset).
+Indexes are rebuilt offline, with bounded memory whatever the list sizes:
+
+    python -m NLP.reputation build index.bin --accounts mules.txt.gz --phones phones.txt --domains domains.txt
+    python -m NLP.reputation check index.bin "โอนเข้า 123-4-56789-0 ด่วน"
+"""
+import argparse
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from .text_io import open_text
+    from .scam_patterns import BANK_REGEX
+except ImportError:  # running as standalone script
+    from text_io import open_text
+    from scam_patterns import BANK_REGEX
+
+MAGIC = b"UNSCREP1"
+ALIGN = 8
+
+# Mobile (0[689]x-xxx-xxxx) and Bangkok/provincial landline (0[2-7]x-xxx-xxx)
+# numbers, optionally written with +66 instead of the leading 0; the leading
+# lookahead lets re skip to candidate chars
+PHONE_REGEX = re.compile(
+    r"(?=[+60])(?<![\d+])(?:\+?66[-\s]?|0)(?:[689]\d[-\s]?\d{3}[-\s]?\d{4}|[2-7][-\s]?\d{3}[-\s]?\d{3,4})(?!\d)"
+)
+# Hosts of the links ``REGEX["url"]`` flags (scheme, www., shorteners, bare
+# domains such as x.xyz); the host is captured without the port or path.
+# Matches only start at a word start, so long Thai runs are not rescanned
+URL_HOST_REGEX = re.compile(r"(?<![\w.-])(?:https?://)?((?:[\w-]+\.)+[^\W\d_]{2,63})(?![\w-])")
+
+_NON_DIGITS = re.compile(r"\D+")
+
+LISTED_WEIGHT = 40
+LISTED_FLAG = "พบข้อมูลในบัญชีดำ"
+
+
+def canonical_account(value: str) -> str:
+    return "account:" + _NON_DIGITS.sub("", value)
+
+
+def canonical_phone(value: str) -> str:
+    digits = _NON_DIGITS.sub("", value)
+    if digits.startswith("66") and len(digits) in (10, 11):
+        digits = "0" + digits[2:]
+    return "phone:" + digits
+
+
+def canonical_domain(value: str) -> str:
+    host = value.strip().lower().rstrip(".")
+    if "://" in host:
+        host = host.split("://", 1)[1]
+    host = re.split(r"[/:?#]", host, 1)[0]
+    if host.startswith("www."):
+        host = host[4:]
+    return "domain:" + host
+
+
+CANONICAL = {"account": canonical_account, "phone": canonical_phone, "domain": canonical_domain}
+
+
+def extract_entities(text: str, accounts: Iterable[str] = None) -> List[str]:
+    """Canonical keys of every account, phone number and domain in ``text``.
+
+    Callers that already ran ``BANK_REGEX.findall`` pass its result as
+    ``accounts``. A domain also yields its parent domains (``a.evil.xyz``
+    gives ``evil.xyz``), so a listed domain covers its subdomains.
+    """
+    if accounts is None:
+        accounts = BANK_REGEX.findall(text)
+    keys = [canonical_account(account) for account in accounts]
+    keys.extend(canonical_phone(match.group()) for match in PHONE_REGEX.finditer(text))
+    for match in URL_HOST_REGEX.finditer(text):
+        host = canonical_domain(match.group(1))[len("domain:"):]
+        labels = host.split(".")
+        keys.extend("domain:" + ".".join(labels[index:]) for index in range(len(labels) - 1))
+    return list(dict.fromkeys(keys))
+
+
+def key_hash(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+class ReputationIndex:
+    """Read-only view of a reputation index file, memory-mapped."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        mapped = self._map
+        if mapped[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: not a reputation index")
+        try:
+            (header_size,) = struct.unpack_from("<I", mapped, len(MAGIC))
+        except struct.error:
+            raise ValueError(f"{path}: truncated reputation index")
+        header_start = len(MAGIC) + 4
+        header_bytes = mapped[header_start:header_start + header_size]
+        header = json.loads(header_bytes.decode("utf-8"))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path}: built for {header['byteorder']}-endian machines")
+        base = header_start + header_size
+        base += -base % ALIGN
+
+        view = memoryview(mapped)
+        sections = {}
+        for name, section in header["sections"].items():
+            data = view[base + section["offset"]:base + section["offset"] + section["size"]]
+            sections[name] = data.cast(section["type"]) if section["type"] != "bytes" else data
+        self.count = header["count"]
+        self.prefix_bits = header["prefix_bits"]
+        self.kinds = header["kinds"]
+        self.version = hashlib.sha256(header_bytes).hexdigest()[:12]
+        self._prefix = sections["prefix"]
+        self._hashes = sections["hashes"]
+        self._offsets = sections["offsets"]
+        self._blob = sections["blob"]
+        self._shift = 64 - self.prefix_bits
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, key: str) -> bool:
+        encoded = key.encode("utf-8")
+        hashed = key_hash(encoded)
+        bucket = hashed >> self._shift
+        low, high = self._prefix[bucket], self._prefix[bucket + 1]
+        hashes = self._hashes
+        index = bisect_left(hashes, hashed, low, high)
+        # Equal hashes are confirmed against the stored key
+        while index < high and hashes[index] == hashed:
+            if self._blob[self._offsets[index]:self._offsets[index + 1]] == encoded:
+                return True
+            index += 1
+        return False
+
+    def listed(self, keys: Iterable[str]) -> List[str]:
+        return [key for key in keys if key in self]
+
+    def check(self, text: str, accounts: Iterable[str] = None) -> List[str]:
+        """Listed entities of ``text``, as canonical keys."""
+        return self.listed(extract_entities(text, accounts))
+
+
+def read_entries(path: str) -> Iterator[str]:
+    """Non-empty, non-comment lines of a list file (optionally .gz)."""
+    with open_text(path) as fh:
+        for line in fh:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def _write_run(directory: str, records: List[Tuple[int, str]]) -> str:
+    records.sort()
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".run")
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        for hashed, key in records:
+            fh.write(f"{hashed:016x} {key}\n")
+    return path
+
+
+def _read_run(path: str) -> Iterator[Tuple[int, str]]:
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            hashed, key = line.rstrip("\n").split(" ", 1)
+            yield int(hashed, 16), key
+
+
+def build_index(path: str, sources: Iterable[Tuple[str, Iterable[str]]], chunk_size: int = 1_000_000) -> str:
+    """Write the index of ``sources`` (``(kind, values)`` pairs) to ``path``; returns its version.
+
+    Entries are hashed and sorted in runs of ``chunk_size`` on disk next to
+    ``path`` and merged, so memory stays bounded however long the lists are.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryDirectory(dir=directory) as work:
+        runs = []
+        records = []
+        kinds: Dict[str, int] = {}
+        total = 0
+        for kind, values in sources:
+            canonical = CANONICAL[kind]
+            for value in values:
+                key = canonical(value)
+                records.append((key_hash(key.encode("utf-8")), key))
+                kinds[kind] = kinds.get(kind, 0) + 1
+                total += 1
+                if len(records) >= chunk_size:
+                    runs.append(_write_run(work, records))
+                    records = []
+        if records:
+            runs.append(_write_run(work, records))
+
+        # About 16 hashes per prefix bucket, capped at a 2**24-entry table
+        prefix_bits = min(24, (total // 16).bit_length())
+        bucket_counts = array("I", bytes(4 * ((1 << prefix_bits) + 1)))  # +1: the end
+        count = 0
+        blob_size = 0
+        previous = None
+        with open(os.path.join(work, "hashes"), "wb") as hashes_fh, \
+                open(os.path.join(work, "offsets"), "wb") as offsets_fh, \
+                open(os.path.join(work, "blob"), "wb") as blob_fh:
+            hashes = array("Q")
+            offsets = array("Q", [0])
+            for hashed, key in heapq.merge(*(_read_run(run) for run in runs)):
+                if (hashed, key) == previous:
+                    continue
+                previous = (hashed, key)
+                encoded = key.encode("utf-8")
+                blob_fh.write(encoded)
+                blob_size += len(encoded)
+                hashes.append(hashed)
+                offsets.append(blob_size)
+                bucket_counts[hashed >> (64 - prefix_bits)] += 1
+                count += 1
+                if len(hashes) >= 65536:
+                    hashes.tofile(hashes_fh)
+                    offsets.tofile(offsets_fh)
+                    hashes = array("Q")
+                    offsets = array("Q")
+            hashes.tofile(hashes_fh)
+            offsets.tofile(offsets_fh)
+
+        # Bucket counts to start indexes, with the end as the last entry
+        prefix = array("I" if count < 1 << 32 else "Q", accumulate(bucket_counts[:-1], initial=0))
+
+        sections = [("prefix", prefix.typecode, None), ("hashes", "Q", "hashes"),
+                    ("offsets", "Q", "offsets"), ("blob", "bytes", "blob")]
+        layout = {}
+        offset = 0
+        for name, typecode, filename in sections:
+            size = len(prefix) * prefix.itemsize if filename is None else os.path.getsize(os.path.join(work, filename))
+            layout[name] = {"offset": offset, "size": size, "type": typecode}
+            offset += size + (-size % ALIGN)
+
+        header = {"byteorder": sys.byteorder, "count": count, "prefix_bits": prefix_bits,
+                  "kinds": kinds, "built": time.time(), "sections": layout}
+        header_bytes = json.dumps(header).encode("utf-8")
+        head = MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes
+        head += b"\0" * (-len(head) % ALIGN)
+
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as out:
+            out.write(head)
+            for name, _, filename in sections:
+                if filename is None:
+                    prefix.tofile(out)
+                else:
+                    with open(os.path.join(work, filename), "rb") as section_fh:
+                        shutil.copyfileobj(section_fh, out, 1 << 20)
+                out.write(b"\0" * (-layout[name]["size"] % ALIGN))
+        # Readers (and the next worker start) never see a half-written index
+        os.replace(tmp_path, path)
+    return hashlib.sha256(header_bytes).hexdigest()[:12]
+
+
+def reputation_from_env() -> Optional[ReputationIndex]:
+    path = os.environ.get("UNSCAMABLE_REPUTATION")
+    if not path:
+        return None
+    return ReputationIndex(path)
+
+
+REPUTATION = reputation_from_env()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query an entity reputation index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build an index from list files (one entry per line, .gz ok)")
+    build.add_argument("path")
+    for kind in CANONICAL:
+        build.add_argument(f"--{kind}s", action="append", default=[], metavar="FILE",
+                           help=f"{kind} list (repeatable)")
+    build.add_argument("--chunk-size", type=int, default=1_000_000, help="entries sorted in memory at once")
+    check = sub.add_parser("check", help="print the listed entities of a text")
+    check.add_argument("path")
+    check.add_argument("text")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        sources = [(kind, read_entries(file))
+                   for kind in CANONICAL for file in getattr(args, f"{kind}s")]
+        started = time.perf_counter()
+        version = build_index(args.path, sources, args.chunk_size)
+        index = ReputationIndex(args.path)
+        print(f"{version}: {len(index)} entries {index.kinds} in {time.perf_counter() - started:.1f}s",
+              file=sys.stderr)
+    else:
+        index = ReputationIndex(args.path)
+        for key in index.check(args.text):
+            print(key)
+
+
+if __name__ == "__main__":
+    main()
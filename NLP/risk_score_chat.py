@@ -21,6 +21,8 @@ CATEGORY_LABELS = {
 
 # Set initial chat state 
 class ChatState:
+    __slots__ = ("total_score", "category_counts", "messages_seen", "unique_categories")
+
     def __init__(self):
         self.total_score = 0
         self.category_counts = {}
@@ -72,27 +74,37 @@ def analyze_chat(chat_messages):
         escalation_bonus
     )
 
+# Bonus for a category seen `count` times
+def repetition_bonus(count: int) -> int:
+    if count >= 3:
+        return 15
+    elif count == 2:
+        return 8
+    return 0
+
+# Bonus for `unique_count` distinct categories across the chat
+def escalation_bonus(unique_count: int) -> int:
+    if unique_count >= 3:
+        return 20
+    elif unique_count == 2:
+        return 10
+    return 0
+
 # Function for repetition bonus       
 def apply_repetition_bonus(chat: ChatState):
     repeated_categories = []
     for cat, count in chat.category_counts.items():
-        if count >= 3:
-            chat.total_score += 15
-            repeated_categories.append(cat)
-        elif count == 2:
-            chat.total_score += 8
+        bonus = repetition_bonus(count)
+        if bonus:
+            chat.total_score += bonus
             repeated_categories.append(cat)
     return repeated_categories
 
 # Function for escalation bonus
 def apply_escalation_bonus(chat: ChatState):
-    if len(chat.unique_categories) >= 3:
-        chat.total_score += 20
-        return True
-    elif len(chat.unique_categories) == 2:
-        chat.total_score += 10
-        return True
-    return False
+    bonus = escalation_bonus(len(chat.unique_categories))
+    chat.total_score += bonus
+    return bonus > 0
 
 # Function to build output
 def build_reason(chat, repeated_categories, escalated):
@@ -120,18 +132,19 @@ def build_output(chat, final_score, repeated_categories, escalated):
     }
 
 
-chat = [
-    "พัสดุของคุณไม่สามารถจัดส่งได้",
-    "กรุณายืนยันที่อยู่",
-    "หากไม่ดำเนินการวันนี้ พัสดุจะถูกตีกลับ"
-]
+if __name__ == "__main__":
+    chat = [
+        "พัสดุของคุณไม่สามารถจัดส่งได้",
+        "กรุณายืนยันที่อยู่",
+        "หากไม่ดำเนินการวันนี้ พัสดุจะถูกตีกลับ"
+    ]
 
-risk = analyze_chat(chat)
-print(risk)
+    risk = analyze_chat(chat)
+    print(risk)
 
-chat2 = ["ยังไม่ชำระค่าปรับจราจร ดูรายละเอียด",
-	"คุณมียอดค้างชำระ 5,000 บาท จ่ายบิล",
-	"คุณมียอดค้างชำระ 7,000 บาท ติดต่อ",
-	"คุณมีวงเงินเหลือ ตรวจสอบที่"]
-risk = analyze_chat(chat2)
-print("chat2 result =", risk)
\ No newline at end of file
+    chat2 = ["ยังไม่ชำระค่าปรับจราจร ดูรายละเอียด",
+        "คุณมียอดค้างชำระ 5,000 บาท จ่ายบิล",
+        "คุณมียอดค้างชำระ 7,000 บาท ติดต่อ",
+        "คุณมีวงเงินเหลือ ตรวจสอบที่"]
+    risk = analyze_chat(chat2)
+    print("chat2 result =", risk)
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""Binary rule artifact: a rule set plus its compiled keyword automata.
+
+Layout: the 8-byte ``MAGIC``, a little-endian u32 header length, a UTF-8
+JSON header, then 8-byte aligned sections. The header holds the rule set
+and, for each automaton, its labels and where each array lives. Sections
+hold the raw ``Automaton.to_arrays`` arrays (native byte order, recorded in
+the header) and the transition chars as UTF-32.
+
+``read_artifact`` memory-maps the file. The arrays come back as memoryviews
+over the map, so every process loading the same artifact shares those pages.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b"UNSCRUL1"
+ALIGN = 8
+
+
+def is_artifact(path: str) -> bool:
+    with open(path, "rb") as fh:
+        return fh.read(len(MAGIC)) == MAGIC
+
+
+def write_artifact(path: str, ruleset: dict, matchers: dict):
+    """Write ``ruleset`` and ``matchers`` (name -> ``Automaton``) to ``path`` atomically."""
+    sections = []
+    header = {"byteorder": sys.byteorder, "ruleset": ruleset, "matchers": {}}
+    offset = 0
+    for name, automaton in matchers.items():
+        labels, arrays = automaton.to_arrays()
+        layout = {}
+        for key, value in arrays.items():
+            if isinstance(value, str):
+                data = value.encode("utf-32-le")
+                layout[key] = {"offset": offset, "size": len(data), "type": "str"}
+            else:
+                data = value.tobytes()
+                layout[key] = {"offset": offset, "size": len(data), "type": value.typecode}
+            padding = -len(data) % ALIGN
+            sections.append(data + b"\0" * padding)
+            offset += len(data) + padding
+        header["matchers"][name] = {"labels": labels, "arrays": layout}
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    prefix = MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes
+    prefix += b"\0" * (-len(prefix) % ALIGN)
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as fh:
+        fh.write(prefix)
+        for data in sections:
+            fh.write(data)
+    # A reader (or the hot-reload check) never sees a half-written artifact
+    os.replace(tmp_path, path)
+
+
+def read_artifact(path: str):
+    """Return ``(ruleset, {name: (labels, arrays)})`` with the arrays mapped from ``path``."""
+    with open(path, "rb") as fh:
+        mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path}: not a rule artifact")
+    try:
+        (header_size,) = struct.unpack_from("<I", mapped, len(MAGIC))
+    except struct.error:
+        raise ValueError(f"{path}: truncated rule artifact")
+    header_start = len(MAGIC) + 4
+    header = json.loads(mapped[header_start:header_start + header_size].decode("utf-8"))
+    if header["byteorder"] != sys.byteorder:
+        raise ValueError(f"{path}: built for {header['byteorder']}-endian machines")
+    base = header_start + header_size
+    base += -base % ALIGN
+
+    view = memoryview(mapped)
+    matchers = {}
+    for name, spec in header["matchers"].items():
+        arrays = {}
+        for key, section in spec["arrays"].items():
+            start = base + section["offset"]
+            data = view[start:start + section["size"]]
+            if section["type"] == "str":
+                arrays[key] = str(data, "utf-32-le")
+            else:
+                arrays[key] = data.cast(section["type"]) if section["size"] else array(section["type"])
+        matchers[name] = (spec["labels"], arrays)
+    return header["ruleset"], matchers
@@ -0,0 +1,426 @@
+"""One compiled rule engine for both scoring paths.
+
+A rule set bundles the extension's scenario ``PATTERNS`` with its OTP/bank
+regexes, and the NLP ``CATEGORIES`` with ``REGEX``/``REGEX_WEIGHT``. It is
+compiled into ``CompiledRules``, which produces both the ``calculate_risk``
+and the ``calculate_message_risk_score`` result shapes.
+
+``RULES`` holds the live compiled rules. When ``UNSCAMABLE_RULES`` names a
+JSON rule-set file, the file is re-checked every ``UNSCAMABLE_RULES_CHECK``
+seconds and a changed file is compiled and swapped in atomically. Requests
+already running keep the rules they started with. Keys missing from the file
+fall back to the built-in defaults;
+``python -m NLP.ruleset_tool`` exports the built-in rules to start a file from.
+
+``UNSCAMABLE_RULES`` may also name a rule artifact built with
+``python -m NLP.ruleset_tool build``. It is memory-mapped instead of
+compiled, so large rule sets load quickly and their automata are shared by
+every worker process through the page cache.
+
+With ``"fuzzy": {"enabled": true}`` in the rule set, ``PATTERNS`` terms and
+``CATEGORIES`` keywords also match obfuscated text: look-alike letters,
+inserted spaces, dots and zero-width chars, and up to ``max_edits`` typos in
+keys of at least ``min_length`` chars (see ``NLP.fuzzy_match``). Shorter
+``PATTERNS`` terms ("ais", "scb") only match the lowered text as written,
+since the folded text has no spaces left to keep them within words. Fuzzy
+hits add flags but no spans, and the streaming scanner stays exact.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+try:
+    from .aho_corasick import Automaton, MappedAutomaton
+    from .fused_regex import FusedRegex
+    from .fuzzy_match import FuzzyMatcher
+    from .metrics import METRICS
+    from .normalizer import fold_message, lower_offsets, normalize_message, normalize_with_offsets
+    from .rule_artifact import is_artifact, read_artifact, write_artifact
+    from .scam_keywords import CATEGORIES
+    from .Regex import REGEX, REGEX_WEIGHT
+    from . import scam_patterns
+except ImportError:  # running as standalone script
+    from aho_corasick import Automaton, MappedAutomaton
+    from fused_regex import FusedRegex
+    from fuzzy_match import FuzzyMatcher
+    from metrics import METRICS
+    from normalizer import fold_message, lower_offsets, normalize_message, normalize_with_offsets
+    from rule_artifact import is_artifact, read_artifact, write_artifact
+    from scam_keywords import CATEGORIES
+    from Regex import REGEX, REGEX_WEIGHT
+    import scam_patterns
+
+# Key of the extension's OTP-code regex in the fused signal set; a tuple so it
+# cannot clash with a REGEX name
+OTP_SIGNAL = ("patterns", "otp")
+
+
+def default_ruleset() -> dict:
+    return {
+        "patterns": scam_patterns.PATTERNS,
+        "otp": {
+            "pattern": scam_patterns.OTP_REGEX.pattern,
+            "weight": scam_patterns.OTP_WEIGHT,
+            "flag": scam_patterns.OTP_FLAG,
+        },
+        "bank": {
+            "pattern": scam_patterns.BANK_REGEX.pattern,
+            "weight": scam_patterns.ENTITY_WEIGHT,
+            "flag": scam_patterns.ENTITY_FLAG,
+        },
+        "categories": CATEGORIES,
+        "regex": {
+            name: {"pattern": regex.pattern, "weight": REGEX_WEIGHT[name]}
+            for name, regex in REGEX.items()
+        },
+        "fuzzy": {"enabled": False, "max_edits": 1, "min_length": 6},
+    }
+
+
+def load_ruleset(path: str) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        loaded = json.load(fh)
+    if not isinstance(loaded, dict):
+        raise ValueError(f"{path}: rule set must be a JSON object")
+    return {**default_ruleset(), **loaded}
+
+
+def ruleset_version(ruleset: dict) -> str:
+    if ruleset.get("version"):
+        return str(ruleset["version"])
+    canonical = json.dumps(ruleset, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+class CompiledRules:
+    """Immutable compiled form of a rule set.
+
+    ``matchers`` may supply prebuilt keyword automata (from a rule artifact)
+    by name, ``"patterns"`` and ``"categories"``; missing ones are built.
+    """
+
+    def __init__(self, ruleset: dict, matchers: dict = None):
+        self.ruleset = ruleset
+        self.version = ruleset_version(ruleset)
+        matchers = matchers or {}
+
+        # Extension scenarios: terms are case-folded, artifacts match as written
+        self.patterns = ruleset["patterns"]
+        pattern_keys = [
+            (key, index)
+            for index, pattern in enumerate(self.patterns)
+            for key in [term.lower() for term in pattern["terms"]] + pattern["artifacts"]
+        ]
+        self.pattern_matcher = matchers.get("patterns") or Automaton(pattern_keys)
+        self.otp_regex = re.compile(ruleset["otp"]["pattern"])
+        self.otp_weight = ruleset["otp"]["weight"]
+        self.otp_flag = ruleset["otp"]["flag"]
+        self.bank_regex = re.compile(ruleset["bank"]["pattern"])
+        self.entity_weight = ruleset["bank"]["weight"]
+        self.entity_flag = ruleset["bank"]["flag"]
+        # Every flag the extension shape can produce, in a fixed order
+        self.flags = [pattern["name"] for pattern in self.patterns] + [self.otp_flag, self.entity_flag]
+
+        # NLP categories: a keyword found verbatim is also found once both
+        # sides are normalized, so matching the normalized forms is enough
+        self.categories = ruleset["categories"]
+        self.category_matcher = matchers.get("categories") or Automaton(
+            (normalize_message(keyword), category)
+            for category, data in self.categories.items()
+            for keyword in data["keywords"]
+        )
+
+        # Fuzzy matchers replace the exact ones where no spans are needed
+        fuzzy = ruleset.get("fuzzy") or {}
+        self.fuzzy_patterns = self.fuzzy_categories = None
+        if fuzzy.get("enabled"):
+            max_edits = fuzzy.get("max_edits", 1)
+            min_length = fuzzy.get("min_length", 6)
+            # Terms too short for edits stay with the exact matcher over the
+            # lowered text: folding drops the spaces between words, so "ais"
+            # would match in "thai sister"
+            self.fuzzy_patterns = FuzzyMatcher(
+                [(key, index) for key, index in pattern_keys if len(fold_message(key)) >= min_length],
+                max_edits, min_length,
+            )
+            self.fuzzy_categories = FuzzyMatcher(
+                ((keyword, category) for category, data in self.categories.items() for keyword in data["keywords"]),
+                max_edits, min_length,
+            )
+        self.regex = [
+            (name, re.compile(spec["pattern"]), spec["weight"])
+            for name, spec in ruleset["regex"].items()
+        ]
+        self.message_signals = [name for name, _, _ in self.regex]
+
+        # Every regex of both paths in one fused set, so each text is
+        # traversed once for all the signals (and bank accounts) it needs
+        self.signal_regex = FusedRegex(
+            [(OTP_SIGNAL, self.otp_regex)] + [(name, regex) for name, regex, _ in self.regex],
+            entities=self.bank_regex,
+        )
+
+    # Extension result shape
+
+    def find_patterns(self, text: str):
+        """Return the indices of matched PATTERNS and whether an OTP code occurs."""
+        watch = METRICS.stopwatch("analyze")
+        text_norm = text.lower()
+        watch.lap("normalize")
+        hits = self.match_patterns(text, text_norm)
+        watch.lap("detect_patterns")
+        otp_found = bool(self.otp_regex.search(text))
+        watch.lap("otp_regex")
+        return hits, otp_found
+
+    def find_all(self, text: str, lowered: str = None, watch=None):
+        """Like ``find_patterns``, plus the bank accounts, from one regex traversal.
+
+        Callers that already hold ``text.lower()`` pass it as ``lowered``, and
+        timed callers their stopwatch as ``watch``.
+        """
+        watch = METRICS.stopwatch("analyze", watch)
+        text_norm = text.lower() if lowered is None else lowered
+        watch.lap("normalize")
+        hits = self.match_patterns(text, text_norm)
+        watch.lap("detect_patterns")
+        otp_found, accounts = self.find_signals(text)
+        watch.lap("signal_regex")
+        return hits, otp_found, accounts
+
+    def find_signals(self, text: str):
+        """Whether an OTP code occurs in ``text``, and its bank accounts."""
+        signals, accounts = self.signal_regex.scan(text, (OTP_SIGNAL,))
+        return OTP_SIGNAL in signals, accounts
+
+    def match_patterns(self, text: str, lowered: str):
+        """Indices of the PATTERNS in ``text``: exact over ``lowered``, plus fuzzy when enabled."""
+        hits = self.pattern_matcher.find(lowered)
+        if self.fuzzy_patterns is None:
+            return hits
+        return hits | self.fuzzy_patterns.find(fold_message(text))
+
+    def score_patterns(self, hits, otp_found):
+        matched = []
+        score = 0
+
+        for index, pattern in enumerate(self.patterns):
+            if index in hits:
+                matched.append(pattern["name"])
+                score += pattern["weight"]
+
+        if otp_found:
+            matched.append(self.otp_flag)
+            score += self.otp_weight
+
+        return matched, score
+
+    def score_findings(self, hits, otp_found, entities):
+        """Turn pattern hits, the OTP flag and bank accounts into ``(score, flags)``."""
+        matched, score = self.score_patterns(hits, otp_found)
+
+        if entities:
+            score += self.entity_weight
+            matched.append(self.entity_flag)
+
+        return min(score, 100), matched
+
+    def detect_patterns(self, text: str):
+        return self.score_patterns(*self.find_patterns(text))
+
+    def calculate_risk(self, text: str, entities):
+        score, flags = self.score_findings(*self.find_patterns(text), entities)
+        METRICS.count_hits("patterns", flags)
+        return score, flags
+
+    def analyze(self, text: str, lowered: str = None, watch=None):
+        """Return ``(score, flags, bank_accounts)`` for ``text``."""
+        hits, otp_found, accounts = self.find_all(text, lowered, watch)
+        score, flags = self.score_findings(hits, otp_found, accounts)
+        METRICS.count_hits("patterns", flags)
+        return score, flags, accounts
+
+    def analyze_spans(self, text: str, lowered: str = None):
+        """``analyze`` plus where each flag first matched and every bank-account span.
+
+        Returns ``(score, flags, bank_accounts, flag_spans, entity_spans)``;
+        spans are ``(start, end)`` indexes into ``text``, taken from the
+        same scans that produce the flags.
+        """
+        lowered = text.lower() if lowered is None else lowered
+        hits = self.pattern_matcher.find_spans(lowered)
+        entity_spans = []
+        signals, accounts = self.signal_regex.scan(text, (OTP_SIGNAL,), entity_spans=entity_spans)
+        matched = hits
+        if self.fuzzy_patterns is not None:
+            matched = set(hits) | self.fuzzy_patterns.find(fold_message(text))
+        score, flags = self.score_findings(matched, OTP_SIGNAL in signals, accounts)
+        METRICS.count_hits("patterns", flags)
+
+        offsets = lower_offsets(text, lowered)
+        flag_spans = {}
+        for index, pattern in enumerate(self.patterns):
+            if index in hits:
+                flag_spans[pattern["name"]] = offsets.span(*hits[index]) if offsets else hits[index]
+        if OTP_SIGNAL in signals:
+            flag_spans[self.otp_flag] = signals[OTP_SIGNAL]
+        if entity_spans:
+            flag_spans[self.entity_flag] = entity_spans[0]
+        return score, flags, accounts, flag_spans, entity_spans
+
+    # NLP result shape
+
+    def score_message(self, message: str, spans: bool = False):
+        """Assign a phishing risk score based on keyword and regex matches.
+
+        With ``spans`` the result gains a third item mapping each matched
+        category to the ``(start, end)`` of its first hit in ``message``.
+        """
+        score = 0
+        matched_categories = []
+        watch = METRICS.stopwatch("message")
+        if spans:
+            normalized_message, offsets = normalize_with_offsets(message)
+        else:
+            normalized_message = normalize_message(message)
+        watch.lap("normalize")
+
+        # Each category counts once, however many of its keywords hit
+        if spans:
+            found = self.category_matcher.find_spans(normalized_message)
+            matched = found.keys()
+        elif self.fuzzy_categories is None:
+            matched = self.category_matcher.find(normalized_message)
+        else:
+            matched = ()  # the folded text still holds every exact hit
+        if self.fuzzy_categories is not None:
+            matched = self.fuzzy_categories.find(fold_message(message, normalized_message)).union(matched)
+        for category, data in self.categories.items():
+            if category in matched:
+                score += data["weight"]
+                matched_categories.append(category)
+        watch.lap("keyword_scan")
+
+        signals, _ = self.signal_regex.scan(message, self.message_signals, entities=False)
+        for name, _, weight in self.regex:
+            if name in signals:
+                score += weight
+                matched_categories.append(name)
+        watch.lap("signal_regex")
+
+        # Bonus for multiple manipulation techniques
+        if len(matched_categories) >= 3:
+            score += 20
+        elif len(matched_categories) == 2:
+            score += 10
+
+        normalized_categories = list(dict.fromkeys(matched_categories))
+        METRICS.count_hits("categories", normalized_categories)
+        if not spans:
+            return min(score, 100), normalized_categories
+
+        match_spans = {}
+        for category in normalized_categories:
+            if category in found:
+                match_spans[category] = offsets.span(*found[category])
+            elif category in signals:
+                match_spans[category] = signals[category]
+        return min(score, 100), normalized_categories, match_spans
+
+
+def build_artifact(ruleset: dict, path: str) -> str:
+    """Compile ``ruleset`` and write it as a rule artifact; returns its version."""
+    compiled = CompiledRules(ruleset)
+    write_artifact(path, ruleset, {
+        "patterns": compiled.pattern_matcher,
+        "categories": compiled.category_matcher,
+    })
+    return compiled.version
+
+
+def load_artifact(path: str) -> CompiledRules:
+    """``CompiledRules`` whose keyword automata scan the memory-mapped artifact in place."""
+    ruleset, matchers = read_artifact(path)
+    return CompiledRules(ruleset, {
+        name: MappedAutomaton(labels, arrays) for name, (labels, arrays) in matchers.items()
+    })
+
+
+def compile_file(path: str) -> CompiledRules:
+    """Compile a JSON rule-set file, or load a prebuilt rule artifact."""
+    if is_artifact(path):
+        return load_artifact(path)
+    return CompiledRules(load_ruleset(path))
+
+
+class RuleEngine:
+    """Holds the live ``CompiledRules`` and hot-reloads them from a rule-set file."""
+
+    def __init__(self, path: str = None, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = time.monotonic() + check_interval
+        if path:
+            self._mtime = os.stat(path).st_mtime_ns
+            self._compiled = compile_file(path)
+        else:
+            self._compiled = CompiledRules(default_ruleset())
+
+    @property
+    def current(self) -> CompiledRules:
+        if self.path and time.monotonic() >= self._next_check:
+            self._check_file()
+        return self._compiled
+
+    @property
+    def version(self) -> str:
+        return self.current.version
+
+    def _check_file(self):
+        if not self._lock.acquire(blocking=False):
+            return  # another thread is already checking
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime != self._mtime:
+                self._compiled = compile_file(self.path)
+                self._mtime = mtime
+        except (OSError, ValueError, KeyError, TypeError, re.error) as error:
+            # A broken or half-written file must not take the service down
+            print(f"rule reload from {self.path} failed, keeping {self._compiled.version}: {error}",
+                  file=sys.stderr)
+        finally:
+            self._lock.release()
+
+    def reload(self) -> str:
+        """Recompile from the rule-set file (or the defaults) now and return the new version."""
+        with self._lock:
+            if self.path:
+                mtime = os.stat(self.path).st_mtime_ns
+                compiled = compile_file(self.path)
+                self._mtime = mtime
+            else:
+                compiled = CompiledRules(default_ruleset())
+            self._compiled = compiled
+            self._next_check = time.monotonic() + self.check_interval
+            return compiled.version
+
+    def swap(self, ruleset: dict) -> str:
+        """Compile ``ruleset`` and make it live; returns its version."""
+        compiled = CompiledRules(ruleset)
+        with self._lock:
+            self._compiled = compiled
+        return compiled.version
+
+
+RULES = RuleEngine(
+    os.environ.get("UNSCAMABLE_RULES") or None,
+    float(os.environ.get("UNSCAMABLE_RULES_CHECK", 5)),
+)
+
@@ -0,0 +1,40 @@
+"""Export or check rule-set files for ``NLP.rule_engine``.
+
+    python -m NLP.ruleset_tool export rules.json   # dump the built-in rules
+    python -m NLP.ruleset_tool check rules.json    # compile and print the version
+    python -m NLP.ruleset_tool build rules.bin [--rules rules.json]
+                                                   # precompile into a rule artifact
+"""
+import argparse
+import json
+
+try:
+    from .rule_engine import CompiledRules, build_artifact, compile_file, default_ruleset, load_ruleset
+except ImportError:  # running as standalone script
+    from rule_engine import CompiledRules, build_artifact, compile_file, default_ruleset, load_ruleset
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export, check or build rule-set files.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="write the built-in rule set as JSON")
+    export.add_argument("path")
+    check = sub.add_parser("check", help="compile a rule-set file or artifact and print its version")
+    check.add_argument("path")
+    build = sub.add_parser("build", help="precompile a rule set into a memory-mappable artifact")
+    build.add_argument("path")
+    build.add_argument("--rules", help="JSON rule-set file (default: the built-in rules)")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        with open(args.path, "w", encoding="utf-8") as fh:
+            json.dump(default_ruleset(), fh, ensure_ascii=False, indent=2)
+        print(CompiledRules(default_ruleset()).version)
+    elif args.command == "build":
+        print(build_artifact(load_ruleset(args.rules) if args.rules else default_ruleset(), args.path))
+    else:
+        print(compile_file(args.path).version)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import re
+
+# Fraud pattern keywords/artifacts grouped by scenario
+PATTERNS = [
+    {"name": "รางวัล/โชค", "terms": ["คุณถูกรางวัล", "รับโชค", "ของรางวัลมูลค่าสูง"], "artifacts": ["ais", "true", "shopee"], "weight": 7},
+    {"name": "บัญชีถูกระงับ", "terms": ["บัญชีถูกระงับ", "ยืนยันตัวตนด่วน"], "artifacts": ["kbank", "scb"], "weight": 7},
+    {"name": "พัสดุตกค้าง", "terms": ["พัสดุตกค้าง", "ไม่สามารถจัดส่งได้"], "artifacts": ["kerry", "flash", "ไปรษณีย์ไทย"], "weight": 6},
+    {"name": "OTP/ความปลอดภัย", "terms": ["รหัส otp", "ยืนยันความปลอดภัย"], "artifacts": ["line", "facebook"], "weight": 8},
+    {"name": "ค่าบริการค้างชำระ", "terms": ["ค้างชำระ", "ระงับบริการ"], "artifacts": ["ใบแจ้งหนี้", "qr code"], "weight": 7},
+    {"name": "โปรโมชันพิเศษ", "terms": ["โปรพิเศษ", "วันนี้เท่านั้น"], "artifacts": ["โค้ดส่วนลด"], "weight": 6},
+    {"name": "ลงทุน/คริปโต", "terms": ["กำไรการันตี", "ลงทุนน้อย"], "artifacts": ["แพลตฟอร์มลงทุน", "บัญชีม้า", "crypto", "bitcoin"], "weight": 8},
+    {"name": "แอบอ้างผู้บริหาร", "terms": ["ช่วยด่วน", "เรื่องลับ"], "artifacts": ["line"], "weight": 6},
+    {"name": "หน่วยงานรัฐ", "terms": ["ศาล", "ตำรวจ", "ปปง."], "artifacts": ["เลขคดี", "หน่วยงาน"], "weight": 7},
+    {"name": "แบบสอบถามลูกค้า", "terms": ["แบบสอบถาม", "รับของรางวัล"], "artifacts": ["ฟอร์ม", "โลโก้"], "weight": 6},
+    {"name": "เงินคืน/Refund", "terms": ["คืนเงิน", "โอนเงินคืน"], "artifacts": ["ลิงก์ธนาคาร", "platform"], "weight": 7},
+    {"name": "สมัครงาน/งานออนไลน์", "terms": ["งานพาร์ทไทม์", "รายได้ดี"], "artifacts": ["line oa", "บัญชีรับเงิน"], "weight": 7},
+    {"name": "ยืมเงิน/สินเชื่อ", "terms": ["อนุมัติสินเชื่อ", "ไม่เช็กบูโร"], "artifacts": ["บริษัทสินเชื่อ", "เอกสารปลอม"], "weight": 7},
+    {"name": "บัญชีโซเชียลถูกแฮก", "terms": ["บัญชีถูกแฮก", "ระงับการใช้งาน"], "artifacts": ["facebook", "ig"], "weight": 7},
+    {"name": "การกุศล/บริจาค", "terms": ["ช่วยเหลือด่วน", "บริจาค"], "artifacts": ["มูลนิธิ", "บัญชีรับบริจาค"], "weight": 6},
+    {"name": "ค่าปรับจราจร", "terms": ["ค่าปรับ", "ใบสั่งออนไลน์", "ชำระค่าปรับ"], "artifacts": ["ตำรวจจราจร", "qr code"], "weight": 7},
+    {"name": "ประกันภัย/เคลมด่วน", "terms": ["กรมธรรม์", "เคลมประกัน", "หมดอายุ"], "artifacts": ["เลขกรมธรรม์", "บริษัทประกัน"], "weight": 7},
+    {"name": "สิทธิ์เยียวยา/เงินรัฐ", "terms": ["เงินเยียวยา", "สิทธิ์รัฐ", "ลงทะเบียนด่วน"], "artifacts": ["โครงการรัฐ", ".go.th"], "weight": 7},
+    {"name": "แจ้งเตือนแอปจ่ายเงิน", "terms": ["โอนเงินผิดปกติ", "ระงับบัญชีชั่วคราว"], "artifacts": ["truemoney", "promptpay"], "weight": 7},
+    {"name": "รางวัลจากบัตรเครดิต", "terms": ["คะแนนสะสม", "แลกรางวัล", "หมดอายุวันนี้"], "artifacts": ["ktc", "scb card"], "weight": 6},
+]
+
+OTP_REGEX = re.compile(r"\b\d{6}\b")
+BANK_REGEX = re.compile(r"\d{3}-\d{1}-\d{5}-\d{1}")
+
+OTP_WEIGHT = 8
+OTP_FLAG = "พบรหัส OTP 6 หลัก"
+
+ENTITY_WEIGHT = 15
+ENTITY_FLAG = "พบบัญชีต้องสงสัย"
@@ -0,0 +1,14 @@
+"""Text file helpers shared by the command-line tools and the index builders."""
+import gzip
+import io
+import sys
+
+
+def open_text(path: str, mode: str = "r"):
+    """Open ``path`` as UTF-8 text, transparently (de)compressing ``.gz`` files; ``-`` is stdio."""
+    if path == "-":
+        stream = sys.stdin if "r" in mode else sys.stdout
+        return io.TextIOWrapper(stream.buffer, encoding="utf-8", newline="")
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
@@ -0,0 +1,118 @@
+"""Build time, lookup latency and memory of the entity reputation index.
+
+Builds an index of ``--entries`` synthetic accounts, phone numbers and
+domains in a temporary directory, then times single lookups (listed and
+unlisted keys) and ``check`` over SMS-sized texts, and reports the RSS and
+anonymous memory the mapped index adds (from /proc, so Linux only).
+
+    python benchmarks/bench_reputation.py --entries 10000000 --output reputation.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_scoring import build_text, git_commit
+from bench_startup import memory as process_memory
+from NLP.reputation import ReputationIndex, build_index, canonical_account, canonical_phone
+
+
+def synthetic_sources(entries: int, seed: int):
+    """``(kind, values)`` generators with ``entries`` values in total, split evenly."""
+    def accounts():
+        rng = random.Random(seed)
+        for _ in range(entries // 3):
+            yield f"{rng.randrange(1000):03d}-{rng.randrange(10)}-{rng.randrange(100000):05d}-{rng.randrange(10)}"
+
+    def phones():
+        rng = random.Random(seed + 1)
+        for _ in range(entries // 3):
+            yield f"0{rng.choice('689')}{rng.randrange(10)}-{rng.randrange(1000):03d}-{rng.randrange(10000):04d}"
+
+    def domains():
+        rng = random.Random(seed + 2)
+        for index in range(entries - 2 * (entries // 3)):
+            yield f"{index:x}{rng.randrange(1 << 20):x}.{rng.choice(['xyz', 'top', 'com', 'net'])}"
+
+    return [("account", accounts()), ("phone", phones()), ("domain", domains())]
+
+
+def memory() -> dict:
+    """``bench_startup.memory`` plus anonymous (heap and stack) memory in MB."""
+    values = process_memory()
+    with open("/proc/self/smaps_rollup") as fh:
+        for line in fh:
+            if line.startswith("Anonymous:"):
+                values["anonymous_mb"] = round(int(line.split()[1]) / 1024, 1)
+    return values
+
+
+def time_calls(fn, inputs, repeat: int):
+    latencies = []
+    for _ in range(repeat):
+        for item in inputs:
+            t0 = time.perf_counter_ns()
+            fn(item)
+            latencies.append(time.perf_counter_ns() - t0)
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "p50_us": round(latencies[len(latencies) // 2] / 1e3, 2),
+        "p99_us": round(latencies[int(len(latencies) * 0.99)] / 1e3, 2),
+        "mean_us": round(sum(latencies) / len(latencies) / 1e3, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="reputation_output.json", help="where to write the JSON report")
+    parser.add_argument("--entries", type=int, default=1_000_000, help="listed entities in the index")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--lookups", type=int, default=20000, help="keys per lookup case")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    _, accounts = synthetic_sources(args.entries, args.seed)[0]
+    listed = [canonical_account(next(accounts)) for _ in range(min(args.lookups, args.entries // 3))]
+    unlisted = [canonical_phone(f"07{rng.randrange(10 ** 8):08d}") for _ in range(args.lookups)]
+    texts = [build_text(rng, 120, 0.3) + f" โอนเข้า {rng.randrange(1000):03d}-1-23456-7 โทร 0812345678 "
+             f"https://a{index}.example.xyz/x" for index in range(2000)]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work:
+        path = os.path.join(work, "reputation.bin")
+        started = time.perf_counter()
+        build_index(path, synthetic_sources(args.entries, args.seed))
+        results["build_seconds"] = round(time.perf_counter() - started, 2)
+        results["file_mb"] = round(os.path.getsize(path) / 1e6, 1)
+
+        before = memory()
+        started = time.perf_counter()
+        index = ReputationIndex(path)
+        results["open_ms"] = round((time.perf_counter() - started) * 1e3, 3)
+        results["lookup_listed"] = time_calls(index.__contains__, listed, 3)
+        results["lookup_unlisted"] = time_calls(index.__contains__, unlisted, 3)
+        results["check_sms"] = time_calls(index.check, texts, 3)
+        after = memory()
+        # Touched index pages count in RSS, but they are clean page-cache
+        # pages shared by every process mapping the file; anonymous memory
+        # is what each worker pays on its own
+        results["rss_added_mb"] = round(after["rss_mb"] - before["rss_mb"], 1)
+        results["anonymous_added_mb"] = round(after["anonymous_mb"] - before["anonymous_mb"], 1)
+        assert all(key in index for key in listed[:100])
+
+    for name, value in results.items():
+        print(f"{name:20} {value}")
+    report = {"commit": git_commit(), "entries": args.entries, "seed": args.seed, "results": results}
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Throughput and latency benchmarks for both scoring engines and the HTTP path.
+
+Corpora are built deterministically from ``NLP.scam_messages.MESSAGES`` mixed
+with benign Thai/English filler, so two runs with the same ``--seed`` score
+exactly the same inputs and their JSON reports can be diffed across commits.
+
+    python benchmarks/bench_scoring.py --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "extension"))
+
+from NLP import calculate_message_risk_score
+from NLP.risk_score_chat import analyze_chat
+from NLP.rule_engine import RULES, CompiledRules
+from NLP.scam_messages import MESSAGES
+from NLP.campaigns import CampaignIndex
+from NLP.cascade import Cascade
+from NLP.ngram_model import np, seed_corpus, train
+
+try:
+    import app as service
+except ImportError:  # Flask is not installed; the extension cases are skipped
+    service = None
+
+BENIGN_FILLER = [
+    "สวัสดีครับ วันนี้สะดวกคุยไหม",
+    "ขอบคุณมากค่ะ ได้รับของแล้ว",
+    "พรุ่งนี้เจอกันที่ร้านกาแฟนะ",
+    "ส่งรูปสินค้าให้ดูหน่อยได้ไหมครับ",
+    "ตอนนี้รถติดมาก อาจจะไปสายนิดหน่อย",
+    "Hi, is this still available?",
+    "Thanks, see you tomorrow at the station.",
+    "Could you send me the size chart please?",
+    "The weather has been great this week.",
+    "Let me check with my team and get back to you.",
+]
+
+# name -> target length in characters
+PAGE_SIZES = {
+    "sms": 120,
+    "page_64k": 64 * 1024,
+    "page_1m": 1024 * 1024,
+    "page_5m": 5 * 1024 * 1024,
+}
+
+CHAT_LENGTH = 20
+
+
+def build_text(rng: random.Random, length: int, scam_ratio: float) -> str:
+    parts = []
+    total = 0
+    while total < length:
+        source = MESSAGES if rng.random() < scam_ratio else BENIGN_FILLER
+        part = rng.choice(source)
+        parts.append(part)
+        total += len(part) + 1
+    return " ".join(parts)[:length]
+
+
+def build_corpus(seed: int, samples: int, scam_ratio: float):
+    rng = random.Random(seed)
+    corpus = {
+        name: [build_text(rng, length, scam_ratio) for _ in range(samples if length < 100_000 else 1)]
+        for name, length in PAGE_SIZES.items()
+    }
+    corpus["chat"] = [
+        [build_text(rng, PAGE_SIZES["sms"], scam_ratio) for _ in range(CHAT_LENGTH)]
+        for _ in range(samples)
+    ]
+    # The SMS corpus as one batch, for the batched second stage
+    corpus["sms_batch"] = [corpus["sms"]]
+    return corpus
+
+
+def measure(fn, inputs, repeat: int, min_seconds: float):
+    """Call ``fn`` over ``inputs`` until both ``repeat`` passes and ``min_seconds`` are done."""
+    latencies = []
+    started = time.perf_counter()
+    passes = 0
+    while passes < repeat or time.perf_counter() - started < min_seconds:
+        for item in inputs:
+            t0 = time.perf_counter_ns()
+            fn(item)
+            latencies.append(time.perf_counter_ns() - t0)
+        passes += 1
+    elapsed = sum(latencies) / 1e9
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_us": round(latencies[len(latencies) // 2] / 1e3, 2),
+        "p99_us": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] / 1e3, 2),
+        "mean_us": round(statistics.fmean(latencies) / 1e3, 2),
+    }
+
+
+def benchmark_cases():
+    """(name, corpus key, callable) for every engine/size combination."""
+    cases = []
+    for size in PAGE_SIZES:
+        cases.append((f"calculate_message_risk_score/{size}", size, calculate_message_risk_score))
+    cases.append(("analyze_chat/chat", "chat", analyze_chat))
+
+    # Every regex signal plus the bank accounts: one fused traversal against
+    # the per-regex loop it replaced
+    rules = RULES.current
+    separate = [regex for _, regex, _ in rules.regex] + [rules.otp_regex]
+
+    def regex_separate(text):
+        return [bool(regex.search(text)) for regex in separate], rules.bank_regex.findall(text)
+
+    for size in PAGE_SIZES:
+        cases.append((f"regex_separate/{size}", size, regex_separate))
+        cases.append((f"regex_fused/{size}", size, rules.signal_regex.scan))
+
+    # The same rules with obfuscation-tolerant matching on, against exact matching
+    fuzzy = CompiledRules({**rules.ruleset, "fuzzy": {**rules.ruleset.get("fuzzy", {}), "enabled": True}})
+    for size in PAGE_SIZES:
+        cases.append((f"score_message_exact/{size}", size, rules.score_message))
+        cases.append((f"score_message_fuzzy/{size}", size, fuzzy.score_message))
+        cases.append((f"analyze_exact/{size}", size, rules.analyze))
+        cases.append((f"analyze_fuzzy/{size}", size, fuzzy.analyze))
+
+    # Near-duplicate campaign lookup: the signature alone, and the signature
+    # plus the LSH lookup, against scoring the same message
+    campaigns = CampaignIndex()
+    cases.append(("campaign_signature/sms", "sms", campaigns.signature))
+    cases.append(("campaign_observe/sms", "sms", campaigns.observe))
+
+    if np is not None:
+        # Second stage: its added latency per message, and batched throughput
+        # against the rules alone over the same batch
+        cascade = Cascade(train(*seed_corpus()))
+
+        def cascade_one(text):
+            score, _ = calculate_message_risk_score(text)
+            return cascade.refine([score], [text])
+
+        def rules_batch(texts):
+            return [calculate_message_risk_score(text)[0] for text in texts]
+
+        def cascade_batch(texts):
+            return cascade.refine(rules_batch(texts), texts)
+
+        cases.append(("cascade/sms", "sms", cascade_one))
+        cases.append(("cascade_rules_only/sms_batch", "sms_batch", rules_batch))
+        cases.append(("cascade/sms_batch", "sms_batch", cascade_batch))
+        cases.append(("cascade_model_only/sms_batch", "sms_batch", cascade.model.predict_proba))
+
+    if service is not None:
+        for size in PAGE_SIZES:
+            cases.append((f"detect_patterns/{size}", size, service.detect_patterns))
+
+        client = service.app.test_client()
+        service.VERDICT_CACHE.max_entries = 0  # measure scoring, not cache hits
+
+        def post_analyze(text):
+            response = client.post("/analyze", json={"text": text})
+            assert response.status_code == 200
+
+        for size in PAGE_SIZES:
+            cases.append((f"http_analyze/{size}", size, post_analyze))
+    return cases
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="bench_output.json", help="where to write the JSON report")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--samples", type=int, default=200, help="inputs per small corpus")
+    parser.add_argument("--scam-ratio", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=3, help="minimum passes over each corpus")
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="minimum wall time per case")
+    parser.add_argument("--only", help="run only cases whose name contains this string")
+    parser.add_argument("--compare", help="earlier JSON report to print throughput ratios against")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.seed, args.samples, args.scam_ratio)
+    results = {}
+    for name, corpus_key, fn in benchmark_cases():
+        if args.only and args.only not in name:
+            continue
+        results[name] = measure(fn, corpus[corpus_key], args.repeat, args.min_seconds)
+        print(f"{name:45} {results[name]['throughput_per_s']:>12} /s  "
+              f"p50 {results[name]['p50_us']:>12} us  p99 {results[name]['p99_us']:>12} us")
+
+    if np is None:
+        print("NumPy not installed: skipped the cascade cases")
+    if service is None:
+        print("Flask not installed: skipped detect_patterns and /analyze cases")
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "samples": args.samples,
+        "scam_ratio": args.scam_ratio,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+def compare(baseline_path, results):
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    print(f"\nvs {baseline_path} ({baseline.get('commit')})")
+    for name, current in results.items():
+        before = baseline["results"].get(name)
+        if not before or not before["throughput_per_s"]:
+            continue
+        ratio = current["throughput_per_s"] / before["throughput_per_s"]
+        print(f"{name:45} x{ratio:.2f} throughput  p99 {before['p99_us']} -> {current['p99_us']} us")
+
+
+if __name__ == "__main__":
+    main()
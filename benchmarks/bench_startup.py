@@ -0,0 +1,173 @@
+"""Cold start and per-worker memory of the rule engine.
+
+Every case runs in a fresh interpreter. It times ``import NLP.rule_engine``
+(which compiles, or maps, the live rules) and then forks ``--workers``
+children that score a small corpus, as gunicorn workers do. In ``preload``
+mode the rules are loaded before forking, like ``preload_app``; in
+``per_worker`` mode each child loads its own. Each child reports its RSS,
+its PSS (its fair share of pages shared with the others) and its private
+memory from /proc, so Linux only.
+
+    python benchmarks/bench_startup.py --output startup.json --synthetic-terms 50000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+THAI = [chr(code) for code in range(0x0E01, 0x0E2F)]
+
+
+def synthetic_ruleset(terms: int, seed: int) -> dict:
+    """The built-in rules plus ``terms`` random keywords and pattern terms."""
+    from NLP.rule_engine import default_ruleset
+
+    rng = random.Random(seed)
+    ruleset = json.loads(json.dumps(default_ruleset(), ensure_ascii=False))
+    categories = list(ruleset["categories"].values())
+    patterns = ruleset["patterns"]
+    for index in range(terms):
+        word = "".join(rng.choice(THAI) for _ in range(rng.randint(4, 12)))
+        if index % 2:
+            categories[index % len(categories)]["keywords"].append(word)
+        else:
+            patterns[index % len(patterns)]["terms"].append(word)
+    return ruleset
+
+
+def memory() -> dict:
+    """RSS, PSS and private memory of this process in MB."""
+    values = {}
+    with open("/proc/self/smaps_rollup") as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].rstrip(":") in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss_mb": round(values["Rss"], 1),
+        "pss_mb": round(values["Pss"], 1),
+        "private_mb": round(values["Private_Clean"] + values["Private_Dirty"], 1),
+    }
+
+
+def load_rules():
+    started = time.perf_counter()
+    from NLP.rule_engine import RULES
+    RULES.current
+    return time.perf_counter() - started
+
+
+def score_corpus():
+    from NLP import calculate_message_risk_score
+    from NLP.rule_engine import RULES
+    from NLP.scam_messages import MESSAGES
+
+    for message in MESSAGES:
+        calculate_message_risk_score(message)
+        RULES.current.analyze(message)
+
+
+def child(mode: str, workers: int):
+    """Entry point of the measured interpreter; prints one JSON report."""
+    import_seconds = load_rules() if mode == "preload" else None
+    pipes = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            seconds = load_rules() if mode == "per_worker" else 0.0
+            score_corpus()
+            time.sleep(0.2)  # let every sibling finish before PSS is read
+            report = {"load_seconds": round(seconds, 4), **memory()}
+            os.write(write_fd, json.dumps(report).encode())
+            os._exit(0)
+        os.close(write_fd)
+        pipes.append((pid, read_fd))
+
+    reports = []
+    for pid, read_fd in pipes:
+        with os.fdopen(read_fd) as fh:
+            reports.append(json.loads(fh.read()))
+        os.waitpid(pid, 0)
+
+    def mean(key):
+        return round(sum(report[key] for report in reports) / len(reports), 4)
+
+    print(json.dumps({
+        "import_seconds": round(import_seconds, 4) if import_seconds is not None else mean("load_seconds"),
+        "worker_rss_mb": mean("rss_mb"),
+        "worker_pss_mb": mean("pss_mb"),
+        "worker_private_mb": mean("private_mb"),
+    }))
+
+
+def run_case(rules_path, mode: str, workers: int) -> dict:
+    env = dict(os.environ)
+    env.pop("UNSCAMABLE_RULES", None)
+    if rules_path:
+        env["UNSCAMABLE_RULES"] = rules_path
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--workers", str(workers)],
+        env=env, text=True,
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="startup_output.json", help="where to write the JSON report")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--synthetic-terms", type=int, default=50000,
+                        help="extra random terms for the large rule-set cases (0 to skip them)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--child", choices=["preload", "per_worker"], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.child, args.workers)
+        return
+
+    from NLP.rule_engine import build_artifact
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = {"builtin": None}
+        artifact_path = os.path.join(tmp, "builtin.bin")
+        build_artifact(synthetic_ruleset(0, args.seed), artifact_path)
+        cases["builtin_artifact"] = artifact_path
+        if args.synthetic_terms:
+            ruleset = synthetic_ruleset(args.synthetic_terms, args.seed)
+            json_path = os.path.join(tmp, "large.json")
+            with open(json_path, "w", encoding="utf-8") as fh:
+                json.dump(ruleset, fh, ensure_ascii=False)
+            artifact_path = os.path.join(tmp, "large.bin")
+            started = time.perf_counter()
+            build_artifact(ruleset, artifact_path)
+            print(f"built {args.synthetic_terms}-term artifact in {time.perf_counter() - started:.2f}s "
+                  f"({os.path.getsize(artifact_path) / 1e6:.1f} MB)")
+            cases["large_json"] = json_path
+            cases["large_artifact"] = artifact_path
+
+        results = {}
+        for name, path in cases.items():
+            for mode in ("per_worker", "preload"):
+                result = run_case(path, mode, args.workers)
+                results[f"{name}/{mode}"] = result
+                print(f"{name + '/' + mode:32} load {result['import_seconds']:>8.3f}s  "
+                      f"worker rss {result['worker_rss_mb']:>7.1f} MB  pss {result['worker_pss_mb']:>7.1f} MB  "
+                      f"private {result['worker_private_mb']:>7.1f} MB")
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump({"workers": args.workers, "synthetic_terms": args.synthetic_terms, "results": results},
+                  fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
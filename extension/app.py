@@ -1,37 +1,61 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-import re
+from functools import lru_cache, partial
 import os
+import sys
+
+from verdict_cache import VerdictCache
+from stream_scan import StreamScanner, scan_stream
+from wire_format import BodyError, DecodeRequestBodies, compact_payload, encode_compact, wants_compact
+
+# Rules and scoring live in the NLP package at the repo root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from NLP import calculate_message_risk_score, classify_risk, classify_status
+from NLP.campaigns import CAMPAIGNS
+from NLP.cascade import CASCADE, MAX_MODEL_CHARS
+from NLP.reputation import LISTED_FLAG, LISTED_WEIGHT, REPUTATION
+from NLP.chat_session import ChatSession, ChatSessionStore, SegmentSession, SessionFull, WindowedChatSession
+from NLP.metrics import METRICS
+from NLP.rule_engine import RULES
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for Chrome extension
 
-# Fraud pattern keywords/artifacts grouped by scenario
-PATTERNS = [
-    {"name": "รางวัล/โชค", "terms": ["คุณถูกรางวัล", "รับโชค", "ของรางวัลมูลค่าสูง"], "artifacts": ["ais", "true", "shopee"], "weight": 7},
-    {"name": "บัญชีถูกระงับ", "terms": ["บัญชีถูกระงับ", "ยืนยันตัวตนด่วน"], "artifacts": ["kbank", "scb"], "weight": 7},
-    {"name": "พัสดุตกค้าง", "terms": ["พัสดุตกค้าง", "ไม่สามารถจัดส่งได้"], "artifacts": ["kerry", "flash", "ไปรษณีย์ไทย"], "weight": 6},
-    {"name": "OTP/ความปลอดภัย", "terms": ["รหัส otp", "ยืนยันความปลอดภัย"], "artifacts": ["line", "facebook"], "weight": 8},
-    {"name": "ค่าบริการค้างชำระ", "terms": ["ค้างชำระ", "ระงับบริการ"], "artifacts": ["ใบแจ้งหนี้", "qr code"], "weight": 7},
-    {"name": "โปรโมชันพิเศษ", "terms": ["โปรพิเศษ", "วันนี้เท่านั้น"], "artifacts": ["โค้ดส่วนลด"], "weight": 6},
-    {"name": "ลงทุน/คริปโต", "terms": ["กำไรการันตี", "ลงทุนน้อย"], "artifacts": ["แพลตฟอร์มลงทุน", "บัญชีม้า", "crypto", "bitcoin"], "weight": 8},
-    {"name": "แอบอ้างผู้บริหาร", "terms": ["ช่วยด่วน", "เรื่องลับ"], "artifacts": ["line"], "weight": 6},
-    {"name": "หน่วยงานรัฐ", "terms": ["ศาล", "ตำรวจ", "ปปง."], "artifacts": ["เลขคดี", "หน่วยงาน"], "weight": 7},
-    {"name": "แบบสอบถามลูกค้า", "terms": ["แบบสอบถาม", "รับของรางวัล"], "artifacts": ["ฟอร์ม", "โลโก้"], "weight": 6},
-    {"name": "เงินคืน/Refund", "terms": ["คืนเงิน", "โอนเงินคืน"], "artifacts": ["ลิงก์ธนาคาร", "platform"], "weight": 7},
-    {"name": "สมัครงาน/งานออนไลน์", "terms": ["งานพาร์ทไทม์", "รายได้ดี"], "artifacts": ["line oa", "บัญชีรับเงิน"], "weight": 7},
-    {"name": "ยืมเงิน/สินเชื่อ", "terms": ["อนุมัติสินเชื่อ", "ไม่เช็กบูโร"], "artifacts": ["บริษัทสินเชื่อ", "เอกสารปลอม"], "weight": 7},
-    {"name": "บัญชีโซเชียลถูกแฮก", "terms": ["บัญชีถูกแฮก", "ระงับการใช้งาน"], "artifacts": ["facebook", "ig"], "weight": 7},
-    {"name": "การกุศล/บริจาค", "terms": ["ช่วยเหลือด่วน", "บริจาค"], "artifacts": ["มูลนิธิ", "บัญชีรับบริจาค"], "weight": 6},
-    {"name": "ค่าปรับจราจร", "terms": ["ค่าปรับ", "ใบสั่งออนไลน์", "ชำระค่าปรับ"], "artifacts": ["ตำรวจจราจร", "qr code"], "weight": 7},
-    {"name": "ประกันภัย/เคลมด่วน", "terms": ["กรมธรรม์", "เคลมประกัน", "หมดอายุ"], "artifacts": ["เลขกรมธรรม์", "บริษัทประกัน"], "weight": 7},
-    {"name": "สิทธิ์เยียวยา/เงินรัฐ", "terms": ["เงินเยียวยา", "สิทธิ์รัฐ", "ลงทะเบียนด่วน"], "artifacts": ["โครงการรัฐ", ".go.th"], "weight": 7},
-    {"name": "แจ้งเตือนแอปจ่ายเงิน", "terms": ["โอนเงินผิดปกติ", "ระงับบัญชีชั่วคราว"], "artifacts": ["truemoney", "promptpay"], "weight": 7},
-    {"name": "รางวัลจากบัตรเครดิต", "terms": ["คะแนนสะสม", "แลกรางวัล", "หมดอายุวันนี้"], "artifacts": ["ktc", "scb card"], "weight": 6},
-]
-
-OTP_REGEX = re.compile(r"\b\d{6}\b")
-BANK_REGEX = re.compile(r"\d{3}-\d{1}-\d{5}-\d{1}")
+# Largest inflated size of a compressed (gzip/deflate/zstd) request body
+MAX_BODY_BYTES = int(os.environ.get('MAX_BODY_BYTES', 8 * 1024 * 1024))
+app.wsgi_app = DecodeRequestBodies(app.wsgi_app, MAX_BODY_BYTES)
+
+VERDICT_CACHE = VerdictCache(
+    RULES.version,
+    max_entries=int(os.environ.get('VERDICT_CACHE_SIZE', 10000)),
+    ttl_seconds=float(os.environ.get('VERDICT_CACHE_TTL', 600)),
+    shared_path=os.environ.get('VERDICT_CACHE_PATH')
+)
+
+MAX_BATCH_SIZE = 1000
+STREAM_CHUNK_SIZE = 65536
+
+# Live chat sessions, one per conversation id, scored a message at a time;
+# with a window set, over the recent messages only, with decay
+CHAT_WINDOW_MESSAGES = int(os.environ.get('CHAT_WINDOW_MESSAGES', 0))
+CHAT_WINDOW_MINUTES = float(os.environ.get('CHAT_WINDOW_MINUTES', 0))
+CHAT_SESSIONS = ChatSessionStore(
+    max_sessions=int(os.environ.get('CHAT_SESSION_MAX', 100000)),
+    ttl_seconds=float(os.environ.get('CHAT_SESSION_TTL', 3600)),
+    max_messages=int(os.environ.get('CHAT_SESSION_MAX_MESSAGES', 10000)),
+    max_bytes=int(os.environ.get('CHAT_SESSION_MAX_BYTES', 4 * 1024 * 1024)),
+    factory=partial(WindowedChatSession, CHAT_WINDOW_MESSAGES or 50, CHAT_WINDOW_MINUTES * 60 or None)
+    if CHAT_WINDOW_MESSAGES or CHAT_WINDOW_MINUTES else ChatSession
+)
+
+# Page chats synced by segment hash, one per extension tab and page
+SEGMENT_SESSIONS = ChatSessionStore(
+    max_sessions=int(os.environ.get('CHAT_SESSION_MAX', 100000)),
+    ttl_seconds=float(os.environ.get('CHAT_SESSION_TTL', 3600)),
+    factory=partial(SegmentSession, reputation=REPUTATION, model_chars=MAX_MODEL_CHARS if CASCADE else 0)
+)
+MAX_SEGMENTS = 5000
+MAX_DIGEST_LENGTH = 64
 
 
 def normalize(text: str) -> str:
@@ -39,68 +63,410 @@ def normalize(text: str) -> str:
 
 
 def detect_patterns(text: str):
-    text_norm = normalize(text)
-    matched = []
-    score = 0
+    return RULES.current.detect_patterns(text)
 
-    for pattern in PATTERNS:
-        has_term = any(term.lower() in text_norm for term in pattern["terms"])
-        has_artifact = any(artifact in text_norm for artifact in pattern["artifacts"])
-        if has_term or has_artifact:
-            matched.append(pattern["name"])
-            score += pattern["weight"]
 
-    otp_found = bool(OTP_REGEX.search(text))
-    if otp_found:
-        matched.append("พบรหัส OTP 6 หลัก")
-        score += 8
+def calculate_risk(text, entities):
+    return RULES.current.calculate_risk(text, entities)
 
-    return matched, score
 
+STATUS_DISPLAY = {
+    "HIGH_RISK": {"status": "High Risk", "color": "#FF5252"},
+    "WARNING": {"status": "Warning", "color": "#FFA726"},
+    "BE CAUTIOUS": {"status": "Be cautious", "color": "#9A9C49"},
+    "SAFE": {"status": "Safe", "color": "#4CAF50"},
+}
 
-def calculate_risk(text, entities):
-    matched_patterns, pattern_score = detect_patterns(text)
 
-    score = pattern_score
+def get_status(score):
+    return dict(STATUS_DISPLAY[classify_status(score)])
 
-    if entities:
-        score += 15
-        matched_patterns.append("พบบัญชีต้องสงสัย")
+def verdict_version(rules):
+    # Verdicts also depend on the blocklist index, the model and campaign reuse when those are on
+    version = rules.version
+    if CAMPAIGNS is not None:
+        version += f"+{CAMPAIGNS.version}"
+    if REPUTATION is not None:
+        version += f"+{REPUTATION.version}"
+    if CASCADE is not None:
+        version += f"+{CASCADE.version}"
+    return version
 
-    if score > 100:
-        score = 100
 
-    return score, matched_patterns
+@lru_cache(maxsize=4)
+def flag_ids(rules):
+    # Ids of compact responses: the rule flags, then the blocklist flag
+    return {flag: index for index, flag in enumerate(rules.flags + [LISTED_FLAG])}
 
 
-def get_status(score):
-    if score > 70: #71-100
-        return {"status": "High Risk", "color": "#FF5252"}
-    elif score > 40: #41-70
-        return {"status": "Warning", "color": "#FFA726"}
-    elif score > 0: #1-40
-        return {"status": "Be cautious", "color": "#9A9C49"}
+def respond(payload):
+    # Clients that accept MessagePack get flag ids instead of flag strings
+    if not wants_compact(request.headers.get('Accept')):
+        return jsonify(payload)
+    rules = RULES.current
+    body, mimetype = encode_compact({**compact_payload(payload, flag_ids(rules)), "flags_version": rules.version})
+    return Response(body, mimetype=mimetype)
+
+
+@app.errorhandler(BodyError)
+def body_error(error):
+    return jsonify({"error": str(error)}), error.status
+
+
+def set_risk_score(result, score):
+    status_info = get_status(score)
+    result["risk_score"] = score
+    result["status"] = status_info["status"]
+    result["color"] = status_info["color"]
+
+
+def apply_reputation(result, raw_text):
+    # Entities in the blocklist index weigh far more than ones merely present
+    if REPUTATION is None:
+        return
+    apply_listed(result, REPUTATION.check(raw_text, result["entities_found"]))
+
+
+def apply_listed(result, listed):
+    result["blocklisted"] = listed
+    if listed:
+        result["flags"].append(LISTED_FLAG)
+        set_risk_score(result, min(result["risk_score"] + LISTED_WEIGHT, 100))
+
+
+def apply_model(results, texts, watch=None):
+    # Second stage: one model batch for the results whose rule score is ambiguous
+    if CASCADE is None:
+        return
+    scores, probabilities = CASCADE.refine([result["risk_score"] for result in results], texts, watch)
+    for result, score, probability in zip(results, scores, probabilities):
+        if probability is None:
+            continue
+        result["rule_score"] = result["risk_score"]
+        set_risk_score(result, score)
+        result["model_probability"] = probability
+
+
+def campaign_signature(raw_text):
+    return None if CAMPAIGNS is None else CAMPAIGNS.signature(raw_text)
+
+
+def observe_campaign(raw_text, signature=None):
+    # Every request counts towards its campaign, cache hits included
+    if CAMPAIGNS is None:
+        return None, None
+    campaign, similarity = CAMPAIGNS.observe(raw_text, signature)
+    return campaign, {"id": campaign.id, "size": campaign.size, "similarity": similarity, "reused": False}
+
+
+def with_campaign(result, info):
+    # Sizes change with every message, so the block goes on a copy and is never cached
+    return result if info is None else {**result, "campaign": info}
+
+
+def campaign_rules(raw_text, rules, campaign, info, lowered=None, watch=None):
+    # Close copies of a campaign's first message reuse its pattern hits; the
+    # OTP code and bank accounts differ between copies, so they are looked
+    # for in this text, as are blocklisted entities and the model's score
+    verdict = campaign.verdict
+    if info["similarity"] >= CAMPAIGNS.reuse_threshold and verdict is not None and verdict[0] == rules.version:
+        info["reused"] = True
+        hits = verdict[1]
+        otp_found, bank_accounts = rules.find_signals(raw_text)
     else:
-        return {"status": "Safe", "color": "#4CAF50"}
+        hits, otp_found, bank_accounts = rules.find_all(raw_text, lowered, watch)
+        if verdict is None or verdict[0] != rules.version:
+            campaign.verdict = (rules.version, frozenset(hits))
+    risk_score, flags = rules.score_findings(hits, otp_found, bank_accounts)
+    METRICS.count_hits("patterns", flags)
+    return risk_score, flags, bank_accounts
+
+
+def rule_verdict(raw_text, rules, lowered=None, campaign=None, info=None, watch=None):
+    if campaign is None:
+        risk_score, flags, bank_accounts = rules.analyze(raw_text, lowered, watch)
+    else:
+        risk_score, flags, bank_accounts = campaign_rules(raw_text, rules, campaign, info, lowered, watch)
+    status_info = get_status(risk_score)
+
+    result = {
+        "risk_score": risk_score,
+        "status": status_info["status"],
+        "color": status_info["color"],
+        "flags": flags,
+        "entities_found": bank_accounts
+    }
+    apply_reputation(result, raw_text)
+    return result
+
+
+def analyze_text(raw_text, rules=None, lowered=None):
+    # Callers pass the rules they keyed the cache on, so a reload mid-request can't mix versions
+    campaign, info = observe_campaign(raw_text)
+    result = rule_verdict(raw_text, rules or RULES.current, lowered, campaign, info)
+    apply_model([result], [raw_text])
+    return with_campaign(result, info)
+
+
+def analyze_text_spans(raw_text):
+    # Spans point into this exact text, so these results are never cached
+    risk_score, flags, bank_accounts, flag_spans, entity_spans = RULES.current.analyze_spans(raw_text)
+    status_info = get_status(risk_score)
+
+    result = {
+        "risk_score": risk_score,
+        "status": status_info["status"],
+        "color": status_info["color"],
+        "flags": flags,
+        "entities_found": bank_accounts,
+        "spans": {flag: list(span) for flag, span in flag_spans.items()},
+        "entity_spans": [list(span) for span in entity_spans]
+    }
+    apply_reputation(result, raw_text)
+    apply_model([result], [raw_text])
+    return result
+
+
+def cached_analyze_texts(raw_texts, watch=None):
+    # Lowercasing leaves the OTP/bank regex hits unchanged, so it is safe to key on;
+    # the stages below are timed when the calling route's ``watch`` is
+    rules = RULES.current
+    version = verdict_version(rules)
+    results = []
+    misses = []
+    campaigns = []
+    for raw_text in raw_texts:
+        lowered = normalize(raw_text)
+        key = VERDICT_CACHE.key(lowered, version)
+        campaign, info = observe_campaign(raw_text)
+        result = VERDICT_CACHE.get(key)
+        if result is None:
+            result = rule_verdict(raw_text, rules, lowered, campaign, info, watch)
+            misses.append((key, result, raw_text))
+        results.append(result)
+        campaigns.append(info)
+
+    apply_model([result for _, result, _ in misses], [raw_text for _, _, raw_text in misses], watch)
+    for key, result, _ in misses:
+        VERDICT_CACHE.put(key, result)
+    return [with_campaign(result, info) for result, info in zip(results, campaigns)]
+
+
+def cached_analyze_text(raw_text, watch=None):
+    return cached_analyze_texts([raw_text], watch)[0]
+
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
-    data = request.json
+    watch = METRICS.stopwatch("analyze")
+    data = request.get_json(silent=True)
+    watch.lap("json_parse")
+    if data is None:
+        return jsonify({"error": "invalid JSON body"}), 400
+    if not isinstance(data, dict):
+        data = {}
     raw_text = data.get('text', '')
-    
-    bank_accounts = BANK_REGEX.findall(raw_text)
+    if not isinstance(raw_text, str):
+        return jsonify({"error": "text must be a string"}), 400
+
+    if data.get('spans'):
+        return respond(analyze_text_spans(raw_text))
+    return respond(cached_analyze_text(raw_text, watch))
+
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "body must be a JSON object"}), 400
+    messages = data.get('messages')
+    include_nlp = bool(data.get('nlp', False))
+
+    if not isinstance(messages, list) or not all(isinstance(m, str) for m in messages):
+        return jsonify({"error": "messages must be a list of strings"}), 400
+    if len(messages) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"batch size exceeds {MAX_BATCH_SIZE}"}), 400
 
-    risk_score, flags = calculate_risk(raw_text, bank_accounts)
+    results = cached_analyze_texts(messages)
+    if include_nlp:
+        nlp_results = [calculate_message_risk_score(raw_text) for raw_text in messages]
+        nlp_scores = [nlp_score for nlp_score, _ in nlp_results]
+        probabilities = [None] * len(messages)
+        if CASCADE is not None:
+            nlp_scores, probabilities = CASCADE.refine(nlp_scores, messages)
+        for result, nlp_score, (_, categories), probability in zip(results, nlp_scores, nlp_results, probabilities):
+            result["nlp"] = {
+                "risk_score": nlp_score,
+                "risk_level": classify_risk(nlp_score),
+                "categories": categories
+            }
+            if probability is not None:
+                result["nlp"]["model_probability"] = probability
+
+    return respond({"results": results})
+
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_stream():
+    # Raw UTF-8 text body, scanned chunk by chunk without buffering the whole page
+    rules = RULES.current
+    try:
+        scanner = StreamScanner(rules.pattern_matcher, rules.otp_regex, rules.bank_regex, rules.score_findings)
+    except ValueError as error:  # the rule set's OTP/bank pattern has no bounded match length
+        return jsonify({"error": str(error), "version": rules.version}), 400
+    scan_stream(request.stream.read, scanner, STREAM_CHUNK_SIZE)
+
+    risk_score, flags = scanner.result()
     status_info = get_status(risk_score)
-    
+
     return jsonify({
         "risk_score": risk_score,
         "status": status_info["status"],
         "color": status_info["color"],
         "flags": flags,
-        "entities_found": bank_accounts
+        "entities_found": scanner.bank_accounts,
+        "early_exit": scanner.saturated
     })
 
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(METRICS.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/rules', methods=['GET'])
+def rules_info():
+    return jsonify({"version": RULES.version, "path": RULES.path})
+
+
+@app.route('/rules/flags', methods=['GET'])
+def rules_flags():
+    # The table compact responses index into, fetched once per flags_version
+    rules = RULES.current
+    return jsonify({"version": rules.version, "flags": list(flag_ids(rules))})
+
+
+@app.route('/rules/reload', methods=['POST'])
+def rules_reload():
+    try:
+        version = RULES.reload()
+    except Exception as error:  # bad rule file: keep serving the current rules
+        return jsonify({"error": str(error), "version": RULES.version}), 400
+    return jsonify({"version": version})
+
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({**VERDICT_CACHE.stats(), "version": RULES.version})
+
+
+@app.route('/campaigns', methods=['GET'])
+def campaigns():
+    # Cluster sizes seen by this worker process
+    if CAMPAIGNS is None:
+        return jsonify({"error": "campaign tracking is off (set UNSCAMABLE_CAMPAIGNS)"}), 404
+    limit = min(request.args.get('limit', 20, type=int), 1000)
+    return jsonify({**CAMPAIGNS.stats(), "largest": CAMPAIGNS.largest(limit)})
+
+
+@app.route('/chat/<session_id>', methods=['POST'])
+def chat_message(session_id):
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "body must be a JSON object"}), 400
+    message = data.get('message')
+    if not isinstance(message, str):
+        return jsonify({"error": "message must be a string"}), 400
+    # Seconds since the epoch; windowed sessions use the server clock without one
+    timestamp = data.get('timestamp')
+    if timestamp is not None and (isinstance(timestamp, bool) or not isinstance(timestamp, (int, float))):
+        return jsonify({"error": "timestamp must be a number"}), 400
+
+    try:
+        return jsonify(CHAT_SESSIONS.add_message(session_id, message, timestamp))
+    except SessionFull as error:
+        return jsonify({"error": str(error)}), 413
+
+
+@app.route('/chat/<session_id>', methods=['GET', 'DELETE'])
+def chat_session(session_id):
+    if request.method == 'DELETE':
+        CHAT_SESSIONS.discard(session_id)
+        return jsonify({"deleted": session_id})
+
+    result = CHAT_SESSIONS.result(session_id)
+    if result is None:
+        return jsonify({"error": "unknown chat session"}), 404
+    return jsonify(result)
+
+
+def segment_verdict(session):
+    risk_score, flags, bank_accounts = session.verdict()
+    status_info = get_status(risk_score)
+
+    result = {
+        "risk_score": risk_score,
+        "status": status_info["status"],
+        "color": status_info["color"],
+        "flags": flags,
+        "entities_found": bank_accounts
+    }
+    # Segments are checked against the blocklist as they are scored, and the
+    # model reads the page as a whole, as /analyze does for one message
+    if REPUTATION is not None:
+        apply_listed(result, session.listed())
+    apply_model([result], [session.model_text()])
+    result["chat"] = session.result()
+    return result
+
+
+def valid_digest(digest):
+    return isinstance(digest, str) and 0 < len(digest) <= MAX_DIGEST_LENGTH
+
+
+@app.route('/chat/<session_id>/sync', methods=['POST'])
+def chat_sync(session_id):
+    # Step 1 of the delta protocol: the client lists the hashes of every
+    # segment on the page and learns which ones the server still needs;
+    # segments no longer on the page stop counting towards the verdict
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "body must be a JSON object"}), 400
+    digests = data.get('segments')
+    if not isinstance(digests, list) or not all(valid_digest(d) for d in digests):
+        return jsonify({"error": "segments must be a list of hash strings"}), 400
+    if len(digests) > MAX_SEGMENTS:
+        return jsonify({"error": f"more than {MAX_SEGMENTS} segments"}), 400
+
+    def sync(session):
+        return {"missing": session.sync(digests), **segment_verdict(session)}
+
+    return respond(SEGMENT_SESSIONS.apply(session_id, sync))
+
+
+@app.route('/chat/<session_id>/segments', methods=['POST'])
+def chat_segments(session_id):
+    # Step 2: upload only the missing segments; each is scored once
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "body must be a JSON object"}), 400
+    segments = data.get('segments')
+    if not isinstance(segments, list) or not all(
+        isinstance(s, dict) and valid_digest(s.get('hash')) and isinstance(s.get('text'), str)
+        for s in segments
+    ):
+        return jsonify({"error": "segments must be a list of {hash, text} objects"}), 400
+    if len(segments) > MAX_SEGMENTS:
+        return jsonify({"error": f"more than {MAX_SEGMENTS} segments"}), 400
+
+    def add(session):
+        for segment in segments:
+            session.add_segment(segment['hash'], segment['text'])
+        return segment_verdict(session)
+
+    return respond(SEGMENT_SESSIONS.apply(session_id, add))
+
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
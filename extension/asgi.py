@@ -0,0 +1,263 @@
+"""Async serving mode for the /analyze contract.
+
+A plain ASGI application, so no extra framework is needed:
+
+    uvicorn asgi:app --workers 2
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+
+Slow uploads only hold a coroutine, not a worker. Scoring runs on a bounded
+process pool; when every slot is busy a request waits up to
+ASYNC_QUEUE_TIMEOUT seconds for one and is then rejected with 429, and a
+request whose scoring takes longer than ASYNC_REQUEST_TIMEOUT gets a 504.
+A body still arriving after ASYNC_READ_TIMEOUT seconds gets a 408, so a
+client trickling bytes cannot hold a connection open indefinitely.
+If a scoring process dies, the pool is replaced and the request gets a 503.
+The verdict cache, which may be a shared SQLite file, is read and written
+on a thread so it never blocks the event loop. Campaigns are tracked in
+this process, for cache hits and misses alike: a scoring process returns
+the message's MinHash signature with its verdict and the index here is
+updated with it, so campaign verdicts are not reused in this mode.
+Compressed bodies and compact responses work as in app.py (see
+``wire_format``); MAX_BODY_BYTES bounds both the body as sent and inflated.
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app import (
+    RULES,
+    VERDICT_CACHE,
+    analyze_text_spans,
+    apply_model,
+    campaign_signature,
+    flag_ids,
+    normalize,
+    observe_campaign,
+    rule_verdict,
+    verdict_version,
+    with_campaign,
+)
+from wire_format import BodyError, Inflater, compact_payload, content_encoding, encode_compact, wants_compact
+
+ASYNC_WORKERS = int(os.environ.get('ASYNC_WORKERS', os.cpu_count() or 1))
+ASYNC_MAX_INFLIGHT = int(os.environ.get('ASYNC_MAX_INFLIGHT', ASYNC_WORKERS * 4))
+ASYNC_QUEUE_TIMEOUT = float(os.environ.get('ASYNC_QUEUE_TIMEOUT', 2.0))
+ASYNC_REQUEST_TIMEOUT = float(os.environ.get('ASYNC_REQUEST_TIMEOUT', 10.0))
+ASYNC_READ_TIMEOUT = float(os.environ.get('ASYNC_READ_TIMEOUT', 30.0))
+MAX_BODY_BYTES = int(os.environ.get('MAX_BODY_BYTES', 8 * 1024 * 1024))
+
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", b"POST, OPTIONS"),
+    (b"access-control-allow-headers", b"Content-Type, Content-Encoding"),
+]
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=()):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = list(headers)
+
+
+def score_text(raw_text, spans=False):
+    # Runs in a pool process, whose campaign index nobody reads: the verdict
+    # goes back without a campaign block, with the signature to observe it by
+    if spans:
+        return analyze_text_spans(raw_text), None
+    result = rule_verdict(raw_text, RULES.current)
+    apply_model([result], [raw_text])
+    return result, campaign_signature(raw_text)
+
+
+class AnalyzeService:
+    """Scores /analyze requests on a process pool with a bounded number in flight."""
+
+    def __init__(self, workers=ASYNC_WORKERS, max_inflight=ASYNC_MAX_INFLIGHT,
+                 queue_timeout=ASYNC_QUEUE_TIMEOUT, request_timeout=ASYNC_REQUEST_TIMEOUT):
+        self.workers = workers
+        self.max_inflight = max_inflight
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self.executor = None
+        self._slots = None
+        self.rejected = 0
+        self.timed_out = 0
+        self.restarts = 0
+
+    def start(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._slots = asyncio.Semaphore(self.max_inflight)
+
+    def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def restart(self, broken):
+        # Requests failing on the same broken pool replace it only once
+        if self.executor is not broken:
+            return
+        self.restarts += 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    async def analyze(self, raw_text, spans=False):
+        if self.executor is None:  # servers without lifespan support
+            self.start()
+
+        # Span results point into this exact text, so they bypass the cache
+        key = None if spans else VERDICT_CACHE.key(normalize(raw_text), verdict_version(RULES.current))
+        result = await asyncio.to_thread(VERDICT_CACHE.get, key) if key else None
+        if result is not None:
+            _, info = await asyncio.to_thread(observe_campaign, raw_text)
+            return with_campaign(result, info)
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HTTPError(429, "server busy, retry shortly",
+                            [(b"retry-after", b"%d" % max(1, round(self.queue_timeout)))])
+
+        executor = self.executor
+        try:
+            future = asyncio.get_running_loop().run_in_executor(executor, score_text, raw_text, spans)
+        except BrokenProcessPool:
+            self._slots.release()
+            self.restart(executor)
+            raise HTTPError(503, "scoring process crashed, retry shortly", [(b"retry-after", b"1")])
+        # The slot is only freed once the worker is really done, even after a timeout
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result, signature = await asyncio.wait_for(asyncio.shield(future), self.request_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise HTTPError(504, "analysis timed out")
+        except BrokenProcessPool:
+            self.restart(executor)
+            raise HTTPError(503, "scoring process crashed, retry shortly", [(b"retry-after", b"1")])
+
+        if spans:
+            return result
+        await asyncio.to_thread(VERDICT_CACHE.put, key, result)
+        _, info = observe_campaign(raw_text, signature)
+        return with_campaign(result, info)
+
+
+service = AnalyzeService()
+
+
+def header(scope, name):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+async def read_body(receive, encoding=""):
+    # Compressed bodies are inflated chunk by chunk as they arrive
+    try:
+        inflater = Inflater(encoding, MAX_BODY_BYTES) if encoding else None
+    except BodyError as error:
+        raise HTTPError(error.status, str(error))
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise HTTPError(400, "client disconnected")
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise HTTPError(413, "request body too large")
+        try:
+            if inflater is not None:
+                chunk = inflater.feed(chunk)
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                if inflater is not None:
+                    inflater.finish()
+                return b"".join(chunks)
+        except BodyError as error:
+            raise HTTPError(error.status, str(error))
+
+
+async def send_json(send, status, payload, headers=()):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send_body(send, status, body, b"application/json", headers)
+
+
+async def send_body(send, status, body, content_type, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type),
+            (b"content-length", b"%d" % len(body)),
+            *CORS_HEADERS,
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            service.start()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            service.stop()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    if scope["path"] != "/analyze":
+        await send_json(send, 404, {"error": "not found"})
+        return
+    if scope["method"] == "OPTIONS":
+        await send({"type": "http.response.start", "status": 204, "headers": CORS_HEADERS})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    if scope["method"] != "POST":
+        await send_json(send, 405, {"error": "method not allowed"})
+        return
+
+    try:
+        try:
+            body = await asyncio.wait_for(
+                read_body(receive, content_encoding(header(scope, b"content-encoding"))), ASYNC_READ_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            raise HTTPError(408, "request body timed out")
+        try:
+            data = json.loads(body)
+        except (ValueError, UnicodeDecodeError):
+            raise HTTPError(400, "invalid JSON body")
+        raw_text = data.get('text', '') if isinstance(data, dict) else ''
+        if not isinstance(raw_text, str):
+            raise HTTPError(400, "text must be a string")
+
+        result = await service.analyze(raw_text, bool(data.get('spans')) if isinstance(data, dict) else False)
+    except HTTPError as error:
+        await send_json(send, error.status, {"error": error.message}, error.headers)
+        return
+
+    if wants_compact(header(scope, b"accept")):
+        rules = RULES.current
+        body, content_type = encode_compact({**compact_payload(result, flag_ids(rules)), "flags_version": rules.version})
+        await send_body(send, 200, body, content_type.encode())
+        return
+    await send_json(send, 200, result)
@@ -24,7 +24,7 @@ function uniqueStrings(items) {
   return result;
 }
 
-function scrapeChatText() {
+function scrapeChatSegments() {
   const collected = [];
 
   for (const selector of MESSAGE_SELECTORS) {
@@ -40,7 +40,11 @@ function scrapeChatText() {
     collected.push(document.body.innerText || '');
   }
 
-  const text = uniqueStrings(collected).join(' ').trim();
+  return uniqueStrings(collected);
+}
+
+function scrapeChatText() {
+  const text = scrapeChatSegments().join(' ').trim();
 
   return text || 'Test Connection Successful!';
 }
@@ -48,6 +52,8 @@ function scrapeChatText() {
 chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
   if (request.action === 'analyze_text') {
     sendResponse({ text: scrapeChatText() });
+  } else if (request.action === 'scrape_segments') {
+    sendResponse({ segments: scrapeChatSegments(), page: location.origin + location.pathname });
   }
   return true;
 });
\ No newline at end of file
@@ -0,0 +1,11 @@
+# Picked up automatically by `gunicorn app:app` run from this directory.
+import os
+
+# Import the app (and compile or map the rules) once in the master; workers
+# are forked with those pages already in place instead of each rebuilding them
+preload_app = True
+
+# One process per worker, WEB_CONCURRENCY of them (gunicorn's own default).
+# Chat and segment sessions live in the worker that created them; see
+# "Chat Sessions and Workers" in RAILWAY_DEPLOYMENT.md for routing them
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
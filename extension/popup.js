@@ -1,3 +1,8 @@
+const SERVER_URL = 'http://localhost:5000';
+const MAX_SEGMENTS = 5000;  // server-side limit per request
+const BLOCKLIST_LABELS = { account: 'Account', phone: 'Phone Number', domain: 'Domain' };
+const COMPRESS_MIN_CHARS = 1024;  // smaller bodies are sent as they are
+
 // Get risk level label based on score
 function getRiskLevel(score) {
   if (score > 70) return "High Risk";
@@ -45,14 +50,83 @@ function displayResult(result) {
     factorsList.appendChild(li);
   }
   
-  // Add bank accounts if found
-  if (result.entities_found && result.entities_found.length > 0) {
+  // Add bank accounts if found; only the ones in the server's blocklist index are blacklisted
+  if (result.blocklisted && result.blocklisted.length > 0) {
+    result.blocklisted.forEach(entity => {
+      const [kind, value] = entity.split(/:(.*)/);
+      const li = document.createElement('li');
+      li.textContent = `Blacklisted ${BLOCKLIST_LABELS[kind] || kind}: ${value}`;
+      factorsList.appendChild(li);
+    });
+  } else if (result.entities_found && result.entities_found.length > 0) {
+    const li = document.createElement('li');
+    li.textContent = `Bank Account: ${result.entities_found[0]}`;
+    factorsList.appendChild(li);
+  }
+
+  // Add the whole-conversation verdict
+  if (result.chat && result.chat.chat_risk_score > 0) {
     const li = document.createElement('li');
-    li.textContent = `Blacklisted Account: ${result.entities_found[0]}`;
+    li.textContent = `Conversation: ${result.chat.reason} (${result.chat.risk_level})`;
     factorsList.appendChild(li);
   }
 }
 
+// Short content hash of a segment; the server remembers what it scored by it
+async function segmentHash(text) {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+  return Array.from(new Uint8Array(digest).slice(0, 8), (b) => b.toString(16).padStart(2, '0')).join('');
+}
+
+// One server-side session per browser profile, tab and page
+async function sessionId(tabId, page) {
+  let installId = localStorage.getItem('unscamableInstallId');
+  if (!installId) {
+    installId = crypto.randomUUID();
+    localStorage.setItem('unscamableInstallId', installId);
+  }
+  return `${installId}-${tabId}-${await segmentHash(page)}`;
+}
+
+// Page text gzips to a fraction of its size, and on slow links the upload
+// is most of the wait
+async function encodeBody(payload) {
+  const json = JSON.stringify(payload);
+  if (json.length < COMPRESS_MIN_CHARS || typeof CompressionStream === 'undefined') {
+    return { body: json, headers: { 'Content-Type': 'application/json' } };
+  }
+  const stream = new Blob([json]).stream().pipeThrough(new CompressionStream('gzip'));
+  return {
+    body: await new Response(stream).arrayBuffer(),
+    headers: { 'Content-Type': 'application/json', 'Content-Encoding': 'gzip' }
+  };
+}
+
+async function postJson(path, payload) {
+  const { body, headers } = await encodeBody(payload);
+  const response = await fetch(`${SERVER_URL}${path}`, { method: 'POST', headers, body });
+  if (!response.ok) throw new Error(`${path} answered ${response.status}`);
+  return response.json();
+}
+
+// Delta scan: send every segment's hash, then upload only the texts the
+// server has not scored yet in this session
+async function analyzeSegments(tabId, page, segments) {
+  segments = segments.slice(-MAX_SEGMENTS);
+  const session = await sessionId(tabId, page);
+  const hashes = await Promise.all(segments.map(segmentHash));
+
+  const sync = await postJson(`/chat/${session}/sync`, { segments: hashes });
+  if (sync.missing.length === 0) return sync;
+
+  const missing = new Set(sync.missing);
+  const upload = [];
+  segments.forEach((text, i) => {
+    if (missing.delete(hashes[i])) upload.push({ hash: hashes[i], text });
+  });
+  return postJson(`/chat/${session}/segments`, { segments: upload });
+}
+
 // Close button handler
 document.getElementById('closeBtn').addEventListener('click', () => {
   window.close();
@@ -67,7 +141,7 @@ chrome.tabs.query({active: true, currentWindow: true}, (tabs) => {
     return;
   }
 
-  chrome.tabs.sendMessage(tabs[0].id, {action: "analyze_text"}, async (response) => {
+  chrome.tabs.sendMessage(tabs[0].id, {action: "scrape_segments"}, async (response) => {
     // Check if content script responded
     if (chrome.runtime.lastError || !response) {
       document.getElementById('riskLevel').textContent = "Error";
@@ -76,18 +150,9 @@ chrome.tabs.query({active: true, currentWindow: true}, (tabs) => {
       return;
     }
 
-    // If we got text, send to backend
+    // If we got text, send the segments the backend hasn't seen
     try {
-      const serverResponse = await fetch('http://localhost:5000/analyze', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ 
-          text: response.text,
-          image: ""
-        })
-      });
-      
-      const result = await serverResponse.json();
+      const result = await analyzeSegments(tabs[0].id, response.page, response.segments);
       displayResult(result);
     } catch (error) {
       document.getElementById('riskLevel').textContent = "Error";
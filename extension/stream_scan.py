@@ -0,0 +1,110 @@
+import codecs
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+MAX_STREAM_ENTITIES = 100
+
+
+def match_width(regex):
+    """``(shortest, longest)`` match of a compiled ``regex``; ValueError when unbounded."""
+    low, high = sre_parse.parse(regex.pattern, regex.flags).getwidth()
+    if high >= sre_constants.MAXREPEAT:
+        raise ValueError(f"pattern {regex.pattern!r} has no longest match and cannot be streamed")
+    return low, high
+
+
+def otp_carry(regex) -> int:
+    # The longest OTP match plus the character before it, for a \b anchor
+    return match_width(regex)[1] + 1
+
+
+def bank_carry(regex) -> int:
+    # A fixed-length account match needs all but its last character kept
+    low, high = match_width(regex)
+    if low != high:
+        raise ValueError(f"bank pattern {regex.pattern!r} must match a fixed length to be streamed")
+    return high - 1
+
+
+class StreamScanner:
+    """Incremental version of ``calculate_risk`` over text fed in chunks.
+
+    Keeps the automaton state and a short regex tail between chunks, so terms,
+    OTP codes and bank accounts that straddle a chunk boundary are still found,
+    while memory stays bounded by the chunk size. The tails are sized from
+    the longest match of each regex, so rule sets with other OTP or bank
+    patterns stream correctly; ones with an unbounded OTP pattern or a
+    variable-length bank pattern raise ValueError. ``score_findings`` turns the
+    pattern hits, OTP flag and accounts into ``(score, flags)``; once the capped
+    score reaches 100 the scanner is saturated and further input is ignored.
+    """
+
+    def __init__(self, matcher, otp_regex, bank_regex, score_findings):
+        self._matcher = matcher
+        self._otp_regex = otp_regex
+        self._bank_regex = bank_regex
+        self._score_findings = score_findings
+        self._otp_carry = otp_carry(otp_regex)
+        self._bank_carry = bank_carry(bank_regex)
+        self._state = 0
+        self._otp_tail = ""
+        self._otp_at_start = True
+        self._bank_tail = ""
+        self.hits = set()
+        self.otp_found = False
+        self.bank_accounts = []
+        self.saturated = False
+
+    def feed(self, chunk: str, final: bool = False):
+        if self.saturated:
+            return
+        self._state = self._matcher.advance(chunk.lower(), self._state, self.hits)
+
+        self._scan_otp(self._otp_tail + chunk, final)
+        self._scan_bank(self._bank_tail + chunk)
+
+        if self._score_findings(self.hits, self.otp_found, self.bank_accounts)[0] >= 100:
+            self.saturated = True
+
+    def _scan_otp(self, buffer: str, final: bool):
+        if not self.otp_found:
+            for match in self._otp_regex.finditer(buffer):
+                # A match touching either edge of the buffer may be part of a
+                # longer digit run in text we have not seen, so it must wait
+                if match.start() == 0 and not self._otp_at_start:
+                    continue
+                if match.end() == len(buffer) and not final:
+                    continue
+                self.otp_found = True
+                break
+        self._otp_at_start = self._otp_at_start and len(buffer) <= self._otp_carry
+        self._otp_tail = buffer[-self._otp_carry:]
+
+    def _scan_bank(self, buffer: str):
+        # Accounts are fixed length, so any match in the buffer is a match in
+        # the full text, and none can straddle one we already accepted
+        cut = max(len(buffer) - self._bank_carry, 0)
+        for match in self._bank_regex.finditer(buffer):
+            if len(self.bank_accounts) < MAX_STREAM_ENTITIES:
+                self.bank_accounts.append(match.group())
+            cut = max(cut, match.end())
+        self._bank_tail = buffer[cut:]
+
+    def result(self):
+        return self._score_findings(self.hits, self.otp_found, self.bank_accounts)
+
+
+def scan_stream(read, scanner: StreamScanner, chunk_size: int = 65536) -> StreamScanner:
+    """Feed UTF-8 bytes from ``read(size)`` into ``scanner`` until EOF or saturation."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while not scanner.saturated:
+        data = read(chunk_size)
+        if not data:
+            scanner.feed(decoder.decode(b"", final=True), final=True)
+            break
+        scanner.feed(decoder.decode(data))
+    return scanner
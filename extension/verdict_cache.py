@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerdictCache:
+    """Content-addressed cache of /analyze verdicts.
+
+    Entries are keyed by a hash of the normalized text and the rule-set
+    version, held in a per-process LRU with a TTL, and optionally backed by a
+    SQLite file that every gunicorn worker on the box shares.
+    """
+
+    PRUNE_EVERY = 256
+
+    def __init__(self, version: str, max_entries: int = 10000, ttl_seconds: float = 600,
+                 shared_path: str = None, clock=time.time):
+        self.version = version
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared_path = shared_path
+        self._clock = clock
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self._writes = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def key(self, normalized_text: str, version: str = None) -> str:
+        """Cache key for ``normalized_text`` under rule-set ``version`` (default: the cache's)."""
+        digest = hashlib.sha256((version or self.version).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(normalized_text.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def _shared(self):
+        # Connections must not cross a fork, so open one per process
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn = sqlite3.connect(self.shared_path, timeout=1.0, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def get(self, key: str):
+        """Return the cached verdict for ``key`` or None on a miss."""
+        now = self._clock()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._local.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(value)
+                del self._local[key]
+
+            if self.shared_path:
+                try:
+                    row = self._shared().execute(
+                        "SELECT value, expires FROM verdicts WHERE key = ? AND expires > ?",
+                        (key, now)
+                    ).fetchone()
+                except sqlite3.Error:
+                    row = None
+                if row is not None:
+                    self._store_local(key, row[0], row[1])
+                    self.hits += 1
+                    self.shared_hits += 1
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, verdict: dict):
+        value = json.dumps(verdict, ensure_ascii=False)
+        expires = self._clock() + self.ttl_seconds
+        with self._lock:
+            self._store_local(key, value, expires)
+            if self.shared_path:
+                try:
+                    self._put_shared(key, value, expires)
+                except sqlite3.Error:
+                    pass  # the shared tier is best effort; the local entry still serves
+
+    def _store_local(self, key, value, expires):
+        self._local[key] = (value, expires)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def _put_shared(self, key, value, expires):
+        conn = self._shared()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO verdicts (key, value, expires) VALUES (?, ?, ?)",
+                (key, value, expires)
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                # Drop expired rows, then the oldest beyond the size bound
+                conn.execute("DELETE FROM verdicts WHERE expires <= ?", (self._clock(),))
+                conn.execute(
+                    "DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts "
+                    "ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+            if self.shared_path:
+                with self._shared() as conn:
+                    conn.execute("DELETE FROM verdicts")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "entries": len(self._local),
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,218 @@
+"""Compressed request bodies and the compact response format.
+
+Request bodies may be sent with ``Content-Encoding: gzip`` or ``deflate``,
+or ``zstd`` when the optional ``zstandard`` package is installed. They are
+inflated incrementally while they are read, and rejected as soon as the
+inflated size passes the limit, so a small body cannot expand into
+gigabytes of memory before it is refused.
+
+Clients that send ``Accept: application/msgpack`` get compact responses:
+flags are sent as ``flag_ids``, indexes into the flag table served for the
+rules version in ``flags_version``, instead of repeated Thai strings, and
+``status``/``color`` are left out since they follow from ``risk_score``.
+The body is MessagePack when the optional ``msgpack`` package is installed
+and compact JSON otherwise, so clients check the Content-Type.
+"""
+import io
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd bodies are refused with 415 without it
+    zstandard = None
+
+try:
+    import msgpack
+except ImportError:  # optional: compact responses fall back to JSON
+    msgpack = None
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+READ_SIZE = 65536
+
+# zlib window bits: gzip header and trailer, or the zlib wrapper HTTP calls deflate
+ZLIB_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "x-gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+# zstd input is inflated this many bytes at a time: a block of up to 128 KB
+# can take as little as 4 bytes, so one call yields at most about 2 MB
+ZSTD_SLICE = 64
+
+
+class BodyError(Exception):
+    """A request body that cannot be decoded; ``status`` is the HTTP status to answer with."""
+
+    status = 400
+
+
+class BodyTooLarge(BodyError):
+    status = 413
+
+
+class UnsupportedEncoding(BodyError):
+    status = 415
+
+
+class Inflater:
+    """Incremental decoder for one request body with at most ``max_bytes`` of output.
+
+    ``feed`` returns the bytes inflated from each compressed chunk and
+    raises ``BodyTooLarge`` as soon as the total passes ``max_bytes``;
+    no call holds more than about ``max_bytes`` of output in memory.
+    ``finish`` raises ``BodyError`` for a body cut off before its end.
+    """
+
+    def __init__(self, encoding: str, max_bytes: int):
+        self.encoding = encoding
+        self.max_bytes = max_bytes
+        self.size = 0
+        if encoding in ZLIB_WBITS:
+            self._zlib = zlib.decompressobj(ZLIB_WBITS[encoding])
+            self._zstd = None
+        elif encoding == "zstd" and zstandard is not None:
+            self._zlib = None
+            self._zstd = zstandard.ZstdDecompressor().decompressobj(write_size=READ_SIZE)
+        else:
+            raise UnsupportedEncoding(f"unsupported Content-Encoding: {encoding}")
+
+    def _count(self, length: int):
+        self.size += length
+        if self.size > self.max_bytes:
+            raise BodyTooLarge("request body too large")
+
+    def feed(self, chunk: bytes) -> bytes:
+        pieces = []
+        if self._zstd is not None:
+            try:
+                for offset in range(0, len(chunk), ZSTD_SLICE):
+                    piece = self._zstd.decompress(chunk[offset:offset + ZSTD_SLICE])
+                    self._count(len(piece))
+                    pieces.append(piece)
+            except zstandard.ZstdError as error:
+                raise BodyError(f"invalid zstd body: {error}")
+            return b"".join(pieces)
+
+        try:
+            while chunk:
+                # Never ask for more than one byte past the limit
+                piece = self._zlib.decompress(chunk, self.max_bytes - self.size + 1)
+                self._count(len(piece))
+                pieces.append(piece)
+                chunk = self._zlib.unconsumed_tail
+        except zlib.error as error:
+            raise BodyError(f"invalid {self.encoding} body: {error}")
+        return b"".join(pieces)
+
+    def finish(self):
+        """Check that the body was complete."""
+        decoder = self._zlib if self._zlib is not None else self._zstd
+        if not decoder.eof:
+            raise BodyError(f"truncated {self.encoding} body")
+
+
+def content_encoding(value: str) -> str:
+    """The one coding of a Content-Encoding header, or "" for none."""
+    value = (value or "").strip().lower()
+    return "" if value == "identity" else value
+
+
+def decode_body(body: bytes, encoding: str, max_bytes: int) -> bytes:
+    """Inflate a whole ``body`` sent with Content-Encoding ``encoding``."""
+    if not encoding:
+        return body
+    inflater = Inflater(encoding, max_bytes)
+    data = inflater.feed(body)
+    inflater.finish()
+    return data
+
+
+class DecodedInput(io.RawIOBase):
+    """``wsgi.input`` replacement that inflates the body as it is read."""
+
+    def __init__(self, stream, inflater: Inflater):
+        self._stream = stream
+        self._inflater = inflater
+        self._buffer = b""
+        self._done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._buffer and not self._done:
+            chunk = self._stream.read(READ_SIZE)
+            if chunk:
+                self._buffer = self._inflater.feed(chunk)
+            else:
+                self._inflater.finish()
+                self._done = True
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class DecodeRequestBodies:
+    """WSGI middleware: every route reads compressed bodies already inflated.
+
+    Errors found while the body is read surface as ``BodyError`` from the
+    app's own read, for its error handler to answer.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    def __call__(self, environ, start_response):
+        encoding = content_encoding(environ.get("HTTP_CONTENT_ENCODING"))
+        if not encoding:
+            return self.app(environ, start_response)
+        try:
+            inflater = Inflater(encoding, self.max_bytes)
+        except UnsupportedEncoding as error:
+            body = json.dumps({"error": str(error)}).encode("utf-8")
+            start_response("415 Unsupported Media Type",
+                           [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+            return [body]
+
+        environ = dict(environ)
+        environ["wsgi.input"] = DecodedInput(environ["wsgi.input"], inflater)
+        # The inflated length is unknown up front; the body ends where the stream does
+        environ.pop("CONTENT_LENGTH", None)
+        environ.pop("HTTP_CONTENT_ENCODING", None)
+        environ["wsgi.input_terminated"] = True
+        return self.app(environ, start_response)
+
+
+def wants_compact(accept: str) -> bool:
+    accept = (accept or "").lower()
+    return any(media_type in accept for media_type in MSGPACK_TYPES)
+
+
+def compact_payload(payload, flag_ids: dict):
+    """``payload`` with every verdict's ``flags`` replaced by ``flag_ids``.
+
+    Flags missing from ``flag_ids`` (a rules reload between scoring and
+    answering) stay in ``flags`` as strings.
+    """
+    if isinstance(payload, list):
+        return [compact_payload(item, flag_ids) for item in payload]
+    if not isinstance(payload, dict):
+        return payload
+    compact = {}
+    for key, value in payload.items():
+        if key in ("status", "color") and "risk_score" in payload:
+            continue
+        if key == "flags" and isinstance(value, list):
+            compact["flag_ids"] = [flag_ids[flag] for flag in value if flag in flag_ids]
+            unknown = [flag for flag in value if flag not in flag_ids]
+            if unknown:
+                compact["flags"] = unknown
+            continue
+        compact[key] = compact_payload(value, flag_ids)
+    return compact
+
+
+def encode_compact(payload):
+    """``(body, content_type)``: MessagePack when available, else JSON without spaces."""
+    if msgpack is not None:
+        return msgpack.packb(payload, use_bin_type=True), MSGPACK_TYPES[0]
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), "application/json"
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The NLP package lives at the repo root; the service modules (stream_scan,
+# wire_format, app) import each other by plain name from extension/
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "extension"))
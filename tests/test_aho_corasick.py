@@ -0,0 +1,61 @@
+import random
+
+from NLP.aho_corasick import Automaton, MappedAutomaton
+
+ALPHABET = "abcด่ว"
+
+
+def random_keys(rng, count):
+    return [(("".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 4)))), index) for index in range(count)]
+
+
+def oracle_find(keys, text):
+    return {label for key, label in keys if key in text}
+
+
+def test_find_matches_substring_oracle():
+    rng = random.Random(7)
+    for _ in range(300):
+        keys = random_keys(rng, rng.randint(1, 12))
+        automaton = Automaton(keys)
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+        assert automaton.find(text) == oracle_find(keys, text)
+
+
+def test_find_spans_matches_regex_oracle():
+    rng = random.Random(11)
+    for _ in range(300):
+        # One key per label, so its first occurrence is the label's span
+        keys = random_keys(rng, rng.randint(1, 8))
+        automaton = Automaton(keys)
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+        spans = automaton.find_spans(text)
+        assert set(spans) == oracle_find(keys, text)
+        for key, label in keys:
+            if label in spans:
+                start = text.find(key)
+                assert spans[label] == (start, start + len(key))
+
+
+def test_advance_across_chunks_matches_one_shot():
+    rng = random.Random(3)
+    for _ in range(200):
+        keys = random_keys(rng, 10)
+        automaton = Automaton(keys)
+        text = "".join(rng.choice(ALPHABET) for _ in range(60))
+        found, state = set(), 0
+        for start in range(0, len(text), 5):
+            state = automaton.advance(text[start:start + 5], state, found)
+        assert found == automaton.find(text)
+
+
+def test_mapped_automaton_matches_automaton():
+    rng = random.Random(5)
+    for hot_states in (1, 4, 16384):
+        keys = random_keys(rng, 40)
+        automaton = Automaton(keys)
+        mapped = MappedAutomaton(*automaton.to_arrays(), hot_states=hot_states)
+        for _ in range(50):
+            text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+            assert mapped.find(text) == automaton.find(text)
+            assert mapped.find_spans(text) == automaton.find_spans(text)
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+asgi = pytest.importorskip("asgi")
+
+SCOPE = {"type": "http", "path": "/analyze", "method": "POST", "headers": []}
+
+
+def call(receive):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi.app(SCOPE, receive, send))
+    return sent[0]["status"], sent[1]["body"]
+
+
+def test_trickled_body_times_out(monkeypatch):
+    monkeypatch.setattr(asgi, "ASYNC_READ_TIMEOUT", 0.05)
+
+    async def receive():
+        await asyncio.sleep(0.01)
+        return {"type": "http.request", "body": b" ", "more_body": True}
+
+    status, body = call(receive)
+    assert status == 408
+    assert b"timed out" in body
+
+
+def test_invalid_json_is_still_a_bad_request():
+    async def receive():
+        return {"type": "http.request", "body": b"{", "more_body": False}
+
+    assert call(receive)[0] == 400
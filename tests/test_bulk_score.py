@@ -0,0 +1,16 @@
+from NLP.bulk_score import score_conversation
+
+WINDOW = (50, 3600)
+
+
+def test_malformed_timestamp_skips_only_its_row():
+    rows = [
+        {"text": "กรุณายืนยันตัวตนด่วน", "sent_at": "2026-10-01T10:00:00"},
+        {"text": "โอนเงินด่วน", "sent_at": "yesterday-ish"},
+        {"text": "คลิกลิงก์นี้", "sent_at": 1790848860},
+    ]
+    result = score_conversation(("c1", rows), window=WINDOW, timestamp_field="sent_at")
+    expected = score_conversation(("c1", rows[:1] + rows[2:]), window=WINDOW, timestamp_field="sent_at")
+    assert result["messages"] == 2
+    assert result["skipped_rows"] == 1
+    assert {**result, "skipped_rows": None} == {**expected, "skipped_rows": None}
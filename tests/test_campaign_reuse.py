@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+
+import app as service  # noqa: E402
+from NLP.campaigns import CampaignIndex  # noqa: E402
+
+TEMPLATE = ("แจ้งจากธนาคาร บัญชีถูกระงับ กรุณายืนยันตัวตนด่วน ผ่านลิงก์ภายใน 24 ชั่วโมง "
+            "มิฉะนั้นบัญชีจะถูกปิดถาวร ติดต่อเจ้าหน้าที่คุณสมชาย ค้างชำระ 1,500 บาท{extra}")
+
+
+@pytest.fixture
+def campaigns(monkeypatch):
+    index = CampaignIndex(100)
+    monkeypatch.setattr(service, "CAMPAIGNS", index)
+    return index
+
+
+def verdict(result):
+    return result["risk_score"], result["flags"], result["entities_found"]
+
+
+def test_reused_verdict_rescores_otp_and_accounts(campaigns):
+    rules = service.RULES.current
+    first = TEMPLATE.format(extra=" รหัส 482913 โอนเข้าบัญชี 123-4-56789-0")
+    copies = [
+        TEMPLATE.format(extra=" โอนเข้าบัญชีเดิม"),  # no OTP, no account
+        TEMPLATE.format(extra=" รหัส 551208 โอนเข้าบัญชี 987-6-54321-0"),
+        TEMPLATE.format(extra=" รหัส 482913"),
+    ]
+    first_result = service.analyze_text(first)
+    assert not first_result["campaign"]["reused"]
+    for copy in copies:
+        result = service.analyze_text(copy)
+        assert result["campaign"]["id"] == first_result["campaign"]["id"]
+        assert result["campaign"]["reused"]
+        risk_score, flags, accounts = rules.analyze(copy)
+        assert verdict(result) == (risk_score, flags, accounts)
+
+
+def test_cache_hits_count_towards_campaign(campaigns, monkeypatch):
+    monkeypatch.setattr(service, "VERDICT_CACHE", service.VerdictCache("test", max_entries=100, ttl_seconds=60))
+    text = TEMPLATE.format(extra="")
+    sizes = [result["campaign"]["size"] for result in service.cached_analyze_texts([text] * 3)]
+    assert sizes == [1, 2, 3]
+    # The cached verdict carries no campaign block of its own
+    key = service.VERDICT_CACHE.key(service.normalize(text), service.verdict_version(service.RULES.current))
+    assert "campaign" not in service.VERDICT_CACHE.get(key)
+
+
+
+def test_async_service_counts_campaigns_in_this_process(campaigns, monkeypatch):
+    asgi = pytest.importorskip("asgi")
+    monkeypatch.setattr(asgi, "VERDICT_CACHE", service.VerdictCache("test", max_entries=100, ttl_seconds=60))
+    text = TEMPLATE.format(extra="")
+
+    async def run():
+        analyzer = asgi.AnalyzeService(workers=1)
+        analyzer.start()
+        try:
+            return [await analyzer.analyze(text) for _ in range(3)]
+        finally:
+            analyzer.stop()
+
+    results = asyncio.run(run())
+    # One miss scored in the pool, then two cache hits
+    assert [result["campaign"]["size"] for result in results] == [1, 2, 3]
+    assert campaigns.messages == 3
+    assert verdict(results[0]) == verdict(service.analyze_text(text))
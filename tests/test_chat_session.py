@@ -0,0 +1,23 @@
+import pytest
+
+from NLP.chat_session import ChatSession, ChatSessionStore, SessionFull, WindowedChatSession
+
+MESSAGE = "กรุณายืนยันตัวตนด่วน"
+
+
+def test_whole_chat_sessions_are_capped():
+    store = ChatSessionStore(factory=ChatSession, max_messages=3)
+    for _ in range(3):
+        store.add_message("chat", MESSAGE)
+    with pytest.raises(SessionFull):
+        store.add_message("chat", MESSAGE)
+
+
+def test_windowed_sessions_are_not_capped():
+    store = ChatSessionStore(factory=lambda: WindowedChatSession(5, clock=None), max_messages=3, max_bytes=64)
+    results = [store.add_message("chat", MESSAGE) for _ in range(20)]
+    # Past the window only the last five messages count
+    window = WindowedChatSession(5, clock=None)
+    for _ in range(5):
+        expected = window.add_message(MESSAGE)
+    assert results[-1] == expected
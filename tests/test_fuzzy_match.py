@@ -0,0 +1,58 @@
+import random
+
+from NLP.fuzzy_match import FuzzyMatcher
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def oracle_find(entries, text, max_edits, min_length):
+    """Labels of keys equal to, or (when long enough) within ``max_edits`` of, some substring."""
+    found = set()
+    for key, label in entries:
+        if key in text:
+            found.add(label)
+        elif max_edits and len(key) >= min_length and any(
+            levenshtein(key, text[start:end]) <= max_edits
+            for start in range(len(text) + 1)
+            for end in range(start, min(len(text), start + len(key) + max_edits) + 1)
+        ):
+            found.add(label)
+    return found
+
+
+def test_one_edit_at_min_length():
+    matcher = FuzzyMatcher([("verify", "v")], max_edits=1, min_length=6)
+    assert matcher.find("pleaseverifynow") == {"v"}
+    assert matcher.find("pleaseveriffnow") == {"v"}  # substitution
+    assert matcher.find("pleaseverifxynow") == {"v"}  # insertion
+    assert matcher.find("pleaseverfynow") == {"v"}  # deletion
+    assert matcher.find("pleaseverxxynow") == set()  # two edits
+
+
+def test_short_keys_only_match_exactly():
+    matcher = FuzzyMatcher([("login", "l")], max_edits=1, min_length=6)
+    assert matcher.find("xxloginxx") == {"l"}
+    assert matcher.find("xxlogynxx") == set()
+
+
+def test_keys_are_folded():
+    matcher = FuzzyMatcher([("Pay Now", "p")], max_edits=1, min_length=6)
+    assert matcher.find("xpaynowx") == {"p"}
+
+
+def test_matches_edit_distance_oracle():
+    rng = random.Random(13)
+    for max_edits in (1, 2):
+        for _ in range(300):
+            entries = [("".join(rng.choice("abc") for _ in range(rng.randint(2, 8))), index) for index in range(4)]
+            text = "".join(rng.choice("abc") for _ in range(rng.randint(0, 14)))
+            matcher = FuzzyMatcher(entries, max_edits=max_edits, min_length=5)
+            assert matcher.find(text) == oracle_find(entries, text, max_edits, 5), (entries, text)
@@ -0,0 +1,57 @@
+import pytest
+
+from NLP import cascade, ngram_model
+from NLP.cascade import DEFAULT_BAND, DEFAULT_WEIGHT, Cascade
+
+
+def small_model():
+    texts, labels = ngram_model.seed_corpus()
+    return ngram_model.train(texts, labels, bits=12, epochs=30)
+
+
+def test_training_and_prediction_are_deterministic(tmp_path):
+    np = pytest.importorskip("numpy")
+    texts, _ = ngram_model.seed_corpus()
+    first, second = small_model(), small_model()
+    assert first.version == second.version
+    assert np.array_equal(first.weights, second.weights)
+
+    batch = first.predict_proba(texts)
+    # A text's probability does not depend on the batch it is scored in
+    assert np.allclose(batch[:3], [first.predict_proba([text])[0] for text in texts[:3]])
+
+    path = str(tmp_path / "model.npz")
+    first.save(path)
+    loaded = ngram_model.NgramModel.load(path)
+    assert loaded.version == first.version
+    assert np.array_equal(loaded.predict_proba(texts), batch)
+
+
+def test_refine_only_moves_scores_inside_the_band():
+    pytest.importorskip("numpy")
+    model = Cascade(small_model())
+    low, high = DEFAULT_BAND
+    scores = [0, low - 1, low, 35, high, high + 1, 100]
+    texts = ["ยืนยันตัวตนด่วน กดลิงก์"] * len(scores)
+    refined, probabilities = model.refine(scores, texts)
+    for score, new, probability in zip(scores, refined, probabilities):
+        if low <= score <= high:
+            assert probability is not None
+            assert abs(new - score) <= DEFAULT_WEIGHT
+            assert 0 <= new <= 100
+        else:
+            assert probability is None
+            assert new == score
+
+
+def test_without_numpy_the_rules_score_alone(monkeypatch, tmp_path):
+    monkeypatch.setattr(ngram_model, "np", None)
+    with pytest.raises(ImportError):
+        ngram_model.NgramModel([0.0] * 16)
+    with pytest.raises(ImportError):
+        ngram_model.train(["a"], [1])
+
+    cascade.load_cascade.cache_clear()
+    monkeypatch.setenv("UNSCAMABLE_MODEL", str(tmp_path / "model.npz"))
+    assert cascade.cascade_from_env() is None
+    cascade.load_cascade.cache_clear()
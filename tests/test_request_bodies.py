@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+
+import app as service  # noqa: E402
+
+NOT_OBJECTS = [["hello"], "hello", 42, None]
+
+
+@pytest.fixture
+def client():
+    return service.app.test_client()
+
+
+@pytest.mark.parametrize("body", NOT_OBJECTS)
+def test_batch_rejects_non_object_bodies(client, body):
+    assert client.post("/analyze/batch", json=body).status_code == 400
+
+
+@pytest.mark.parametrize("body", NOT_OBJECTS)
+def test_chat_message_rejects_non_object_bodies(client, body):
+    assert client.post("/chat/body-test", json=body).status_code == 400
+
+
+@pytest.mark.parametrize("path", ["/chat/body-test/sync", "/chat/body-test/segments"])
+@pytest.mark.parametrize("body", NOT_OBJECTS)
+def test_segment_routes_reject_non_object_bodies(client, path, body):
+    assert client.post(path, json=body).status_code == 400
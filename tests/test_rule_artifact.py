@@ -0,0 +1,25 @@
+from NLP import scam_messages
+from NLP.rule_engine import CompiledRules, build_artifact, compile_file, default_ruleset
+
+TEXTS = scam_messages.MESSAGES[:50] + ["", "ธรรมดา ไม่มีอะไร", "OTP 123456 โอนเข้า 123-4-56789-0"]
+
+
+def test_artifact_round_trip(tmp_path):
+    ruleset = default_ruleset()
+    path = str(tmp_path / "rules.bin")
+    version = build_artifact(ruleset, path)
+    compiled = CompiledRules(ruleset)
+    loaded = compile_file(path)
+
+    assert version == compiled.version == loaded.version
+    assert loaded.ruleset == compiled.ruleset
+    for text in TEXTS:
+        assert loaded.analyze(text) == compiled.analyze(text)
+        assert loaded.analyze_spans(text) == compiled.analyze_spans(text)
+        assert loaded.score_message(text, spans=True) == compiled.score_message(text, spans=True)
+
+
+def test_json_rule_file_is_not_an_artifact(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text('{"version": "custom"}', encoding="utf-8")
+    assert compile_file(str(path)).version == "custom"
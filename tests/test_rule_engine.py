@@ -0,0 +1,30 @@
+from NLP.rule_engine import CompiledRules, default_ruleset
+
+FUZZY = {"enabled": True, "max_edits": 1, "min_length": 6}
+
+
+def fuzzy_rules():
+    return CompiledRules({**default_ruleset(), "fuzzy": FUZZY})
+
+
+def test_fuzzy_short_terms_stay_within_words():
+    # "thaisister" once folded holds the "ais" term of the prize scenario
+    text = "This is a big Thai sister online"
+    exact = CompiledRules(default_ruleset())
+    rules = fuzzy_rules()
+    _, flags, _ = rules.analyze(text)
+    assert "รางวัล/โชค" not in flags
+    assert flags == exact.analyze(text)[1]
+    assert rules.analyze_spans(text)[1] == flags
+
+
+def test_fuzzy_short_terms_still_match_as_written():
+    _, flags, _ = fuzzy_rules().analyze("ลุ้นรับรางวัลจาก AIS วันนี้")
+    assert "รางวัล/โชค" in flags
+
+
+def test_fuzzy_long_terms_match_through_obfuscation():
+    _, exact_flags, _ = CompiledRules(default_ruleset()).analyze("แอป t r u e m o n e y แจ้งเตือน")
+    _, flags, _ = fuzzy_rules().analyze("แอป t r u e m o n e y แจ้งเตือน")
+    assert "แจ้งเตือนแอปจ่ายเงิน" not in exact_flags
+    assert "แจ้งเตือนแอปจ่ายเงิน" in flags
@@ -0,0 +1,59 @@
+from functools import partial
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+
+import app as service  # noqa: E402
+from NLP.chat_session import ChatSessionStore, SegmentSession  # noqa: E402
+from NLP.reputation import ReputationIndex, build_index  # noqa: E402
+
+ACCOUNT = "123-4-56789-0"
+SCAM = ("แจ้งจากธนาคาร บัญชีถูกระงับ กรุณายืนยันตัวตนด่วน ผ่านลิงก์ภายใน 24 ชั่วโมง "
+        "รหัส OTP 482913 โอนเข้าบัญชี 123-4-56789-0")
+GREETING = "สวัสดีครับ พรุ่งนี้ไปกินข้าวกันไหม"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(service, "SEGMENT_SESSIONS", ChatSessionStore(factory=SegmentSession))
+    return service.app.test_client()
+
+
+def upload(client, session_id, segments):
+    # The extension's two steps: sync the page's hashes, then send the missing texts
+    digests = {f"h{index}": text for index, text in enumerate(segments)}
+    sync = client.post(f"/chat/{session_id}/sync", json={"segments": list(digests)}).get_json()
+    missing = [{"hash": digest, "text": digests[digest]} for digest in sync["missing"]]
+    return client.post(f"/chat/{session_id}/segments", json={"segments": missing}).get_json()
+
+
+def test_segments_are_checked_against_the_blocklist(client, monkeypatch, tmp_path):
+    path = str(tmp_path / "reputation.bin")
+    build_index(path, [("account", [ACCOUNT])])
+    index = ReputationIndex(path)
+    monkeypatch.setattr(service, "REPUTATION", index)
+    monkeypatch.setattr(service, "SEGMENT_SESSIONS",
+                        ChatSessionStore(factory=partial(SegmentSession, reputation=index)))
+
+    result = upload(client, "tab-1", [GREETING, SCAM])
+    assert result["blocklisted"] == ["account:1234567890"]
+    assert service.LISTED_FLAG in result["flags"]
+    # A later sync of the same page reports it too, without re-scoring
+    sync = client.post("/chat/tab-1/sync", json={"segments": ["h0", "h1"]}).get_json()
+    assert sync["missing"] == []
+    assert sync["blocklisted"] == result["blocklisted"]
+
+
+def test_segments_gone_from_the_page_stop_counting(client):
+    both = upload(client, "tab-2", [GREETING, SCAM])
+    greeting_only = client.post("/chat/tab-2/sync", json={"segments": ["h0"]}).get_json()
+    assert greeting_only["missing"] == []
+    assert greeting_only["risk_score"] < both["risk_score"]
+    assert greeting_only["entities_found"] == []
+
+    fresh = upload(client, "tab-3", [GREETING])
+    assert greeting_only["risk_score"] == fresh["risk_score"]
+    assert greeting_only["chat"] == fresh["chat"]
+
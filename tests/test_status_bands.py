@@ -0,0 +1,7 @@
+from NLP import classify_risk, classify_status
+
+
+def test_extension_bands_put_the_thresholds_one_band_lower():
+    assert [classify_status(score) for score in (0, 1, 40, 41, 70, 71)] == [
+        "SAFE", "BE CAUTIOUS", "BE CAUTIOUS", "WARNING", "WARNING", "HIGH_RISK"]
+    assert [classify_risk(score) for score in (40, 70)] == ["WARNING", "HIGH_RISK"]
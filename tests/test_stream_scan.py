@@ -0,0 +1,52 @@
+import io
+import random
+
+import pytest
+
+from NLP.rule_engine import CompiledRules, default_ruleset
+from stream_scan import StreamScanner, scan_stream
+
+PIECES = ["ยืนยันตัวตน ", "ลิงก์ ", "ระงับบัญชี ", "abc ", " 123456 ", " 12345678 ", "1234567",
+          "123-4-56789-0 ", "123-456-7890 ", "9", " ", "\n"]
+
+
+def scan(rules, text, chunk_size):
+    scanner = StreamScanner(rules.pattern_matcher, rules.otp_regex, rules.bank_regex, rules.score_findings)
+    return scan_stream(io.BytesIO(text.encode("utf-8")).read, scanner, chunk_size)
+
+
+def custom_patterns():
+    ruleset = default_ruleset()
+    return {
+        **ruleset,
+        "otp": {**ruleset["otp"], "pattern": r"\b\d{8}\b"},
+        "bank": {**ruleset["bank"], "pattern": r"\d{3}-\d{3}-\d{4}"},
+    }
+
+
+@pytest.mark.parametrize("ruleset", [default_ruleset(), custom_patterns()], ids=["default", "custom"])
+def test_stream_matches_one_shot(ruleset):
+    rules = CompiledRules(ruleset)
+    rng = random.Random(17)
+    for _ in range(200):
+        text = "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 30)))
+        hits, otp_found, accounts = rules.find_all(text)
+        expected = rules.score_findings(hits, otp_found, accounts)
+        # Odd sizes split UTF-8 sequences, digit runs and account numbers
+        for chunk_size in (1, 2, 5, 13, 64):
+            scanner = scan(rules, text, chunk_size)
+            if scanner.saturated:
+                assert expected[0] == 100
+                continue
+            assert scanner.result() == expected
+            assert scanner.bank_accounts == accounts
+
+
+def test_unbounded_patterns_are_refused():
+    ruleset = default_ruleset()
+    rules = CompiledRules({**ruleset, "otp": {**ruleset["otp"], "pattern": r"\d+"}})
+    with pytest.raises(ValueError):
+        StreamScanner(rules.pattern_matcher, rules.otp_regex, rules.bank_regex, rules.score_findings)
+    rules = CompiledRules({**ruleset, "bank": {**ruleset["bank"], "pattern": r"\d{3}-?\d{7}"}})
+    with pytest.raises(ValueError):
+        StreamScanner(rules.pattern_matcher, rules.otp_regex, rules.bank_regex, rules.score_findings)